@@ -0,0 +1,147 @@
+"""Uçtan uca POST /analyze throughput'u (çevrimdışı).
+
+Kullanım (proje kök dizininden):
+    python benchmarks/bench_e2e.py [--requests 40] [--concurrency 8] [--latency 0.2]
+                                   [--token-delay 0] [--malformed-rate 0.1] [--output sonuc.json]
+
+Flask uygulaması gerçek bir HTTP sunucusunda çalışır; LLM çağrıları sahte
+Ollama'ya (mock_ollama.py) gider, Medium istekleri benchmarks/fixtures
+altındaki kayıtlı sayfalardan yanıtlanır. Analiz ve sayfa önbellekleri
+kapatılır, veriler geçici bir dizine yazılır.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from mock_ollama import MockOllama  # noqa: E402
+
+FIXTURE_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+class FixtureAdapter(BaseAdapter):
+    """Medium isteklerini kayıtlı HTML sayfalarıyla yanıtlayan requests adaptörü"""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.pages[zlib.crc32(request.url.encode('utf-8')) % len(self.pages)]
+        response.headers = CaseInsensitiveDict({'Content-Type': 'text/html; charset=utf-8'})
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def load_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+def run(total=40, concurrency=8, latency=0.2, token_delay=0.0, malformed_rate=0.1):
+    from batch import percentile
+
+    data_dir = tempfile.mkdtemp(prefix='medium-bench-')
+    with MockOllama(latency=latency, token_delay=token_delay, malformed_rate=malformed_rate) as mock:
+        os.environ.update({
+            'OLLAMA_URL': mock.url,
+            'DATA_DIR': data_dir,
+            'ANALYSIS_CACHE': '0',
+            'PAGE_CACHE': '0',
+            'JOB_QUEUE_SIZE': str(max(16, total)),
+        })
+        import main
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        main.scraper.session.mount('https://medium.com/', FixtureAdapter(load_pages()))
+        server = make_server('127.0.0.1', 0, main.app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True, name='bench-flask').start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        def one(i):
+            started = time.perf_counter()
+            try:
+                response = requests.post(f"{base_url}/analyze",
+                                         json={'url': f"https://medium.com/@bench/makale-{i}"}, timeout=600)
+                status = response.status_code
+            except requests.RequestException:
+                status = 0
+            return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(one, range(total)))
+        finally:
+            elapsed = time.perf_counter() - started
+            server.shutdown()
+
+        latencies = [sec for _, sec in outcomes]
+        statuses = {}
+        for status, _ in outcomes:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            'istek': total,
+            'eszamanlilik': concurrency,
+            'mock': {'latency': latency, 'token_delay': token_delay, 'malformed_rate': malformed_rate,
+                     **mock.stats},
+            'kuyruk': {'scrape_workers': main.job_queue.scrape_workers,
+                       'llm_workers': main.job_queue.llm_workers},
+            'durum_kodlari': statuses,
+            'sure_sn': round(elapsed, 3),
+            'istek_sn': round(total / elapsed, 3) if elapsed > 0 else 0.0,
+            'p50_sn': round(percentile(latencies, 50), 3),
+            'p95_sn': round(percentile(latencies, 95), 3),
+            'max_sn': round(max(latencies), 3) if latencies else 0.0,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sahte Ollama ile uçtan uca /analyze yük testi')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--token-delay', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.1)
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    args = parser.parse_args(argv)
+
+    result = run(args.requests, args.concurrency, args.latency, args.token_delay, args.malformed_rate)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': 'e2e', 'results': result}, f, ensure_ascii=False, indent=2)
+    return 0 if result['durum_kodlari'].get('200') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""HTML çıkarım backend'lerini kayıtlı Medium sayfaları üzerinde karşılaştırır.
+
+Kullanım (proje kök dizininden):
+    python benchmarks/bench_extraction.py [--iterations 20] [--output sonuc.json]
+
+Her fixture için bs4 ve lxml çıktılarının birebir aynı olduğu doğrulanır;
+aynı değilse betik hata koduyla çıkar.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from scraper import MediumScraper  # noqa: E402
+
+FIXTURE_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+def time_backend(fn, html_text, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(html_text)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'min_ms': round(min(samples), 3),
+    }
+
+
+def run(iterations=20):
+    scraper = MediumScraper()
+    results = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            html_text = f.read()
+
+        bs4_out = scraper.extract_fields_bs4(html_text)
+        lxml_out = scraper.extract_fields_lxml(html_text)
+
+        bs4_time = time_backend(scraper.extract_fields_bs4, html_text, iterations)
+        lxml_time = time_backend(scraper.extract_fields_lxml, html_text, iterations)
+        results.append({
+            'fixture': os.path.basename(path),
+            'bytes': len(html_text.encode('utf-8')),
+            'identical': bs4_out == lxml_out,
+            'bs4': bs4_time,
+            'lxml': lxml_time,
+            'speedup': round(bs4_time['median_ms'] / lxml_time['median_ms'], 2) if lxml_time['median_ms'] else None,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='bs4 ve lxml çıkarım backend karşılaştırması')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    for r in results:
+        print(f"{r['fixture']:<24} {r['bytes'] / 1024:7.1f} KB  "
+              f"bs4 {r['bs4']['median_ms']:8.2f} ms  lxml {r['lxml']['median_ms']:7.2f} ms  "
+              f"x{r['speedup']}  {'aynı' if r['identical'] else 'FARKLI'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': 'extraction', 'results': results}, f, ensure_ascii=False, indent=2)
+
+    return 0 if all(r['identical'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
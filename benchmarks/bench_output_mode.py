@@ -0,0 +1,109 @@
+"""Tam ve kompakt çıktı sözleşmesinin karşılaştırması.
+
+Kullanım (proje kök dizininden):
+    python benchmarks/bench_output_mode.py [--runs 5] [--token-delay 0.005] [--output sonuc.json]
+    python benchmarks/bench_output_mode.py --ollama-url http://localhost:11434 --runs 3
+
+Aynı makaleler OUTPUT_MODE=full ve OUTPUT_MODE=compact ile analiz edilir;
+üretilen token sayısı (eval_count), prompt token sayısı, üretim süresi,
+uçtan uca gecikme ve geçerli kural sayısı raporlanır. Varsayılan olarak
+sahte Ollama kullanılır (token/karakter ≈ 1/4, --token-delay parça başına
+bekleme); --ollama-url verilirse gerçek sunucu ölçülür.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from mock_ollama import MockOllama  # noqa: E402
+
+
+def articles(runs):
+    return [{
+        'url': f'https://medium.com/@bench/cikti-modu-{i}',
+        'title': f'Çıktı modu ölçümü {i}',
+        'author': 'bench',
+        'content': '\n\n'.join(
+            f"Paragraf {j}: Python ile veri analizi yaparken pandas ve numpy kullanılır; "
+            f"örnek {i}. Görseller Unsplash lisanslıdır, kod MIT lisanslı bir depodan alınmıştır."
+            for j in range(20)
+        ),
+        'word_count': 400
+    } for i in range(runs)]
+
+
+def measure(mode, ollama_url, runs):
+    from batch import percentile
+    from analyzer import ContentAnalyzer
+
+    os.environ.update({'OLLAMA_URL': ollama_url, 'OUTPUT_MODE': mode,
+                       'DATA_DIR': tempfile.mkdtemp(prefix='medium-output-'),
+                       'ANALYSIS_CACHE': '0', 'INCREMENTAL': '0', 'SIMILARITY_INDEX': '0',
+                       'LLM_HEALTH_INTERVAL': '0'})
+    analyzer = ContentAnalyzer()
+    latencies, eval_counts, eval_ms, prompt_counts, valid = [], [], [], [], []
+    for article in articles(runs):
+        started = time.perf_counter()
+        result = analyzer.analyze_article(article)
+        latencies.append(time.perf_counter() - started)
+        if not result['success']:
+            continue
+        stats = result.get('llm_stats', {})
+        eval_counts.append(stats.get('eval_count', 0))
+        eval_ms.append(stats.get('eval_duration', 0) / 1e6)
+        prompt_counts.append(stats.get('prompt_eval_count', 0))
+        valid.append(len(result['analiz_sonucu'].get('detaylar', [])))
+    analyzer.llm.close()
+
+    def mean(values):
+        return round(sum(values) / len(values), 1) if values else None
+
+    return {
+        'basarili': len(valid),
+        'uretilen_token_ort': mean(eval_counts),
+        'prompt_token_ort': mean(prompt_counts),
+        'uretim_ms_ort': mean(eval_ms),
+        'gecikme_p50_sn': round(percentile(latencies, 50), 3),
+        'gecikme_p95_sn': round(percentile(latencies, 95), 3),
+        'kural_sayisi_ort': mean(valid),
+    }
+
+
+def run(runs=5, token_delay=0.005, ollama_url=None):
+    if ollama_url:
+        modes = {mode: measure(mode, ollama_url, runs) for mode in ('full', 'compact')}
+    else:
+        with MockOllama(token_delay=token_delay) as mock:
+            modes = {mode: measure(mode, mock.url, runs) for mode in ('full', 'compact')}
+    full, compact = modes['full'], modes['compact']
+    if full['uretilen_token_ort'] and compact['uretilen_token_ort']:
+        modes['token_orani'] = round(compact['uretilen_token_ort'] / full['uretilen_token_ort'], 3)
+        modes['gecikme_orani'] = round(compact['gecikme_p50_sn'] / full['gecikme_p50_sn'], 3)
+    return modes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tam ve kompakt çıktı modunun token/gecikme karşılaştırması')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--token-delay', type=float, default=0.005)
+    parser.add_argument('--ollama-url', help='Sahte sunucu yerine ölçülecek Ollama adresi')
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    args = parser.parse_args(argv)
+
+    result = run(args.runs, args.token_delay, args.ollama_url)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': 'output_mode', 'results': result}, f, ensure_ascii=False, indent=2)
+    return 0 if result['compact']['basarili'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""LLM yanıtı işleme adımlarının mikro-benchmark'ı.
+
+Kullanım (proje kök dizininden):
+    python benchmarks/bench_parsing.py [--iterations 200] [--output sonuc.json]
+
+- extract_json_from_response: kayıtlı temiz ve bozuk yanıtlar (kod bloğu,
+  sondaki virgül, yorum, metin içinde JSON, yarım JSON)
+- calculate_final_score: temiz yanıttan çıkan analiz üzerinde
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from analyzer import ContentAnalyzer  # noqa: E402
+from mock_ollama import load_responses  # noqa: E402
+
+
+def time_call(fn, arg, iterations):
+    samples = []
+    # Başarısız parse denemeleri print ile hata yazar; ölçümü kirletmesin
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn(arg)
+            samples.append((time.perf_counter() - started) * 1e6)
+    return {
+        'median_us': round(statistics.median(samples), 1),
+        'min_us': round(min(samples), 1),
+    }
+
+
+def run(iterations=200, analyzer=None):
+    analyzer = analyzer or ContentAnalyzer()
+    responses = load_responses()
+
+    extraction = []
+    for name, text in responses.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            parsed = analyzer.extract_json_from_response(text)
+        extraction.append({
+            'variant': name,
+            'bytes': len(text.encode('utf-8')),
+            'parsed': bool(parsed),
+            'detaylar': len((parsed or {}).get('detaylar', [])),
+            **time_call(analyzer.extract_json_from_response, text, iterations)
+        })
+
+    clean = analyzer.extract_json_from_response(responses['clean'])
+    scoring = {
+        'kural_sayisi': len(clean['detaylar']),
+        'sonuc': analyzer.calculate_final_score(clean),
+        **time_call(analyzer.calculate_final_score, clean, iterations)
+    }
+    return {'extract_json': extraction, 'calculate_final_score': scoring}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='JSON çıkarma ve puanlama benchmark\'ı')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations)
+    for r in results['extract_json']:
+        print(f"extract_json {r['variant']:<16} {r['median_us']:9.1f} µs  "
+              f"{'parse' if r['parsed'] else 'BAŞARISIZ'} ({r['detaylar']} kural)")
+    s = results['calculate_final_score']
+    print(f"calculate_final_score   {s['median_us']:9.1f} µs  puan={s['sonuc']['puan']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': 'parsing', 'results': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
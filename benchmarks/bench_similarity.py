@@ -0,0 +1,92 @@
+"""Yakın kopya indeksi ölçeklenme ölçümü (çevrimdışı).
+
+Kullanım (proje kök dizininden):
+    python benchmarks/bench_similarity.py [--docs 20000] [--queries 50] [--output sonuc.json]
+
+Geçici bir indekse rastgele kelimelerden üretilmiş makaleler eklenir; ardından
+bir kısmının %5 değiştirilmiş kopyaları sorgulanır. İmza süresi, sorgu süresi,
+aday sayısı, aday başına karşılaştırma süresi ve kopyaları bulma oranı
+raporlanır.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+
+def run(docs=20000, queries=50, words=500, seed=7):
+    from batch import percentile
+    from similarity import SimilarityIndex
+
+    rnd = random.Random(seed)
+    vocab = [f"kelime{i}" for i in range(20000)]
+    index = SimilarityIndex(db_path=os.path.join(tempfile.mkdtemp(prefix='medium-sim-'), 'similarity.sqlite3'))
+
+    originals = {}
+    started = time.perf_counter()
+    batch = []
+    for i in range(docs):
+        text = [rnd.choice(vocab) for _ in range(words)]
+        if i < queries:
+            originals[i] = text
+        sig, count = index.signature(' '.join(text))
+        batch.append((f"https://medium.com/@bench/{i}", f"Makale {i}", 'bench', sig, count))
+        if len(batch) >= 1000:
+            index.add_many(batch)
+            batch = []
+    if batch:
+        index.add_many(batch)
+    build_sec = time.perf_counter() - started
+
+    signature_ms, query_ms, per_candidate_us, candidates, found = [], [], [], [], 0
+    for i, text in originals.items():
+        copy = list(text)
+        for pos in rnd.sample(range(words), words // 20):
+            copy[pos] = rnd.choice(vocab)
+        sig_started = time.perf_counter()
+        sig, _ = index.signature(' '.join(copy))
+        signature_ms.append((time.perf_counter() - sig_started) * 1000)
+        result = index.query(sig, exclude_url='https://medium.com/@bench/kopya')
+        query_ms.append(result['sure_ms'])
+        candidates.append(result['aday_sayisi'])
+        if result['aday_sayisi']:
+            per_candidate_us.append(result['aday_basina_us'])
+        if any(m['url'] == f"https://medium.com/@bench/{i}" for m in result['eslesmeler']):
+            found += 1
+
+    return {
+        'makale': docs,
+        'indeks_kurma_sn': round(build_sec, 2),
+        'imza_p50_ms': round(percentile(signature_ms, 50), 3),
+        'sorgu_p50_ms': round(percentile(query_ms, 50), 3),
+        'sorgu_p95_ms': round(percentile(query_ms, 95), 3),
+        'aday_p50': percentile(candidates, 50),
+        'aday_basina_p50_us': round(percentile(per_candidate_us, 50), 2),
+        'kopya_bulma_orani': round(found / max(1, len(originals)), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MinHash/LSH indeksi ölçeklenme ölçümü')
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    args = parser.parse_args(argv)
+
+    result = run(args.docs, args.queries)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': 'similarity', 'results': result}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
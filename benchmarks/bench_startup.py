@@ -0,0 +1,112 @@
+"""Soğuk başlangıç ölçümü (çevrimdışı).
+
+Kullanım (proje kök dizininden):
+    python benchmarks/bench_startup.py [--runs 5] [--load-delay 1.0] [--output sonuc.json]
+
+1) Taze alt süreçlerde `import main` süresi ve aşamaları (importlar,
+   bileşen kurulumu); gunicorn --preload ile bu maliyet worker başına değil
+   ana süreçte bir kez ödenir.
+2) İlk analiz gecikmesi: model yükleme süresi simüle edilen sahte Ollama'ya
+   karşı ısınmasız ve ısınmalı (ContentAnalyzer.warmup) karşılaştırma.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from mock_ollama import MockOllama  # noqa: E402
+
+IMPORT_SNIPPET = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "sys.path.insert(0, 'src')\n"
+    "import main, startup\n"
+    "print(json.dumps({'import_sn': time.perf_counter() - started, **startup.report()}))\n"
+)
+
+ARTICLE = {
+    'url': 'https://medium.com/@bench/soguk-baslangic',
+    'title': 'Soğuk başlangıç',
+    'author': 'bench',
+    'content': '\n\n'.join(
+        f"Paragraf {i}: Python ile veri analizi yaparken pandas ve numpy kullanılır." for i in range(20)
+    ),
+    'word_count': 220
+}
+
+
+def measure_imports(runs):
+    env = dict(os.environ, DATA_DIR=tempfile.mkdtemp(prefix='medium-startup-'),
+               OLLAMA_URL='http://127.0.0.1:9', LLM_HEALTH_INTERVAL='0', OLLAMA_WARMUP='0')
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_SNIPPET], cwd=ROOT, env=env, text=True)
+        report = json.loads(output.strip().splitlines()[-1])
+        report['surec_sn'] = time.perf_counter() - started
+        samples.append(report)
+
+    def median(values):
+        values = sorted(values)
+        return round(values[len(values) // 2], 3)
+
+    stages = samples[0]['asamalar_ms']
+    return {
+        'tekrar': runs,
+        'surec_sn': median([s['surec_sn'] for s in samples]),
+        'import_main_sn': median([s['import_sn'] for s in samples]),
+        'asamalar_ms': {k: median([s['asamalar_ms'][k] for s in samples]) for k in stages},
+    }
+
+
+def first_analysis(load_delay, warm):
+    from analyzer import ContentAnalyzer
+
+    with MockOllama(load_delay=load_delay) as mock:
+        os.environ.update({'OLLAMA_URL': mock.url, 'DATA_DIR': tempfile.mkdtemp(prefix='medium-startup-'),
+                           'ANALYSIS_CACHE': '0', 'INCREMENTAL': '0', 'LLM_HEALTH_INTERVAL': '0'})
+        analyzer = ContentAnalyzer()
+        warmup_sn = None
+        if warm:
+            warmup_sn = analyzer.warmup()['sure_sn']
+        started = time.perf_counter()
+        result = analyzer.analyze_article(ARTICLE)
+        elapsed = time.perf_counter() - started
+        analyzer.llm.close()
+        return {'ilk_analiz_sn': round(elapsed, 3), 'isinma_sn': warmup_sn, 'success': result['success']}
+
+
+def run(runs=5, load_delay=1.0):
+    return {
+        'import': measure_imports(runs),
+        'model_yukleme_sn': load_delay,
+        'isinmasiz': first_analysis(load_delay, warm=False),
+        'isinmali': first_analysis(load_delay, warm=True),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Soğuk başlangıç ve ısınma ölçümü')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--load-delay', type=float, default=1.0)
+    parser.add_argument('--output', help='Sonuçların yazılacağı JSON dosyası')
+    args = parser.parse_args(argv)
+
+    result = run(args.runs, args.load_delay)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'benchmark': 'startup', 'results': result}, f, ensure_ascii=False, indent=2)
+    return 0 if result['isinmali']['success'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
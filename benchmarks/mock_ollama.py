@@ -0,0 +1,240 @@
+"""Yerel sahte Ollama sunucusu: kayıtlı /api/generate yanıtlarını tekrar oynatır.
+
+Kullanım (proje kök dizininden):
+    python benchmarks/mock_ollama.py --port 11435 --latency 0.5 --token-delay 0.002 --malformed-rate 0.2
+
+Ardından uygulama OLLAMA_URL=http://127.0.0.1:11435 ile çalıştırılır.
+
+- GET /api/tags: test_ollama_connection için model listesi
+- POST /api/generate: stream=false ise tek JSON, stream=true ise NDJSON satırları
+- Yanıt metinleri benchmarks/fixtures/ollama_responses.json'dan gelir; malformed
+  oranında bozuk varyantlar (kod bloğu, sondaki virgül, yorum, yarım JSON) döner
+- Süre alanları (prompt_eval_duration, eval_duration ...) gecikme ayarlarından
+  hesaplanır; böylece token/sn metrikleri de anlamlı değer üretir
+- --load-delay: ilk istekte model yükleme beklemesi (load_duration); boş
+  prompt'lu istek yalnızca modeli yükler (ısınma)
+- `format` JSON şeması ise (OUTPUT_MODE=compact) temiz yanıt prompttaki kural
+  numaralarıyla kompakt şekle çevrilir; şema zorlandığı için bozuk varyant dönmez
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESPONSES_PATH = os.path.join(ROOT, 'benchmarks', 'fixtures', 'ollama_responses.json')
+PROMPTS_PATH = os.path.join(ROOT, 'config', 'prompts.json')
+MALFORMED_VARIANTS = ('fenced', 'trailing_comma', 'commented', 'prose_wrapped', 'truncated')
+PIECE_CHARS = 8
+
+
+def load_responses(path=RESPONSES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith('_')}
+
+
+class MockOllama:
+    """Süreç içinde başlatılabilen sahte Ollama.
+
+        with MockOllama(latency=0.2) as mock:
+            os.environ['OLLAMA_URL'] = mock.url
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, token_delay=0.0,
+                 malformed_rate=0.0, variant=None, model='llama3.1:8b-instruct-q4_0', seed=42,
+                 load_delay=0.0):
+        self.latency = latency
+        self.load_delay = load_delay
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        self.token_delay = token_delay
+        self.malformed_rate = malformed_rate
+        self.variant = variant
+        self.model = model
+        self.responses = load_responses()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'generate': 0, 'stream': 0, 'malformed': 0, 'load': 0, 'aborted': 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True, name='mock-ollama')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def pick_variant(self):
+        if self.variant:
+            return self.variant
+        with self._lock:
+            if self._random.random() < self.malformed_rate:
+                self.stats['malformed'] += 1
+                return self._random.choice(MALFORMED_VARIANTS)
+        return 'clean'
+
+    def compact_response(self, prompt, schema):
+        """Kayıtlı temiz yanıtı {"k": [{"i", "d", "p", "a"}]} şekline çevirir
+        (şema güven istiyorsa sabit "g" eklenir)"""
+        with open(PROMPTS_PATH, 'r', encoding='utf-8') as f:
+            codes = json.load(f).get('kompakt_analiz_prompt', {}).get('durum_kodlari', {})
+        status_codes = {status: code for code, status in codes.items()}
+        max_chars = schema['properties']['k']['items']['properties']['a'].get('maxLength', 120)
+        rule_ids = re.findall(r'\(ID: ([^)]+)\)', prompt)
+        items = []
+        for detail in json.loads(self.responses['clean']).get('detaylar', []):
+            if detail.get('kural_id') in rule_ids:
+                items.append({
+                    'i': rule_ids.index(detail['kural_id']) + 1,
+                    'd': status_codes.get(detail.get('durum'), 'B'),
+                    'p': int(detail.get('puan', 0)),
+                    'a': detail.get('aciklama', '')[:max_chars]
+                })
+                if 'g' in schema['properties']['k']['items']['properties']:
+                    items[-1]['g'] = 0.9
+        return json.dumps({'k': items}, ensure_ascii=False)
+
+    def load_model(self):
+        """İlk istekte model yükleme süresini simüle eder; eşzamanlı istekler yüklemeyi bekler"""
+        with self._load_lock:
+            if self.loaded:
+                return 0
+            time.sleep(self.load_delay)
+            self.loaded = True
+            self.stats['load'] += 1
+            return int(self.load_delay * 1e9)
+
+    def timings(self, prompt, text):
+        prompt_tokens = max(1, len(prompt) // 4)
+        eval_tokens = max(1, len(text) // 4)
+        pieces = max(1, len(text) // PIECE_CHARS)
+        prompt_eval_ns = int(self.latency * 1e9) or prompt_tokens * 1000
+        eval_ns = int(pieces * self.token_delay * 1e9) or eval_tokens * 1000
+        return {
+            'model': self.model,
+            'done': True,
+            'load_duration': 1000,
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': prompt_eval_ns,
+            'eval_count': eval_tokens,
+            'eval_duration': eval_ns,
+            'total_duration': prompt_eval_ns + eval_ns + 1000
+        }
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == '/api/tags':
+                    return self._send_json(200, {'models': [{'name': mock.model}]})
+                self._send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if self.path != '/api/generate':
+                    return self._send_json(404, {'error': 'not found'})
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                load_ns = mock.load_model()
+                if not payload.get('prompt'):
+                    return self._send_json(200, {'model': mock.model, 'response': '', 'done': True,
+                                                 'load_duration': load_ns})
+                if isinstance(payload.get('format'), dict):
+                    text = mock.compact_response(payload['prompt'], payload['format'])
+                else:
+                    text = mock.responses[mock.pick_variant()]
+                stats = mock.timings(payload.get('prompt', ''), text)
+                stats['load_duration'] += load_ns
+                stats['total_duration'] += load_ns
+                with mock._lock:
+                    mock.stats['generate'] += 1
+
+                time.sleep(mock.latency)
+                if not payload.get('stream'):
+                    time.sleep(max(1, len(text) // PIECE_CHARS) * mock.token_delay)
+                    return self._send_json(200, dict(stats, response=text))
+
+                with mock._lock:
+                    mock.stats['stream'] += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for i in range(0, len(text), PIECE_CHARS):
+                        self._chunk({'model': mock.model, 'response': text[i:i + PIECE_CHARS], 'done': False})
+                        if mock.token_delay:
+                            time.sleep(mock.token_delay)
+                    self._chunk(dict(stats, response=''))
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # İstemci bağlantıyı kapattı: Ollama gibi üretimi bırak
+                    with mock._lock:
+                        mock.stats['aborted'] += 1
+                    self.close_connection = True
+
+            def _chunk(self, obj):
+                line = (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+                self.wfile.write(f"{len(line):X}\r\n".encode('ascii') + line + b'\r\n')
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Kayıtlı yanıtları oynatan sahte Ollama sunucusu')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', type=float, default=0.0, help='Yanıt öncesi bekleme (sn, prompt_eval yerine)')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='Her akış parçası arası bekleme (sn)')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Bozuk JSON döndürme oranı (0-1)')
+    parser.add_argument('--variant', choices=('clean',) + MALFORMED_VARIANTS, help='Her zaman bu yanıtı döndür')
+    parser.add_argument('--load-delay', type=float, default=0.0, help='İlk istekte model yükleme süresi (sn)')
+    args = parser.parse_args(argv)
+
+    mock = MockOllama(args.host, args.port, args.latency, args.token_delay, args.malformed_rate, args.variant,
+                      load_delay=args.load_delay)
+    print(f"Sahte Ollama: {mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+"""Tüm çevrimdışı benchmark'ları çalıştırıp tek bir JSON sonuç dosyası yazar.
+
+Kullanım (proje kök dizininden):
+    python benchmarks/run_all.py [--output benchmarks/results/sonuc.json] [--skip-e2e]
+
+Varsayılan çıktı benchmarks/results/<tarih>_<commit>.json'dur; dosyalar
+commit, Python sürümü ve platform bilgisini içerir, böylece farklı
+çalışmalar karşılaştırılıp gerileme takibi yapılabilir.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import bench_e2e  # noqa: E402
+import bench_extraction  # noqa: E402
+import bench_output_mode  # noqa: E402
+import bench_parsing  # noqa: E402
+import bench_similarity  # noqa: E402
+import bench_startup  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'bilinmiyor'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Çevrimdışı benchmark paketi')
+    parser.add_argument('--output', help='Sonuç JSON dosyası')
+    parser.add_argument('--iterations', type=int, default=20, help='Mikro-benchmark tekrar sayısı')
+    parser.add_argument('--skip-e2e', action='store_true', help='Uçtan uca yük testini atla')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--malformed-rate', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'zaman': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'extraction': bench_extraction.run(args.iterations),
+        'parsing': bench_parsing.run(args.iterations * 10),
+        'startup': bench_startup.run(runs=3),
+        'similarity': bench_similarity.run(docs=2000, queries=20),
+        'output_mode': bench_output_mode.run(runs=3),
+    }
+    if not args.skip_e2e:
+        report['e2e'] = bench_e2e.run(args.requests, args.concurrency, args.latency,
+                                      malformed_rate=args.malformed_rate)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}_{commit}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Sonuçlar: {output}")
+
+    extraction_ok = all(r['identical'] for r in report['extraction'])
+    e2e_ok = args.skip_e2e or bool(report['e2e']['durum_kodlari'].get('200'))
+    return 0 if extraction_ok and e2e_ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
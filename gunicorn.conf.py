@@ -0,0 +1,36 @@
+"""gunicorn ayarları.
+
+Uygulama ana süreçte bir kez yüklenir (preload): bs4/requests/flask importları,
+config ayrıştırma ve bileşen kurulumu worker başına tekrarlanmaz, bellek
+copy-on-write paylaşılır. Arka plan thread'leri fork sonrası her worker'da
+yeniden başlatılır (src/startup.py).
+
+PROMETHEUS_MULTIPROC_DIR ayarlıysa önceki çalıştırmadan kalan metrik
+dosyaları başlangıçta silinir; ölen worker'ların gauge dosyaları
+child_exit ile işaretlenir.
+"""
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+preload_app = True
+
+
+def on_starting(server):
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir and os.path.isdir(multiproc_dir):
+        for path in glob.glob(os.path.join(multiproc_dir, '*.db')):
+            os.remove(path)
+
+
+def post_worker_init(worker):
+    import startup
+    startup.worker_ready()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,20 +1,88 @@
+import contextvars
 import json
 import requests
 import re
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import unicodedata
 import os
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache import AnalysisCache
+from content_window import ContentSelector, chunk_content, estimate_tokens
+from incremental import DraftDiff, DraftStore
+from json_stream import DetaylarStreamParser, repair_json, validate_details
+from llm_backend import create_backend
+import metrics
+from rule_engine import RuleEngine
+from scheduler import LLMScheduler
+from similarity import SimilarityIndex
+
+# Config yolları çalışma dizininden bağımsız çözülür (gunicorn, batch, benchmark)
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
 
 
 class ContentAnalyzer:
     def __init__(self, ollama_url="http://localhost:11434"):
         self.ollama_url = os.getenv("OLLAMA_URL", ollama_url)
         self.model_name = "llama3.1:8b-instruct-q4_0"
+        # Kademeli değerlendirmede büyük model config/cascade.json'dan gelir
+        # (CASCADE ortam değişkeni uygulandıktan sonraki etkin ayar)
+        self.cascade_path = os.path.join(CONFIG_DIR, 'cascade.json')
+        cascade = self.load_cascade()
+        if cascade.get('aktif') and cascade.get('buyuk_model'):
+            self.model_name = cascade['buyuk_model']
+
+        # 'single': tüm checklist tek prompt; 'grouped': kategori önekine göre
+        # küçük kural grupları Ollama'ya paralel gönderilir
+        self.analysis_mode = os.getenv("ANALYSIS_MODE", "single")
+        # 'full': prompts.json → json_sablonu; 'compact': kural no/durum kodu/puan/kısa
+        # gerekçe, JSON şemasıyla zorlanır ve tam şekle analyzer'da genişletilir
+        self.output_mode = os.getenv("OUTPUT_MODE", "full")
+        self.group_parallelism = int(os.getenv("GROUP_PARALLELISM", "2"))
+        self.group_retries = int(os.getenv("GROUP_RETRIES", "1"))
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        # Tüm LLM çağrıları interactive/bulk kulvarlarında sınırlı slotu paylaşır
+        self.scheduler = LLMScheduler()
+        # Havuzlu istemci, çoklu uç nokta ve arka planda sağlık yoklaması
+        self.llm = create_backend(self.model_name, self.keep_alive, self.ollama_url, scheduler=self.scheduler)
+        self.small_llm = None
+        self.warmup_stats = {'durum': 'yapilmadi'}
+        self.prescreen_enabled = os.getenv("RULE_PRESCREEN", "1") != "0"
+        # '0' ise eski davranış: içeriğin ilk 3000 karakteri
+        self.content_selection = os.getenv("CONTENT_SELECTION", "1") != "0"
+        # Uzun makaleler: yerel kanıt isteyen kural grupları bağlam bütçesine yakın
+        # parçalarda (map), bütüncül kurallar bir kez özet üzerinde değerlendirilir
+        self.long_doc_enabled = os.getenv("LONG_DOC", "1") != "0"
+        self.long_doc_min_tokens = int(os.getenv("LONG_DOC_MIN_TOKENS", "3000"))
+        self.context_tokens = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+        # 0: parça boyutu bağlam bütçesinden (önek ve çıktı payı düşülerek) hesaplanır
+        self.chunk_tokens = int(os.getenv("CHUNK_TOKENS", "0"))
+        self.chunk_overlap_tokens = int(os.getenv("CHUNK_OVERLAP_TOKENS", "200"))
+        self.chunk_parallelism = int(os.getenv("CHUNK_PARALLELISM", str(self.group_parallelism)))
+        self.long_doc_local_groups = {
+            g.strip() for g in os.getenv("LONG_DOC_LOCAL_GROUPS", "gorsel,kod,gizlilik").split(',') if g.strip()
+        }
+        # Kesik/bozuk yanıtta eksik kalan kurallar için yapılacak ek istek sayısı
+        self.recovery_retries = int(os.getenv("JSON_RECOVERY_RETRIES", "1"))
         
-       
-        self.checklist = self.load_json('config/checklist.json')
-        self.prompts = self.load_json('config/prompts.json')
+        self.checklist_path = os.path.join(CONFIG_DIR, 'checklist.json')
+        self.prompts_path = os.path.join(CONFIG_DIR, 'prompts.json')
+        self._config_mtimes = None
+        self.config_fingerprint = ''
+        self.load_config()
+
+        self.cache = AnalysisCache()
+        self.cache.purge_stale(self.config_fingerprint)
+        # Düzenlenen taslaklar: yalnızca değişen paragraflardan etkilenen kurallar yeniden değerlendirilir
+        self.drafts = DraftStore()
+        # Taranan tüm makaleler üzerinde yakın kopya indeksi (kalite_ozgunluk)
+        self.similarity = SimilarityIndex()
+        self.duplicate_threshold = float(os.getenv("SIMILARITY_DUPLICATE", "0.7"))
+        self.partial_duplicate_threshold = float(os.getenv("SIMILARITY_PARTIAL", "0.4"))
+        self.incremental_max_change = float(os.getenv("INCREMENTAL_MAX_CHANGE", "0.5"))
     
     def load_json(self, file_path):
         try:
@@ -23,136 +91,661 @@ class ContentAnalyzer:
         except Exception as e:
             print(f"JSON yükleme hatası ({file_path}): {e}")
             return {}
+
+    def load_cascade(self) -> Dict:
+        """cascade.json; CASCADE ortam değişkeni verilmişse 'aktif'i ezer"""
+        cascade = self.load_json(self.cascade_path)
+        if os.getenv("CASCADE") is not None:
+            cascade['aktif'] = os.getenv("CASCADE") != "0"
+        return cascade
+
+    def _config_file_mtimes(self):
+        mtimes = []
+        for path in (self.checklist_path, self.prompts_path, self.cascade_path):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def load_config(self):
+        """checklist.json, prompts.json ve cascade.json'ı yükler, önbellek parmak izini günceller"""
+        self.checklist = self.load_json(self.checklist_path)
+        self.prompts = self.load_json(self.prompts_path)
+        self.cascade = self.load_cascade()
+        self._config_mtimes = self._config_file_mtimes()
+        self._configure_small_model()
+
+        # Sabit prompt önekleri config başına bir kez kurulur
+        self.prompt_prefix = self.build_prompt_prefix()
+        self._prompt_prefixes = {}
+        self.rule_engine = RuleEngine(self.checklist)
+        self.content_selector = ContentSelector(self.checklist)
+        # Kural kimliği → kural, checklist sırası ve ağırlık: puanlama ve
+        # birleştirme adımları checklist'i her seferinde taramaz
+        rules = self.checklist.get('kontrol_maddeleri', [])
+        self.rules_by_id = {rule['id']: rule for rule in rules}
+        self.rule_order = {rule['id']: i for i, rule in enumerate(rules)}
+        self.rule_weights = {rule['id']: rule.get('agirlik', 5) for rule in rules}
+        # Artımlı analizde paragraf farkıyla atlanabilecek kurallar yalnızca
+        # kanıtı belirli paragraflarda duran 'kapsam: yerel' kurallardır
+        self.holistic_rules = {rule['id'] for rule in rules if rule.get('kapsam', 'butun') != 'yerel'}
+
+        digest = hashlib.sha256()
+        digest.update(str(self.checklist.get('versiyon', '')).encode('utf-8'))
+        digest.update(json.dumps(self.cascade, sort_keys=True).encode('utf-8'))
+        for path in (self.checklist_path, self.prompts_path):
+            try:
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            except OSError:
+                digest.update(b'-')
+        self.config_fingerprint = digest.hexdigest()
+
+    def _configure_small_model(self):
+        """Kademe açıksa küçük model backend'ini kurar; model adı değişmediyse mevcut havuz korunur"""
+        small_model = self.cascade.get('kucuk_model') if self.cascade.get('aktif') else None
+        if self.small_llm is not None and self.small_llm.model_name != small_model:
+            self.small_llm.close()
+            self.small_llm = None
+        if small_model and self.small_llm is None:
+            self.small_llm = create_backend(small_model, self.keep_alive, self.ollama_url, model_env=None,
+                                            scheduler=self.scheduler)
+
+    def refresh_config_if_changed(self):
+        """Config dosyaları değiştiyse yeniden yükler ve eski önbelleği geçersiz kılar"""
+        if self._config_file_mtimes() == self._config_mtimes:
+            return False
+        old_fingerprint = self.config_fingerprint
+        self.load_config()
+        if self.config_fingerprint != old_fingerprint:
+            print("Config değişti, analiz önbelleği geçersiz kılınıyor.")
+            self.cache.purge_stale(self.config_fingerprint)
+        return True
         
     
+    def warmup(self) -> Dict:
+        """Modeli keep_alive ile belleğe yükler; ilk analiz model yükleme süresini ödemez"""
+        self.warmup_stats = {'durum': 'calisiyor'}
+        started = time.perf_counter()
+        results = self.llm.warmup()
+        self.warmup_stats = {
+            'durum': 'tamamlandi' if any(r['success'] for r in results.values()) else 'basarisiz',
+            'sure_sn': round(time.perf_counter() - started, 3),
+            'uc_noktalar': results
+        }
+        if self.small_llm is not None:
+            self.warmup_stats['kucuk_model'] = self.small_llm.warmup()
+        return self.warmup_stats
+
     def test_ollama_connection(self):
-        """Ollama bağlantısını test eder"""
-        try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
-    
-    def call_ollama(self, prompt: str, temperature=0.1) -> Dict:
-        """Ollama API'sine istek gönderir (JSON çıktısını zorlar)"""
-        try:
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "temperature": temperature,
-                "stream": False,
-                "format": "json",   
-                "options": {
-                    "num_predict": 2048,
-                    "top_k": 10,
-                    "top_p": 0.9
-                }
-            }
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json=payload,
-                timeout=180
-            )
-            if response.status_code == 200:
-                result = response.json()
-                return {
-                    'success': True,
-                    'content': result.get('response', ''),  # JSON string bekliyoruz
-                    'done': result.get('done', False)
+        """LLM uç noktalarını hemen yoklar (en az biri yanıt veriyorsa True)"""
+        return self.llm.probe_all()
+
+    def llm_status(self) -> bool:
+        """Ağ isteği yapmadan, arka plan yoklamasının son durumu"""
+        return self.llm.is_available()
+
+    def call_ollama(self, prompt: str, temperature=0.1, rules: Optional[List[Dict]] = None,
+                    num_ctx: Optional[int] = None) -> Dict:
+        """LLM backend'ine istek gönderir (JSON çıktısını zorlar).
+
+        Kompakt modda çıktı, prompttaki kural listesine göre JSON şemasıyla
+        sınırlanır; rules verilmezse tüm checklist varsayılır. num_ctx verilirse
+        (uzun belge parçaları) modelin bağlam penceresi o boyuta ayarlanır.
+        """
+        fmt, options = self.output_format(rules)
+        if num_ctx:
+            options = dict(options or {}, num_ctx=num_ctx)
+        return self.llm.generate(prompt, temperature, fmt, options)
+
+    def call_ollama_stream(self, prompt: str, temperature=0.1, rules: Optional[List[Dict]] = None):
+        """Backend'in stream modunu kullanır; üretilen metin parçalarını sırayla verir.
+
+        Bağlantı/HTTP hataları requests.RequestException olarak yükselir.
+        """
+        fmt, options = self.output_format(rules)
+        return self.llm.generate_stream(prompt, temperature, fmt, options)
+
+    def output_format(self, rules: Optional[List[Dict]] = None,
+                      confidence: bool = False) -> Tuple[object, Optional[Dict]]:
+        """(format, options): tam modda serbest JSON; kompakt modda JSON şeması
+        ve kural sayısına göre num_predict. confidence: kademedeki küçük model
+        için her kurala 0-1 arası güven ('g') alanı eklenir"""
+        if self.output_mode != 'compact':
+            return 'json', None
+        if rules is None:
+            rules = self.checklist.get('kontrol_maddeleri', [])
+        compact = self.prompts.get('kompakt_analiz_prompt', {})
+        schema = {
+            'type': 'object',
+            'properties': {
+                'k': {
+                    'type': 'array',
+                    'minItems': len(rules),
+                    'maxItems': len(rules),
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'i': {'type': 'integer', 'minimum': 1, 'maximum': len(rules)},
+                            'd': {'type': 'string', 'enum': list(compact.get('durum_kodlari', {}))},
+                            'p': {'type': 'integer', 'minimum': 0, 'maximum': 10},
+                            'a': {'type': 'string', 'maxLength': compact.get('aciklama_max_karakter', 120)}
+                        },
+                        'required': ['i', 'd', 'p', 'a']
+                    }
                 }
-            else:
-                return {'success': False, 'error': f"API Hatası: {response.status_code}"}
-        except requests.RequestException as e:
-            return {'success': False, 'error': f"Bağlantı Hatası: {str(e)}"}
-        except Exception as e:
-            return {'success': False, 'error': f"Genel Hata: {str(e)}"}
-    
-    def build_analysis_prompt(self, article_data: Dict) -> str:
-        """Analiz için prompt oluşturur"""
-        # Checklist metni
+            },
+            'required': ['k']
+        }
+        if confidence:
+            item = schema['properties']['k']['items']
+            item['properties']['g'] = {'type': 'number', 'minimum': 0, 'maximum': 1}
+            item['required'].append('g')
+        num_predict = compact.get('sabit_token', 24) + compact.get('kural_basina_token', 64) * len(rules)
+        return schema, {'num_predict': num_predict}
+
+    def parse_analysis(self, response_text: str, article_data: Dict,
+                       rules: Optional[List[Dict]] = None) -> Optional[Dict]:
+        """extract_json_from_response + kompakt çıktıyı tam analiz şekline genişletme"""
+        parsed = self.extract_json_from_response(response_text)
+        if self.output_mode == 'compact' and parsed is not None:
+            parsed = self.rehydrate_compact(parsed, article_data, rules)
+        return parsed
+
+    def rehydrate_compact(self, parsed: Dict, article_data: Dict, rules: Optional[List[Dict]] = None) -> Dict:
+        """{"k": [{"i", "d", "p", "a"}]} → makale_bilgileri/detaylar/genel_sonuc.
+
+        Model şemayı yok sayıp tam şekli döndürdüyse olduğu gibi bırakılır;
+        genel sonuç calculate_final_score ile hesaplandığı için boş kalır.
+        """
+        if not isinstance(parsed, dict) or not isinstance(parsed.get('k'), list):
+            return parsed
+        if rules is None:
+            rules = self.checklist.get('kontrol_maddeleri', [])
+        return {
+            'makale_bilgileri': {
+                'baslik': article_data.get('title', ''),
+                'yazar': article_data.get('author', ''),
+                'link': article_data.get('url', '')
+            },
+            'detaylar': [self._rehydrate_detail(item, rules) for item in parsed['k']],
+            'genel_sonuc': {}
+        }
+
+    def _rehydrate_detail(self, item, rules: List[Dict]):
+        if not isinstance(item, dict):
+            return item
+        index = item.get('i')
+        rule = {}
+        if isinstance(index, int) and 1 <= index <= len(rules):
+            rule = rules[index - 1]
+        elif isinstance(index, str):
+            rule = self.rules_by_id.get(index, {})
+        codes = self.prompts.get('kompakt_analiz_prompt', {}).get('durum_kodlari', {})
+        detail = {
+            'kural_id': rule.get('id', ''),
+            'kural_baslik': rule.get('baslik', ''),
+            'durum': codes.get(item.get('d'), item.get('d')),
+            'puan': item.get('p'),
+            'aciklama': item.get('a', ''),
+            'ornek': ''
+        }
+        if 'g' in item:
+            detail['guven'] = item['g']
+        return detail
+
+    def _checklist_text(self, rules: List[Dict], with_weight: bool = True) -> str:
         lines = []
-        for i, rule in enumerate(self.checklist.get('kontrol_maddeleri', []), 1):
+        for i, rule in enumerate(rules, 1):
             kw = ', '.join(rule.get('anahtar_kelimeler', [])[:5])
+            weight = f"   - Ağırlık: {rule['agirlik']}/10\n" if with_weight else ""
             lines.append(
                 f"{i}. {rule['baslik']} (ID: {rule['id']})\n"
                 f"   - Açıklama: {rule['aciklama']}\n"
-                f"   - Ağırlık: {rule['agirlik']}/10\n"
+                f"{weight}"
                 f"   - Anahtar Kelimeler: {kw}\n"
             )
-        checklist_text = "\n".join(lines)
+        return "\n".join(lines)
+
+    def build_prompt_prefix(self, rules: Optional[List[Dict]] = None, confidence: bool = False) -> str:
+        """Her makale için aynı kalan sabit prompt önekini kurar.
+
+        Sistem rolü, görev, format talimatı, checklist ve JSON şablonu en başta
+        durur; makaleye özel kısım sona eklenir. Böylece Ollama'nın prompt
+        cache'i öneki yeniden değerlendirmeden kullanabilir. confidence: her
+        kural için güven değeri de istenir (kademedeki küçük model).
+        """
+        ana_prompt = self.prompts.get('ana_analiz_prompt', {})
+        if not ana_prompt:
+            return ''
+
+        if rules is None:
+            rules = self.checklist.get('kontrol_maddeleri', [])
+        if self.output_mode == 'compact':
+            return self.build_compact_prompt_prefix(rules, confidence)
+        checklist_text = self._checklist_text(rules)
+        template = ana_prompt.get('json_sablonu', {})
+        confidence_text = ''
+        if confidence:
+            template = dict(template, detaylar=[dict(item, guven=0.0) for item in template.get('detaylar', [])])
+            confidence_text = self._confidence_text('guven')
+        json_template = json.dumps(template, ensure_ascii=False, indent=2)
+
+        return (
+            f"{ana_prompt['sistem_rolu']}\n\n"
+            f"Görev: {ana_prompt['gorev_tanimi']}{confidence_text}\n\n"
+            f"Format Talimatı: {ana_prompt['format_talimati']}\n\n"
+            f"DEĞERLENDİRİLECEK KONTROL LİSTESİ:\n{checklist_text}\n\n"
+            f"SADECE AŞAĞIDAKİ JSON ŞEMASINA UYAN TEK BİR JSON NESNESİ DÖN:\n{json_template}\n\n"
+            "JSON DIŞI TEK KARAKTER YAZMA. Bilinmeyen alanları boş string ('') bırak.\n\n"
+        )
 
-        json_template = json.dumps(
-           self.prompts.get('ana_analiz_prompt', {}).get('json_sablonu', {}),
-           ensure_ascii=False, indent=2
+    def build_compact_prompt_prefix(self, rules: List[Dict], confidence: bool = False) -> str:
+        """Kompakt çıktı sözleşmesi: kurallar numarasıyla anılır, ağırlıklar
+        puanlamada yerelde uygulandığı için prompta girmez"""
+        ana_prompt = self.prompts.get('ana_analiz_prompt', {})
+        compact = self.prompts.get('kompakt_analiz_prompt', {})
+        codes = ', '.join(f"{code}={status}" for code, status in compact.get('durum_kodlari', {}).items())
+        confidence_field = ', "g": <0-1 güven>' if confidence else ''
+        return (
+            f"{ana_prompt['sistem_rolu']}\n\n"
+            f"Görev: {compact.get('gorev_tanimi', '')}{self._confidence_text('g') if confidence else ''}\n\n"
+            f"Format Talimatı: {compact.get('format_talimati', '')}\n\n"
+            f"DEĞERLENDİRİLECEK KONTROL LİSTESİ:\n{self._checklist_text(rules, with_weight=False)}\n\n"
+            'ŞEMA: {"k": [{"i": <kural no>, "d": "<durum kodu>", "p": <0-10>, "a": "<kısa gerekçe>"'
+            f'{confidence_field}}}]}}\n'
+            f"Durum kodları: {codes}\n\n"
         )
 
+    def _confidence_text(self, field: str) -> str:
+        text = self.prompts.get('guven_talimati', '')
+        return f" {text.format(alan=field)}" if text else ''
+
+    def build_analysis_prompt(self, article_data: Dict, rules: Optional[List[Dict]] = None,
+                              content: Optional[str] = None, confidence: bool = False) -> str:
+        """Analiz için prompt oluşturur (sabit önek + makaleye özel kısım).
+
+        rules verilirse (ör. ön taramada karara bağlananlar çıkarılmışsa) o alt
+        küme için önek bir kez kurulup saklanır. content verilirse (uzun belge
+        parçası) içerik penceresi yerine olduğu gibi kullanılır. confidence:
+        kurallar için güven değeri de istenir.
+        """
+        started = time.perf_counter()
+        prefix = self.prompt_prefix
+        if confidence or (rules is not None and len(rules) != len(self.checklist.get('kontrol_maddeleri', []))):
+            key = (confidence,) + tuple(rule['id'] for rule in (rules or self.checklist.get('kontrol_maddeleri', [])))
+            prefix = self._prompt_prefixes.get(key)
+            if prefix is None:
+                prefix = self._prompt_prefixes[key] = self.build_prompt_prefix(rules, confidence)
+
         title   = article_data.get('title', '')
         author  = article_data.get('author', '')
         url     = article_data.get('url', '')
-        content = (article_data.get('content', '') or '')[:3000]
-
-        sistem_rolu     = self.prompts['ana_analiz_prompt']['sistem_rolu']
-        gorev_tanimi    = self.prompts['ana_analiz_prompt']['gorev_tanimi']
-        format_talimati = self.prompts['ana_analiz_prompt']['format_talimati']
+        if content is None:
+            content = self.select_content(article_data, rules)
 
-        return (
-            f"{sistem_rolu}\n\n"
-            f"Görev: {gorev_tanimi}\n\n"
-            f"Format Talimatı: {format_talimati}\n\n"
+        prompt = (
+            f"{prefix}"
             f"Makale Bilgileri:\n- Başlık: {title}\n- Yazar: {author}\n- Link: {url}\n\n"
             f"İçerik (özet):\n{content}\n\n"
-            f"DEĞERLENDİRİLECEK KONTROL LİSTESİ:\n{checklist_text}\n\n"
+            f"{self._evidence_text(article_data, rules)}"
+            "JSON:"
+        )
+        metrics.PROMPT_BUILD_SECONDS.labels(mod='single').observe(time.perf_counter() - started)
+        return prompt
+
+    def _evidence_text(self, article_data: Dict, rules: Optional[List[Dict]] = None) -> str:
+        """Ön taramanın karar vermediği desen eşleşmeleri (makaleye özel kısımda)"""
+        evidence = article_data.get('on_tarama_bulgulari')
+        if not evidence:
+            return ''
+        rule_ids = None if rules is None else {rule['id'] for rule in rules}
+        lines = [
+            f"- {rule_id}: {finding['tur']} → \"{finding['baglam']}\""
+            for rule_id, findings in evidence.items() if rule_ids is None or rule_id in rule_ids
+            for finding in findings
+        ]
+        if not lines:
+            return ''
+        return ("ÖN TARAMA BULGULARI (yalnızca desen eşleşmesi; örnek/yer tutucu değer ya da konu "
+                "anlatımıysa ihlal sayma):\n" + "\n".join(lines) + "\n\n")
+
+    def select_content(self, article_data: Dict, rules: Optional[List[Dict]] = None) -> str:
+        """Prompta girecek içerik penceresi: verilen kurallarla en ilgili paragraflar"""
+        content = article_data.get('content', '') or ''
+        if not self.content_selection:
+            return content[:3000]
+        rule_ids = [rule['id'] for rule in rules] if rules is not None else None
+        return self.content_selector.select(content, rule_ids)
+
+    def group_rules(self, rules: Optional[List[Dict]] = None) -> Dict[str, List[Dict]]:
+        """Kuralları id önekine göre gruplar (kalite_, gorsel_, kod_, gizlilik_ ...)"""
+        groups = {}
+        if rules is None:
+            rules = self.checklist.get('kontrol_maddeleri', [])
+        for rule in rules:
+            prefix = rule['id'].split('_', 1)[0]
+            groups.setdefault(prefix, []).append(rule)
+        return groups
+
+    def build_group_prompt_prefix(self, rules: List[Dict]) -> str:
+        """Bir kural grubu için sabit prompt önekini kurar"""
+        ana_prompt = self.prompts.get('ana_analiz_prompt', {})
+        if not ana_prompt:
+            return ''
+        if self.output_mode == 'compact':
+            return self.build_compact_prompt_prefix(rules)
+
+        checklist_text = self._checklist_text(rules, with_weight=False)
+        detay_sablonu = ana_prompt.get('json_sablonu', {}).get('detaylar', [])
+        json_template = json.dumps({'detaylar': detay_sablonu}, ensure_ascii=False, indent=2)
+
+        return (
+            f"{ana_prompt['sistem_rolu']}\n\n"
+            "Görev: Makaleyi YALNIZCA aşağıdaki kurallara göre değerlendir. Her kural için durum "
+            "(uygun/kismen_uygun/uygun_degil/belirsiz), 0–10 arası puan, tek cümlelik açıklama ve "
+            "en fazla 1 örnek cümle ver.\n\n"
+            f"Format Talimatı: {ana_prompt['format_talimati']}\n\n"
+            f"KURALLAR:\n{checklist_text}\n\n"
             f"SADECE AŞAĞIDAKİ JSON ŞEMASINA UYAN TEK BİR JSON NESNESİ DÖN:\n{json_template}\n\n"
-            "JSON DIŞI TEK KARAKTER YAZMA. Bilinmeyen alanları boş string ('') bırak."
-        )  
+        )
+
+    def build_group_prompt(self, article_data: Dict, rules: List[Dict]) -> str:
+        """Tek bir kural grubu için kısa prompt oluşturur"""
+        started = time.perf_counter()
+        key = ('grup',) + tuple(rule['id'] for rule in rules)
+        prefix = self._prompt_prefixes.get(key)
+        if prefix is None:
+            prefix = self._prompt_prefixes[key] = self.build_group_prompt_prefix(rules)
+
+        title   = article_data.get('title', '')
+        content = self.select_content(article_data, rules)
 
+        prompt = (
+            f"{prefix}"
+            f"Makale Başlığı: {title}\n\n"
+            f"İçerik (özet):\n{content}\n\n"
+            f"{self._evidence_text(article_data, rules)}"
+            "JSON:"
+        )
+        metrics.PROMPT_BUILD_SECONDS.labels(mod='grouped').observe(time.perf_counter() - started)
+        return prompt
+
+    def _evaluate_group(self, article_data: Dict, rules: List[Dict]) -> Optional[Dict]:
+        """Bir grubu değerlendirir; başarısız olursa yalnızca bu grubu yeniden dener"""
+        prompt = self.build_group_prompt(article_data, rules)
+        for _attempt in range(self.group_retries + 1):
+            llm_response = self.call_ollama(prompt, rules=rules)
+            if not llm_response['success']:
+                continue
+            parsed = self.parse_analysis(llm_response['content'], article_data, rules)
+            if not parsed or not isinstance(parsed.get('detaylar'), list):
+                continue
+            details = self.validate_analysis(parsed, rules)[0]['detaylar']
+            if details:
+                return {'detaylar': details, 'oneriler': parsed.get('oneriler', [])}
+        return None
+
+    def iter_group_results(self, article_data: Dict, rules: Optional[List[Dict]] = None):
+        """Grupları paralel değerlendirir; (grup_adı, sonuç veya None) tamamlandıkça verilir"""
+        groups = self.group_rules(rules)
+        with ThreadPoolExecutor(max_workers=max(1, self.group_parallelism)) as pool:
+            futures = {
+                # Her görev istek bağlamının (kulvar, iptal) kopyasıyla çalışır
+                pool.submit(contextvars.copy_context().run, self._evaluate_group, article_data, rules): name
+                for name, rules in groups.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    print(f"Grup analizi hatası ({futures[future]}): {e}")
+                    yield futures[future], None
+
+    def _merge_group_results(self, group_results: Dict[str, Optional[Dict]]) -> Optional[Dict]:
+        """Grup çıktılarını checklist sırasına göre tek bir analiz JSON'ında birleştirir"""
+        order = self.rule_order
+        details, suggestions, failed = [], [], []
+        for name, group_result in group_results.items():
+            if group_result is None:
+                failed.append(name)
+                continue
+            details.extend(group_result['detaylar'])
+            suggestions.extend(group_result.get('oneriler') or [])
+        if not details:
+            return None
+        details.sort(key=lambda d: order.get(d.get('kural_id'), len(order)))
+        merged = {'detaylar': details, 'oneriler': suggestions}
+        if failed:
+            merged['basarisiz_gruplar'] = sorted(failed)
+        return merged
+
+    def is_long_document(self, article_data: Dict) -> bool:
+        return (self.long_doc_enabled and
+                estimate_tokens(article_data.get('content', '') or '') > self.long_doc_min_tokens)
+
+    def split_long_doc_rules(self, rules: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """(yerel, bütüncül): kod, görsel ve gizlilik gibi kanıtı tek bir
+        paragrafta duran kurallar her parçada aranır; kalite/yazım gibi
+        makalenin bütününe bakan kurallar bir kez özet üzerinde değerlendirilir"""
+        local = [rule for rule in rules if rule['id'].split('_', 1)[0] in self.long_doc_local_groups]
+        holistic = [rule for rule in rules if rule not in local]
+        return local, holistic
+
+    def chunk_token_budget(self, rules: List[Dict]) -> int:
+        """Parça başına içerik bütçesi: CHUNK_TOKENS ya da bağlam penceresinden
+        sabit önek, çıktı payı (num_predict) ve güvenlik payı düşülen kısım"""
+        if self.chunk_tokens:
+            return self.chunk_tokens
+        prefix_tokens = estimate_tokens(self.build_prompt_prefix(rules))
+        _fmt, options = self.output_format(rules)
+        output_tokens = (options or {}).get('num_predict', 2048)
+        return max(1000, self.context_tokens - prefix_tokens - output_tokens - 256)
+
+    def _evaluate_chunk(self, article_data: Dict, rules: List[Dict], chunk: Dict) -> Dict:
+        """Tek bir parçayı (ya da özeti) verilen kurallara göre değerlendirir ve süresini ölçer"""
+        prompt = self.build_analysis_prompt(article_data, rules, content=chunk['metin'])
+        started = time.perf_counter()
+        details, suggestions, stats = None, [], {}
+        for _attempt in range(self.group_retries + 1):
+            llm_response = self.call_ollama(prompt, rules=rules, num_ctx=self.context_tokens)
+            if not llm_response['success']:
+                continue
+            parsed = self.parse_analysis(llm_response['content'], article_data, rules)
+            if not parsed or not isinstance(parsed.get('detaylar'), list):
+                continue
+            details = self.validate_analysis(parsed, rules)[0]['detaylar']
+            suggestions = parsed.get('oneriler') or []
+            stats = llm_response.get('stats', {})
+            break
+        return {
+            'parca': chunk['parca'],
+            'detaylar': details,
+            'oneriler': suggestions,
+            'rapor': {
+                'parca': chunk['parca'],
+                'ozet': chunk.get('ozet', False),
+                'baslangic_paragraf': chunk['baslangic_paragraf'],
+                'token_tahmini': chunk['token_tahmini'],
+                'sure_sn': round(time.perf_counter() - started, 3),
+                'success': details is not None,
+                'kural_sayisi': len(details or []),
+                'eval_count': stats.get('eval_count')
+            }
+        }
+
+    def iter_chunk_results(self, article_data: Dict, rules: List[Dict]):
+        """Yerel kuralları parçalarda, bütüncül kuralları tek bir özet üzerinde
+        paralel değerlendirir; sonuçlar tamamlandıkça verilir. Özet, bütüncül
+        kurallarla ilgili paragrafların makale sırasıyla seçildiği çıkarımsal
+        pencere olup son parça numarasını alır ('ozet': True)."""
+        local, holistic = self.split_long_doc_rules(rules)
+        content = article_data.get('content', '')
+        jobs = []
+        if local:
+            chunks = chunk_content(content, self.chunk_token_budget(local), self.chunk_overlap_tokens)
+            jobs.extend((local, chunk) for chunk in chunks)
+        if holistic:
+            budget = self.chunk_token_budget(holistic)
+            summary = ContentSelector(self.checklist, budget).select(content, [rule['id'] for rule in holistic])
+            jobs.append((holistic, {'parca': len(jobs), 'ozet': True, 'baslangic_paragraf': 0,
+                                    'token_tahmini': estimate_tokens(summary), 'metin': summary}))
+        with ThreadPoolExecutor(max_workers=max(1, self.chunk_parallelism)) as pool:
+            futures = {pool.submit(contextvars.copy_context().run, self._evaluate_chunk, article_data, job_rules, chunk): chunk
+                       for job_rules, chunk in jobs}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    yield future.result()
+                except Exception as e:
+                    print(f"Parça analizi hatası ({chunk['parca']}): {e}")
+                    yield {'parca': chunk['parca'], 'detaylar': None, 'oneriler': [],
+                           'rapor': {'parca': chunk['parca'], 'ozet': chunk.get('ozet', False),
+                                     'baslangic_paragraf': chunk['baslangic_paragraf'],
+                                     'token_tahmini': chunk['token_tahmini'], 'sure_sn': 0.0,
+                                     'success': False, 'kural_sayisi': 0, 'eval_count': None}}
+
+    def _reduce_chunk_results(self, chunk_results: List[Dict]) -> Optional[Dict]:
+        """Parça bulgularını kural bazında birleştirir.
+
+        Zorunlu kurallarda en kötü bulgu (durum, sonra puan) kazanır ve o
+        parçanın açıklaması/örneği korunur. Diğer kurallarda puan parçaların
+        ortalamasıdır; açıklama ortalamaya en yakın bulgudan, örnek en düşük
+        puanlı (örneği olan) bulgudan alınır.
+        """
+        rules = self.checklist.get('kontrol_maddeleri', [])
+        mandatory = {rule['id'] for rule in rules if rule.get('zorunlu')}
+        severity = {'uygun_degil': 0, 'kismen_uygun': 1, 'uygun': 2, 'belirsiz': 3}
+
+        findings, suggestions = {}, []
+        for chunk_result in sorted(chunk_results, key=lambda r: r['parca']):
+            for detail in chunk_result['detaylar'] or []:
+                findings.setdefault(detail['kural_id'], []).append((chunk_result['parca'], detail))
+            for suggestion in chunk_result.get('oneriler') or []:
+                if suggestion not in suggestions:
+                    suggestions.append(suggestion)
+        if not findings:
+            return None
+
+        def score(detail):
+            try:
+                return float(detail.get('puan', 0))
+            except (TypeError, ValueError):
+                return 0.0
+
+        details = []
+        for rule in rules:
+            rule_findings = findings.get(rule['id'])
+            if not rule_findings:
+                continue
+            if rule['id'] in mandatory:
+                chunk_index, worst = min(
+                    rule_findings, key=lambda f: (severity.get(f[1].get('durum'), 3), score(f[1])))
+                merged = dict(worst)
+                merged['parca'] = chunk_index
+            else:
+                scored = [f for f in rule_findings if f[1].get('durum') != 'belirsiz'] or rule_findings
+                average = sum(score(d) for _, d in scored) / len(scored)
+                chunk_index, closest = min(scored, key=lambda f: abs(score(f[1]) - average))
+                merged = dict(closest)
+                merged['puan'] = round(average, 1)
+                merged['parca'] = chunk_index
+                with_example = [f for f in scored if f[1].get('ornek')]
+                if with_example:
+                    chunk_index, lowest = min(with_example, key=lambda f: score(f[1]))
+                    merged['ornek'] = lowest['ornek']
+                    merged['parca'] = chunk_index
+            merged['parca_puanlari'] = [score(d) for _, d in rule_findings]
+            details.append(merged)
+
+        return {'detaylar': details, 'oneriler': suggestions}
 
     def extract_json_from_response(self, response_text: str) -> Dict:
         """LLM yanıtından JSON'ı güvenli şekilde çıkarır."""
+        with metrics.timed(metrics.JSON_EXTRACT_SECONDS):
+            return self._extract_json(response_text)
+
+    def _extract_json(self, response_text: str) -> Dict:
+        text = response_text if isinstance(response_text, str) else str(response_text)
+
+        # 0) Ollama format:"json" ise genelde direkt parse edilebilir
         try:
-            text = response_text if isinstance(response_text, str) else str(response_text)
+            return json.loads(text)
+        except Exception:
+            pass
 
-            # 0) Ollama format:"json" ise genelde direkt parse edilebilir
+        # 1) Kod bloğu ya da serbest metin içindeki sağlam JSON: ilk { ile son } arası
+        start, end = text.find('{'), text.rfind('}')
+        if start != -1 and end > start:
             try:
-                return json.loads(text)
-            except Exception:
+                parsed = json.loads(text[start:end + 1])
+                metrics.JSON_REPAIRS.labels(yol='suslu_parantez').inc()
+                return parsed
+            except json.JSONDecodeError:
                 pass
 
-            # 1) ```json ... ``` bloğu varsa onu al
-            fence_match = re.search(r"```(?:json)?\s*([\s\S]*?)```", text, re.IGNORECASE)
-            if fence_match:
-                candidate = fence_match.group(1).strip()
-            else:
-                # 2) İlk { ile son } arası (greedy) — serbest metinden JSON'ı ayıkla
-                start = text.find('{')
-                end = text.rfind('}')
-                if start == -1 or end == -1 or end <= start:
-                    print("JSON nesnesi bulunamadı.")
-                    print("Gelen yanıt:", text[:300])
-                    return None
-                candidate = text[start:end+1]
-
-            # 3) Temizlik
-            json_str = candidate.strip().strip('`').strip()
-            json_str = re.sub(r',\s*}', '}', json_str)   # ",}" -> "}"
-            json_str = re.sub(r',\s*]', ']', json_str)   # ",]" -> "]"
-            json_str = re.sub(r'//.*?$', '', json_str, flags=re.MULTILINE)  # // yorum
-            json_str = re.sub(r'/\*[\s\S]*?\*/', '', json_str)              # /* ... */ yorum
-
-            # 4) Parse et
-            return json.loads(json_str)
-
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parse hatası: {e}")
-            try:
-                print("Hata konumu:", json_str[max(0, e.pos-30): e.pos+30])  # type: ignore
-            except Exception:
-                pass
-            return None
-        except Exception as e:
-            print(f"Genel hata: {e}")
+        # 2) Tek geçişli onarım: yorumlar, sondaki virgüller, kaçırılmamış satır
+        #    sonları ve num_predict sınırında kesilen çıktı
+        parsed, info = repair_json(text)
+        if not isinstance(parsed, dict):
+            print("❌ LLM yanıtından JSON çıkarılamadı.")
+            print("Gelen yanıt:", text[:300])
+            metrics.JSON_REPAIRS.labels(yol='bulunamadi' if '{' not in text else 'basarisiz').inc()
             return None
-    
+        metrics.JSON_REPAIRS.labels(yol='kesik' if info['kesik'] else 'onarim').inc()
+        return parsed
+
+    def validate_analysis(self, analysis_json: Dict, rules: List[Dict]) -> tuple:
+        """detaylar'ı json_sablonu'na göre doğrular; (temiz JSON, rapor) döner.
+
+        Rapor: geçerli girdi sayısı, reddedilenler ve sonucu hiç gelmeyen
+        (kesik çıktıda kaybolan ya da atlanan) kurallar.
+        """
+        template = self.prompts.get('ana_analiz_prompt', {}).get('json_sablonu', {}).get('detaylar') or [{}]
+        valid, rejected = validate_details(analysis_json.get('detaylar'), template[0], [r['id'] for r in rules])
+        found = {d['kural_id'] for d in valid}
+        cleaned = dict(analysis_json)
+        cleaned['detaylar'] = valid
+        return cleaned, {
+            'gecerli': len(valid),
+            'reddedilen': rejected,
+            'eksik_kurallar': [rule['id'] for rule in rules if rule['id'] not in found]
+        }
+
+    def _recover_missing(self, article_data: Dict, rules: List[Dict], analysis_json: Dict, report: Dict):
+        """Yalnızca eksik kuralları yeniden ister; gelen her kural için
+        ('kural', detay) üretir, birleşmiş JSON'ı döndürür (yield from ile)"""
+        order = self.rule_order
+        report['yeniden_istenen'] = []
+        for _attempt in range(self.recovery_retries):
+            if not report['eksik_kurallar']:
+                break
+            missing = set(report['eksik_kurallar'])
+            missing_rules = [rule for rule in rules if rule['id'] in missing]
+            report['yeniden_istenen'].extend(sorted(missing))
+            llm_response = self.call_ollama(self.build_analysis_prompt(article_data, missing_rules),
+                                            rules=missing_rules)
+            if not llm_response['success']:
+                break
+            extra = self.parse_analysis(llm_response['content'], article_data, missing_rules)
+            if extra is None:
+                continue
+            extra, extra_report = self.validate_analysis(extra, missing_rules)
+            for detail in extra['detaylar']:
+                yield 'kural', detail
+
+            analysis_json = dict(analysis_json)
+            analysis_json['detaylar'] = sorted(
+                analysis_json['detaylar'] + extra['detaylar'],
+                key=lambda d: order.get(d['kural_id'], len(order))
+            )
+            analysis_json['oneriler'] = list(analysis_json.get('oneriler') or []) + list(extra.get('oneriler') or [])
+            report['reddedilen'].extend(r for r in extra_report['reddedilen'] if r['kural_id'] in missing)
+            report['eksik_kurallar'] = extra_report['eksik_kurallar']
+            report['gecerli'] += extra_report['gecerli']
+        return analysis_json
+
     def calculate_final_score(self, analysis_result: Dict) -> Dict:
         """Final puanlamayı hesaplar (0–100 ölçeği)"""
         try:
@@ -166,11 +759,7 @@ class ContentAnalyzer:
                 rule_id = detail.get('kural_id', '')
                 rule_score = detail.get('puan', 0)  # 0–10 bekleniyor
                 
-                weight = 5
-                for rule in self.checklist.get('kontrol_maddeleri', []):
-                    if rule['id'] == rule_id:
-                        weight = rule['agirlik']
-                        break
+                weight = self.rule_weights.get(rule_id, 5)
                 
                 total_weight += weight
                 weighted_score += rule_score * weight
@@ -192,44 +781,456 @@ class ContentAnalyzer:
             return {'puan': 0, 'kategori': 'basarisiz', 'aciklama': 'Hesaplama hatası'}
     
     def analyze_article(self, article_data: Dict) -> Dict:
-        """Makaleyi analiz eder"""
-        if not self.test_ollama_connection():
-            return {
-                'success': False,
-                'error': 'Ollama bağlantısı kurulamadı. Ollama çalışıyor mu?'
+        """Makaleyi analiz eder (önce içerik adresli önbelleğe bakar)"""
+        result = None
+        for kind, payload in self._analysis_events(article_data, stream=False):
+            if kind != 'kural':
+                result = payload
+        return result
+
+    def analyze_article_stream(self, article_data: Dict):
+        """Makaleyi akış halinde analiz eder.
+
+        ('kural', detay) olaylarını her kural tamamlandıkça, en sonda
+        ('sonuc', result) ya da hata durumunda ('hata', result) üretir.
+        """
+        return self._analysis_events(article_data, stream=True)
+
+    def _analysis_variant(self, article_data: Dict) -> str:
+        window = self.content_selector.token_budget if self.content_selection else 'ilk3000'
+        if self.is_long_document(article_data):
+            window = f"parca{self.chunk_tokens or 'oto'}-{self.chunk_overlap_tokens}-{self.context_tokens}"
+        return f"{self.model_name}|{self.analysis_mode}|{self.output_mode}|{window}"
+
+    def _cache_key(self, article_data: Dict) -> str:
+        return self.cache.make_key(article_data, self.config_fingerprint, self._analysis_variant(article_data))
+
+    def _draft_key(self, article_data: Dict) -> str:
+        return f"{self.config_fingerprint}|{self._analysis_variant(article_data)}"
+
+    def _incremental_plan(self, article_data: Dict, rules: List[Dict]) -> Optional[Dict]:
+        """Aynı URL'nin önceki taslağıyla paragraf farkını çıkarır.
+
+        Paragraf eklenip silindiyse bütüncül kurallar (checklist'te
+        'kapsam: yerel' olmayanlar) ve ön taramanın bulgu bildirdiği kurallar
+        her zaman yeniden değerlendirilir; yerel kurallardan kanıt
+        paragrafları değişmeyenlerin önceki sonuçları 'yeniden_kullanilan'
+        altında döner. Başlık değiştiyse ya da
+        değişen paragraf oranı INCREMENTAL_MAX_CHANGE'i aşıyorsa tüm
+        kurallar yeniden değerlendirilir.
+        """
+        if not self.drafts.enabled or not article_data.get('url'):
+            return None
+        diff = DraftDiff(self.content_selector, article_data.get('content', ''))
+        plan = {'diff': diff, 'onceki': None, 'yeniden_kullanilan': {}, 'degisim_orani': None}
+        previous = self.drafts.get(article_data['url'], self._draft_key(article_data))
+        if not previous:
+            return plan
+
+        plan['onceki'] = previous
+        plan['degisim_orani'] = round(diff.change_ratio(previous), 3)
+        if previous['title'] != article_data.get('title', '') or plan['degisim_orani'] > self.incremental_max_change:
+            return plan
+
+        rule_ids = [rule['id'] for rule in rules]
+        holistic = self.holistic_rules | set(article_data.get('on_tarama_bulgulari') or ())
+        affected = diff.affected_rules(previous, rule_ids, holistic)
+        plan['yeniden_kullanilan'] = {
+            rule_id: previous['details'][rule_id] for rule_id in rule_ids if rule_id not in affected
+        }
+        return plan
+
+    def _merge_reused(self, analysis_json: Dict, plan: Dict, rules: List[Dict]) -> Dict:
+        """Yeniden kullanılan kural sonuçlarını LLM çıktısıyla checklist sırasında birleştirir"""
+        reused = plan['yeniden_kullanilan']
+        order = self.rule_order
+        details = [
+            d for d in analysis_json.get('detaylar', [])
+            if not (isinstance(d, dict) and d.get('kural_id') in reused)
+        ]
+        details.extend(reused.values())
+        details.sort(key=lambda d: order.get(d.get('kural_id'), len(order)) if isinstance(d, dict) else len(order))
+
+        suggestions = list(analysis_json.get('oneriler', []))
+        for suggestion in plan['onceki']['suggestions']:
+            if suggestion not in suggestions:
+                suggestions.append(suggestion)
+
+        merged = dict(analysis_json)
+        merged['detaylar'] = details
+        merged['oneriler'] = suggestions
+        merged['artimli_analiz'] = {
+            'degisim_orani': plan['degisim_orani'],
+            'yeniden_kullanilan': list(reused),
+            'yeniden_hesaplanan': [rule['id'] for rule in rules if rule['id'] not in reused]
+        }
+        return merged
+
+    def _save_draft(self, article_data: Dict, plan: Optional[Dict], analysis_json: Dict, rules: List[Dict]):
+        """LLM'in karar verdiği kuralları paragraf kanıtlarıyla birlikte saklar"""
+        if not plan:
+            return
+        rule_ids = {rule['id'] for rule in rules}
+        details = {
+            d['kural_id']: d for d in analysis_json.get('detaylar', [])
+            if isinstance(d, dict) and d.get('kural_id') in rule_ids
+        }
+        if not details:
+            return
+        self.drafts.save(
+            article_data['url'], self._draft_key(article_data), article_data.get('title', ''),
+            plan['diff'].hashes, details, plan['diff'].evidence(list(details), details),
+            analysis_json.get('oneriler', [])
+        )
+
+    def _article_info(self, article_data: Dict) -> Dict:
+        return {
+            'baslik': article_data.get('title', ''),
+            'yazar': article_data.get('author', ''),
+            'url': article_data.get('url', ''),
+            'kelime_sayisi': article_data.get('word_count', 0)
+        }
+
+    def prescreen(self, article_data: Dict) -> Dict:
+        """Deterministik kural motorunu çalıştırır (RULE_PRESCREEN=0 ile kapatılır)"""
+        if not self.prescreen_enabled or self.rule_engine is None:
+            return {'kararlar': {}, 'kesin_ihlaller': [], 'bulgular': {}, 'anahtar_kelimeler': {}, 'sure_ms': 0.0}
+        return self.rule_engine.evaluate(article_data)
+
+    def _originality_decision(self, similarity: Optional[Dict]) -> Optional[Dict]:
+        """Yakın kopya eşleşmesi varsa kalite_ozgunluk'u LLM'e sormadan karara bağlar"""
+        rule = self.rules_by_id.get('kalite_ozgunluk')
+        if not rule or not similarity or not similarity['eslesmeler']:
+            return None
+        best = similarity['eslesmeler'][0]
+        if best['benzerlik'] >= self.duplicate_threshold:
+            durum, puan = 'uygun_degil', 1
+        elif best['benzerlik'] >= self.partial_duplicate_threshold:
+            durum, puan = 'kismen_uygun', 4
+        else:
+            return None
+        return {
+            'kural_id': rule['id'],
+            'kural_baslik': rule['baslik'],
+            'durum': durum,
+            'puan': puan,
+            'aciklama': f"İçerik daha önce taranan bir makaleyle yaklaşık %{round(best['benzerlik'] * 100)} örtüşüyor.",
+            'ornek': best['url'],
+            'kaynak': 'benzerlik_indeksi'
+        }
+
+    def _analysis_events(self, article_data: Dict, stream: bool):
+        """Önbellek → ön tarama → LLM → puanlama akışını olay olarak yürütür"""
+        self.refresh_config_if_changed()
+        cache_key = self._cache_key(article_data)
+
+        cached = self.cache.get(cache_key)
+        if cached:
+            result = dict(cached)
+            result['makale_bilgi'] = self._article_info(article_data)
+            result['cached'] = True
+            for detail in result.get('analiz_sonucu', {}).get('detaylar', []):
+                yield 'kural', detail
+            yield 'sonuc', result
+            return
+
+        prescreen = self.prescreen(article_data)
+        similarity, similarity_entry = self.similarity.check(article_data)
+        originality = self._originality_decision(similarity)
+        if originality:
+            prescreen['kararlar']['kalite_ozgunluk'] = originality
+        for detail in prescreen['kararlar'].values():
+            yield 'kural', detail
+        if prescreen['bulgular']:
+            # Desen eşleşmeleri karar değil, LLM'e kanıt olarak gider
+            article_data = dict(article_data, on_tarama_bulgulari=prescreen['bulgular'])
+
+        analysis_json = {'detaylar': [], 'oneriler': []}
+        llm_stats = {}
+        rules = [
+            rule for rule in self.checklist.get('kontrol_maddeleri', [])
+            if rule['id'] not in prescreen['kararlar']
+        ]
+        plan = None
+
+        # Kesin ihlalde (sağlayıcı biçimli açık anahtar) LLM çağrılmaz
+        if rules and not prescreen['kesin_ihlaller']:
+            plan = self._incremental_plan(article_data, rules)
+            reused = plan['yeniden_kullanilan'] if plan else {}
+            for detail in reused.values():
+                yield 'kural', detail
+            pending = [rule for rule in rules if rule['id'] not in reused]
+
+            if pending:
+                if not self.llm.is_available():
+                    yield 'hata', {
+                        'success': False,
+                        'error': 'Ollama bağlantısı kurulamadı. Ollama çalışıyor mu?'
+                    }
+                    return
+
+                events = (self._cascade_events(article_data, pending, stream) if self.small_llm is not None
+                          else self._llm_events(article_data, pending, stream))
+                for kind, payload in events:
+                    if kind == 'kural':
+                        if payload.get('kural_id') not in prescreen['kararlar'] and payload.get('kural_id') not in reused:
+                            yield 'kural', payload
+                    elif kind == 'hata':
+                        yield 'hata', payload
+                        return
+                    else:
+                        analysis_json, llm_stats = payload
+
+            if plan and plan['onceki']:
+                analysis_json = self._merge_reused(analysis_json, plan, rules)
+            self._save_draft(article_data, plan, analysis_json, rules)
+
+        result = self._result_from_json(article_data, analysis_json, prescreen)
+        if similarity:
+            result['analiz_sonucu']['benzerlik'] = similarity
+        self.similarity.add_entry(similarity_entry)
+        if llm_stats:
+            result['llm_stats'] = llm_stats
+        self.cache.set(cache_key, result, self.config_fingerprint)
+        result['cached'] = False
+        yield 'sonuc', result
+
+    def _escalation_reason(self, detail: Dict) -> Optional[str]:
+        """Küçük modelin kararı büyük modele yükseltilmeli mi (cascade.json → yukseltme)"""
+        policy = self.cascade.get('yukseltme', {})
+        rule = self.rules_by_id.get(detail['kural_id'], {})
+        durum, puan = detail['durum'], detail['puan']
+        if policy.get('belirsiz', True) and durum == 'belirsiz':
+            return 'belirsiz'
+        if policy.get('zorunlu_ihlal', True) and rule.get('zorunlu') and durum in ('uygun_degil', 'kismen_uygun'):
+            return 'zorunlu_ihlal'
+        # Küçük modelden her kural için istenen güven (0-1); gelmediyse de düşük sayılır
+        threshold = policy.get('guven_esigi')
+        if threshold is not None:
+            confidence = detail.get('guven')
+            if not isinstance(confidence, (int, float)) or isinstance(confidence, bool) or confidence < threshold:
+                return 'dusuk_guven'
+        # İsteğe bağlı: bu aralıktaki tüm puanlar yükseltilir (varsayılan kapalı)
+        band = policy.get('sinir_puan')
+        if band and band[0] <= puan <= band[1]:
+            return 'sinir_puan'
+        if policy.get('durum_puan_tutarsiz', True) and (
+                (durum == 'uygun' and puan < 6) or (durum == 'uygun_degil' and puan > 5)):
+            return 'tutarsiz'
+        return None
+
+    def _cascade_events(self, article_data: Dict, rules: List[Dict], stream: bool):
+        """Kademeli değerlendirme: küçük model tüm kuralları tek istekte
+        değerlendirir; eksik/şemaya uymayan ve güvenilmeyen kararlar
+        _llm_events ile büyük modele gider. Her kural 'katman' alanında
+        hangi modelin karar verdiğini taşır."""
+        started = time.perf_counter()
+        small_details, suggestions = [], []
+        if self.small_llm.is_available():
+            confidence = self.cascade.get('yukseltme', {}).get('guven_esigi') is not None
+            fmt, options = self.output_format(rules, confidence)
+            if options is None:
+                options = {'num_predict': self.cascade.get('kucuk_num_predict', 2048)}
+            prompt = self.build_analysis_prompt(article_data, rules, confidence=confidence)
+            llm_response = self.small_llm.generate(prompt, 0.1, fmt, options)
+            parsed = (self.parse_analysis(llm_response['content'], article_data, rules)
+                      if llm_response['success'] else None)
+            if parsed is not None:
+                parsed, _report = self.validate_analysis(parsed, rules)
+                small_details, suggestions = parsed['detaylar'], list(parsed.get('oneriler') or [])
+        small_seconds = time.perf_counter() - started
+
+        accepted, escalated = [], {}
+        for detail in small_details:
+            reason = self._escalation_reason(detail)
+            if reason:
+                escalated[detail['kural_id']] = reason
+                continue
+            detail['katman'] = 'kucuk'
+            accepted.append(detail)
+            yield 'kural', detail
+        decided = {d['kural_id'] for d in small_details}
+        for rule in rules:
+            if rule['id'] not in decided:
+                escalated[rule['id']] = 'gecersiz_cikti'
+
+        stats = {}
+        if escalated:
+            if not self.llm.is_available():
+                yield 'hata', {'success': False, 'error': 'Ollama bağlantısı kurulamadı. Ollama çalışıyor mu?'}
+                return
+            big_json = {'detaylar': []}
+            for kind, payload in self._llm_events(article_data, [r for r in rules if r['id'] in escalated], stream):
+                if kind == 'kural':
+                    yield 'kural', dict(payload, katman='buyuk')
+                elif kind == 'hata':
+                    yield 'hata', payload
+                    return
+                else:
+                    big_json, stats = payload
+            for detail in big_json.get('detaylar', []):
+                if isinstance(detail, dict):
+                    detail['katman'] = 'buyuk'
+            order = self.rule_order
+            accepted = sorted(accepted + [d for d in big_json.get('detaylar', []) if isinstance(d, dict)],
+                              key=lambda d: order.get(d.get('kural_id'), len(order)))
+            suggestions = list(big_json.get('oneriler') or []) + suggestions
+
+        yield 'analiz', ({
+            'detaylar': accepted,
+            'oneriler': suggestions,
+            'kademe': {
+                'kucuk_model': self.small_llm.model_name,
+                'buyuk_model': self.model_name,
+                'kucuk_karar': [d['kural_id'] for d in accepted if d.get('katman') == 'kucuk'],
+                'yukseltilen': escalated,
+                'kucuk_sure_sn': round(small_seconds, 3),
+                'toplam_sure_sn': round(time.perf_counter() - started, 3)
             }
-        
-        prompt = self.build_analysis_prompt(article_data)
-        llm_response = self.call_ollama(prompt)
-        
-        if not llm_response['success']:
-            return {'success': False, 'error': llm_response['error']}
-        
-        analysis_json = self.extract_json_from_response(llm_response['content'])
-        
-        if not analysis_json:
-            return {
+        }, stats)
+
+    def _llm_events(self, article_data: Dict, rules: List[Dict], stream: bool):
+        """LLM değerlendirmesi: ('kural', detay) ... ve en sonda
+        ('analiz', (analysis_json, llm_stats)) ya da ('hata', sonuç) üretir"""
+        if self.is_long_document(article_data):
+            started = time.perf_counter()
+            chunk_results = list(self.iter_chunk_results(article_data, rules))
+            reduced = self._reduce_chunk_results(chunk_results)
+            if not reduced:
+                yield 'hata', {'success': False, 'error': 'Hiçbir makale parçası için geçerli JSON alınamadı'}
+                return
+            for detail in reduced['detaylar']:
+                yield 'kural', detail
+            reports = sorted((r['rapor'] for r in chunk_results), key=lambda r: r['parca'])
+            yield 'analiz', (reduced, {
+                'uzun_belge': True,
+                'parca_sayisi': len(reports),
+                'basarisiz_parcalar': [r['parca'] for r in reports if not r['success']],
+                'toplam_sure_sn': round(time.perf_counter() - started, 3),
+                'parcalar': reports
+            })
+            return
+
+        if self.analysis_mode == 'grouped':
+            group_results = {}
+            for name, group_result in self.iter_group_results(article_data, rules):
+                group_results[name] = group_result
+                for detail in (group_result or {}).get('detaylar', []):
+                    yield 'kural', detail
+            merged = self._merge_group_results(group_results)
+            if not merged:
+                yield 'hata', {'success': False, 'error': 'Hiçbir kural grubu için geçerli JSON alınamadı'}
+                return
+            yield 'analiz', (merged, {})
+            return
+
+        prompt = self.build_analysis_prompt(article_data, rules)
+
+        compact = self.output_mode == 'compact'
+        if stream:
+            parser = DetaylarStreamParser('k' if compact else 'detaylar')
+            # Akıştaki her nesne de tam yanıtla aynı doğrulamadan geçer; geçersiz
+            # ya da daha önce gönderilmiş kural istemciye 'kural' olarak gitmez
+            template = (self.prompts.get('ana_analiz_prompt', {}).get('json_sablonu', {}).get('detaylar') or [{}])[0]
+            pending = {rule['id'] for rule in rules}
+            try:
+                for piece in self.call_ollama_stream(prompt, rules=rules):
+                    for detail in parser.feed(piece):
+                        if compact:
+                            detail = self._rehydrate_detail(detail, rules)
+                        valid, _rejected = validate_details([detail], template, pending)
+                        for entry in valid:
+                            pending.discard(entry['kural_id'])
+                            yield 'kural', entry
+            except requests.RequestException as e:
+                yield 'hata', {'success': False, 'error': f"Bağlantı Hatası: {str(e)}"}
+                return
+            except Exception as e:
+                yield 'hata', {'success': False, 'error': f"Genel Hata: {str(e)}"}
+                return
+            content, stats = parser.text, {}
+        else:
+            llm_response = self.call_ollama(prompt, rules=rules)
+            if not llm_response['success']:
+                yield 'hata', {'success': False, 'error': llm_response['error']}
+                return
+            content, stats = llm_response['content'], llm_response.get('stats', {})
+
+        analysis_json = self.parse_analysis(content, article_data, rules)
+        if analysis_json is None:
+            yield 'hata', {
                 'success': False,
                 'error': 'LLM yanıtından JSON çıkarılamadı',
-                'raw_response': llm_response.get('content', '')[:500]
+                'raw_response': (content or '')[:500]
             }
-        
-        final_scoring = self.calculate_final_score(analysis_json)
-        
+            return
+
+        analysis_json, report = self.validate_analysis(analysis_json, rules)
+        if not stream:
+            for detail in analysis_json['detaylar']:
+                yield 'kural', detail
+        analysis_json = yield from self._recover_missing(article_data, rules, analysis_json, report)
+        if not analysis_json['detaylar']:
+            yield 'hata', {
+                'success': False,
+                'error': 'LLM yanıtında geçerli kural sonucu bulunamadı',
+                'raw_response': (content or '')[:500]
+            }
+            return
+        if report['yeniden_istenen'] or report['reddedilen'] or report['eksik_kurallar']:
+            stats = dict(stats)
+            stats['json_kurtarma'] = report
+        if compact:
+            stats = dict(stats, cikti_modu='compact')
+        yield 'analiz', (analysis_json, stats)
+
+    def _apply_prescreen(self, analysis_json: Dict, prescreen: Optional[Dict]) -> Dict:
+        """Kural motorunun kararlarını LLM çıktısıyla checklist sırasında birleştirir"""
+        if not prescreen or not (prescreen['kararlar'] or prescreen['bulgular']):
+            return analysis_json
+
+        decided = prescreen['kararlar']
+        order = self.rule_order
+        details = [
+            d for d in analysis_json.get('detaylar', [])
+            if not (isinstance(d, dict) and d.get('kural_id') in decided)
+        ]
+        details.extend(decided.values())
+        details.sort(key=lambda d: order.get(d.get('kural_id'), len(order)))
+
+        merged = dict(analysis_json)
+        merged['detaylar'] = details
+        merged['on_tarama'] = {
+            'karar_verilen': list(decided),
+            'kesin_ihlaller': prescreen['kesin_ihlaller'],
+            'bulgular': {rule_id: [f['tur'] for f in found] for rule_id, found in prescreen['bulgular'].items()},
+            'sure_ms': prescreen['sure_ms']
+        }
+        return merged
+
+    def _result_from_json(self, article_data: Dict, analysis_json: Dict, prescreen: Optional[Dict] = None) -> Dict:
+        analysis_json = self._apply_prescreen(analysis_json, prescreen)
+
+        if prescreen and prescreen['kesin_ihlaller']:
+            # Zorunlu kuralda kesin ihlal: LLM çalıştırılmadan analiz sonlanır
+            final_scoring = {
+                'puan': 0,
+                'kategori': 'basarisiz',
+                'aciklama': 'Kesin ihlal: ' + ', '.join(prescreen['kesin_ihlaller'])
+            }
+        else:
+            with metrics.timed(metrics.SCORING_SECONDS):
+                final_scoring = self.calculate_final_score(analysis_json)
+
         result = {
             'success': True,
-            'makale_bilgi': {
-                'baslik': article_data.get('title', ''),
-                'yazar': article_data.get('author', ''),
-                'url': article_data.get('url', ''),
-                'kelime_sayisi': article_data.get('word_count', 0)
-            },
+            'makale_bilgi': self._article_info(article_data),
             'analiz_sonucu': analysis_json,
             'final_puanlama': final_scoring,
             'timestamp': self.get_timestamp()
         }
         return result
-    
+
     def get_timestamp(self):
         """Zaman damgası üretir"""
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -299,5 +1300,96 @@ def quick_test():
         print("BAŞARILI!")
         print(analyzer.format_result_for_user(result))
 
+def build_legacy_analysis_prompt(analyzer: ContentAnalyzer, article_data: Dict) -> str:
+    """Önceki prompt düzeni: makale bilgileri ve içerik, checklist ve JSON
+    şablonundan önce gelir (yalnızca prompt cache karşılaştırması için)"""
+    ana_prompt = analyzer.prompts.get('ana_analiz_prompt', {})
+    json_template = json.dumps(ana_prompt.get('json_sablonu', {}), ensure_ascii=False, indent=2)
+    return (
+        f"{ana_prompt['sistem_rolu']}\n\n"
+        f"Görev: {ana_prompt['gorev_tanimi']}\n\n"
+        f"Format Talimatı: {ana_prompt['format_talimati']}\n\n"
+        f"Makale Bilgileri:\n- Başlık: {article_data.get('title', '')}\n"
+        f"- Yazar: {article_data.get('author', '')}\n- Link: {article_data.get('url', '')}\n\n"
+        f"İçerik (özet):\n{analyzer.select_content(article_data)}\n\n"
+        f"DEĞERLENDİRİLECEK KONTROL LİSTESİ:\n{analyzer._checklist_text(analyzer.checklist.get('kontrol_maddeleri', []))}\n\n"
+        f"SADECE AŞAĞIDAKİ JSON ŞEMASINA UYAN TEK BİR JSON NESNESİ DÖN:\n{json_template}\n\n"
+        "JSON DIŞI TEK KARAKTER YAZMA. Bilinmeyen alanları boş string ('') bırak."
+    )
+
+
+def measure_prompt_cache(runs=3):
+    """Eski (makale önce) ve yeni (sabit önek önce) prompt düzenlerinde
+    Ollama prompt cache'inin yeniden kullanımını karşılaştırır.
+
+    Her düzen farklı içerikli `runs` makaleyle çağrılır; ilk çağrı soğuktur.
+    Önbellekten gelen token sayısı, sıcak çağrılarda soğuk çağrıya göre
+    değerlendirilmeyen prompt token'ları olarak tahmin edilir (Ollama önbellek
+    isabetini ayrıca raporlamaz).
+    """
+    analyzer = ContentAnalyzer()
+    layouts = (
+        ('eski', lambda article: build_legacy_analysis_prompt(analyzer, article)),
+        ('yeni', analyzer.build_analysis_prompt),
+    )
+    report = {}
+    for name, build in layouts:
+        rows = []
+        for i in range(runs):
+            article = {
+                'title': f'Ölçüm Makalesi {name} {i}',
+                'content': f'Bu ölçüm için {name} düzeninde {i}. deneme içeriğidir. ' * 20,
+                'author': 'Test Yazar',
+                'url': f'https://medium.com/olcum-{name}-{i}',
+            }
+            started = time.perf_counter()
+            response = analyzer.call_ollama(build(article))
+            latency_ms = (time.perf_counter() - started) * 1000
+            stats = response.get('stats', {}) if response['success'] else {}
+            rows.append({
+                'prompt_eval_count': stats.get('prompt_eval_count', 0),
+                'prompt_eval_ms': stats.get('prompt_eval_duration', 0) / 1e6,
+                'gecikme_ms': latency_ms,
+            })
+            print(
+                f"[{name}] #{i + 1} prompt_eval_count={stats.get('prompt_eval_count', '-')} "
+                f"prompt_eval_duration={rows[-1]['prompt_eval_ms']:.0f}ms gecikme={latency_ms:.0f}ms"
+            )
+
+        cold, warm = rows[0], rows[1:] or rows[:1]
+        evaluated = sum(r['prompt_eval_count'] for r in warm) / len(warm)
+        report[name] = {
+            'soguk_prompt_token': cold['prompt_eval_count'],
+            'sicak_prompt_token': round(evaluated, 1),
+            'onbellek_token': round(max(0.0, cold['prompt_eval_count'] - evaluated), 1),
+            'sicak_prompt_eval_ms': round(sum(r['prompt_eval_ms'] for r in warm) / len(warm), 1),
+            'sicak_gecikme_ms': round(sum(r['gecikme_ms'] for r in warm) / len(warm), 1),
+            'cagrilar': rows,
+        }
+
+    old, new = report['eski'], report['yeni']
+    report['fark'] = {
+        'onbellek_token': round(new['onbellek_token'] - old['onbellek_token'], 1),
+        'sicak_prompt_eval_ms': round(new['sicak_prompt_eval_ms'] - old['sicak_prompt_eval_ms'], 1),
+        'sicak_gecikme_ms': round(new['sicak_gecikme_ms'] - old['sicak_gecikme_ms'], 1),
+    }
+    for name in ('eski', 'yeni'):
+        r = report[name]
+        print(
+            f"{name}: önbellekten ~{r['onbellek_token']} token, sıcak çağrıda {r['sicak_prompt_token']} token "
+            f"değerlendirildi, prompt_eval {r['sicak_prompt_eval_ms']}ms, gecikme {r['sicak_gecikme_ms']}ms"
+        )
+    diff = report['fark']
+    print(
+        f"fark (yeni - eski): önbellek {diff['onbellek_token']:+} token, "
+        f"prompt_eval {diff['sicak_prompt_eval_ms']:+}ms, gecikme {diff['sicak_gecikme_ms']:+}ms"
+    )
+    return report
+
+
 if __name__ == "__main__":
-    quick_test()
+    import sys
+    if '--prompt-cache' in sys.argv:
+        measure_prompt_cache()
+    else:
+        quick_test()
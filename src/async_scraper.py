@@ -0,0 +1,212 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+import metrics
+from scraper import DEFAULT_HEADERS, MediumScraper
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Host başına istek hızı sınırlayıcı (token bucket)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After başlığını (saniye ya da HTTP tarihi) saniyeye çevirir"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncMediumScraper:
+    """asyncio tabanlı scraper: havuzlu HTTP/2 istemci, host başına hız
+    sınırı ve Retry-After'a uyan jitter'lı üstel geri çekilme.
+
+    HTML ayrıştırma MediumScraper.parse_article_html ile aynıdır ve olay
+    döngüsünü bloklamaması için thread havuzunda çalıştırılır.
+
+        async with AsyncMediumScraper() as s:
+            results = await s.fetch_many(urls)
+    """
+
+    def __init__(self, parser: MediumScraper = None, rate_per_host: float = None, burst: float = None,
+                 max_connections: int = None, max_retries: int = 3, timeout: float = 15.0):
+        self.parser = parser or MediumScraper()
+        self.rate_per_host = rate_per_host or float(os.getenv("SCRAPE_RATE_PER_HOST", "2"))
+        self.burst = burst or float(os.getenv("SCRAPE_RATE_BURST", "4"))
+        self.max_connections = max_connections or int(os.getenv("SCRAPE_MAX_CONNECTIONS", "20"))
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = 1.0
+        self.backoff_cap = 30.0
+
+        self._client = None
+        self._buckets = {}
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0}
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            http2=True,
+            headers=DEFAULT_HEADERS,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = (urlparse(url).netloc or '').lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        return bucket
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    async def _get(self, url: str, headers: Dict = None) -> httpx.Response:
+        last_exc = None
+        for attempt in range(self.max_retries):
+            await self._bucket(url).acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+            try:
+                response = await self._client.get(url, headers=headers)
+                if response.status_code == 304:
+                    return response
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                last_exc = httpx.HTTPStatusError(
+                    f"HTTP {response.status_code}", request=response.request, response=response)
+                reason = str(response.status_code)
+            except httpx.TransportError as e:
+                last_exc = e
+                reason = type(e).__name__
+            if attempt < self.max_retries - 1:
+                self.stats['retries'] += 1
+                metrics.SCRAPE_RETRIES.labels(scraper='async', neden=reason).inc()
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        raise last_exc or httpx.HTTPError("Bilinmeyen istek hatası")
+
+    async def fetch(self, url: str) -> Dict:
+        """Tek makaleyi çeker; MediumScraper.extract_article_content ile aynı sözlüğü döner"""
+        started = time.perf_counter()
+        result = await self._fetch(url)
+        outcome = 'basarili' if result.get('success') else 'hata'
+        metrics.SCRAPE_SECONDS.labels(sonuc=outcome).observe(time.perf_counter() - started)
+        return result
+
+    async def _fetch(self, url: str) -> Dict:
+        if self._client is None:
+            raise RuntimeError("AsyncMediumScraper 'async with' içinde kullanılmalı")
+        if not self.parser.is_valid_medium_url(url):
+            return {'success': False, 'error': 'Geçerli bir Medium URL\'si değil'}
+        page_cache = self.parser.page_cache
+        try:
+            cached = page_cache.get(url)
+            response = await self._get(url, page_cache.conditional_headers(cached))
+            if response.status_code == 304 and cached:
+                page_cache.mark_revalidated(url)
+                return self.parser.article_from_cache(cached, url)
+
+            html_text = response.content.decode('utf-8', errors='replace')
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, self.parser.parse_article_html, html_text, url)
+            if result['success']:
+                page_cache.set(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), result)
+            return result
+        except httpx.HTTPError as e:
+            self.stats['failures'] += 1
+            return {'success': False, 'error': f'HTTP Hatası: {str(e)}'}
+        except Exception as e:
+            self.stats['failures'] += 1
+            return {'success': False, 'error': f'Genel Hata: {str(e)}'}
+
+    async def fetch_many(self, urls: List[str], concurrency: int = None) -> List[Dict]:
+        """URL'leri paralel çeker; sonuçlar girdi sırasıyla döner"""
+        limit = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def one(url):
+            async with limit:
+                return await self.fetch(url)
+
+        return await asyncio.gather(*(one(url) for url in urls))
+
+
+class BackgroundAsyncScraper:
+    """AsyncMediumScraper'ı kendi olay döngüsü thread'inde çalıştırıp thread
+    tabanlı kod (batch, iş kuyruğu) için Future döndüren köprü."""
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True, name='async-scraper')
+        self._thread.start()
+        self.scraper = asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+
+    async def _open(self):
+        return await AsyncMediumScraper(**self._kwargs).__aenter__()
+
+    def submit(self, url: str) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.scraper.fetch(url), self._loop)
+
+    def extract_article_content(self, url: str) -> Dict:
+        """MediumScraper ile aynı senkron arayüz"""
+        return self.submit(url).result()
+
+    def close(self):
+        try:
+            asyncio.run_coroutine_threadsafe(self.scraper.aclose(), self._loop).result(timeout=5)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
@@ -0,0 +1,284 @@
+"""Toplu makale analizi.
+
+Kullanım:
+    python -m src.batch urls.txt -o sonuclar.jsonl
+
+Scraping (G/Ç ağırlıklı, yüksek eşzamanlılık) ve LLM analizi (hesaplama
+ağırlıklı, düşük eşzamanlılık) iki ayrı havuzda boru hattı olarak çalışır.
+Her sonuç biter bitmez JSONL satırı olarak yazılır; checkpoint dosyası
+sayesinde yarıda kalan bir çalışma kaldığı yerden devam eder.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from typing import Dict, Iterable, List, Optional
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from formatting import format_analysis_for_api
+
+
+def read_urls(path: str) -> List[str]:
+    """Düz metin (satır başına bir URL, # yorum) ya da {"url": ...} JSONL okur"""
+    urls = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('{'):
+                try:
+                    url = json.loads(line).get('url', '')
+                except json.JSONDecodeError:
+                    continue
+            else:
+                url = line
+            if url:
+                urls.append(url.strip())
+    return list(dict.fromkeys(urls))
+
+
+def load_checkpoint(path: Optional[str]) -> set:
+    """Checkpoint'te başarılı olarak işaretlenmiş URL'leri döndürür"""
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('success'):
+                done.add(record.get('url'))
+    return done
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class BatchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latencies = []
+        self.success = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def record(self, record: Dict):
+        self.latencies.append(record['sure_sn'])
+        if record['success']:
+            self.success += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        processed = self.success + self.failed
+        return {
+            'toplam': processed + self.skipped,
+            'basarili': self.success,
+            'basarisiz': self.failed,
+            'atlanan': self.skipped,
+            'sure_sn': round(elapsed, 2),
+            'makale_dakika': round(processed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            'p50_sn': round(percentile(self.latencies, 50), 2),
+            'p95_sn': round(percentile(self.latencies, 95), 2)
+        }
+
+
+class BatchRunner:
+    """Scraping ve analiz havuzlarını birbirine bağlayan toplu çalıştırıcı.
+
+    Analizler scheduler'ın 'bulk' kulvarında çalışır; context verilirse
+    (ör. /analyze/batch isteğinin bağlamı) o iptal edildiğinde süren
+    analizler de kesilir.
+    """
+
+    def __init__(self, scraper, analyzer, scrape_workers=None, llm_workers=None, async_scrape=None,
+                 context=None):
+        self.scraper = scraper
+        self.analyzer = analyzer
+        self.context = context
+        # Makale başına süre sınırı (sn); 0 kapalı
+        self.item_deadline = float(os.getenv("BATCH_ITEM_DEADLINE", "0")) or None
+        # Açıkken scraping, thread havuzu yerine AsyncMediumScraper (HTTP/2,
+        # host başına hız sınırı) ile tek bir olay döngüsünde yapılır
+        if async_scrape is None:
+            async_scrape = os.getenv("BATCH_ASYNC_SCRAPE", "0") == "1"
+        self.async_scrape = async_scrape
+        self.scrape_workers = scrape_workers or int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "8"))
+        self.llm_workers = llm_workers or int(os.getenv("BATCH_LLM_CONCURRENCY", "1"))
+
+    def iter_results(self, urls: Iterable[str], stats: BatchStats = None):
+        """URL'leri işler; her sonuç tamamlandığı anda kayıt olarak verilir"""
+        urls = list(urls)
+        results = Queue()
+        # Scrape edilip analiz bekleyen makale sayısını sınırlar (bellek/backpressure)
+        in_flight = threading.BoundedSemaphore(self.scrape_workers + self.llm_workers * 2)
+        cancelled = threading.Event()
+
+        scrape_pool = ThreadPoolExecutor(max_workers=self.scrape_workers, thread_name_prefix='batch-scrape')
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_workers, thread_name_prefix='batch-llm')
+
+        def finish(record):
+            in_flight.release()
+            results.put(record)
+
+        def analyze(url, started, scraping_result, scrape_sec):
+            if cancelled.is_set():
+                return finish(None)
+            t0 = time.perf_counter()
+            try:
+                with self.analyzer.scheduler.request('bulk', self.item_deadline, parent=self.context):
+                    analysis_result = self.analyzer.analyze_article(scraping_result)
+                if analysis_result.get('success'):
+                    record = {'url': url, 'success': True, 'data': format_analysis_for_api(analysis_result),
+                              'onbellek': bool(analysis_result.get('cached'))}
+                else:
+                    record = {'url': url, 'success': False,
+                              'error': f"Analiz Hatası: {analysis_result.get('error', '')}"}
+            except Exception as e:
+                record = {'url': url, 'success': False, 'error': f'Beklenmeyen hata: {str(e)}'}
+            now = time.perf_counter()
+            record.update({'scrape_sn': round(scrape_sec, 3), 'analiz_sn': round(now - t0, 3),
+                           'sure_sn': round(now - started, 3)})
+            finish(record)
+
+        def after_scrape(url, started, scraping_result):
+            scrape_sec = time.perf_counter() - started
+            if not scraping_result.get('success'):
+                return finish({
+                    'url': url, 'success': False,
+                    'error': f"Scraping Hatası: {scraping_result.get('error', '')}",
+                    'scrape_sn': round(scrape_sec, 3), 'analiz_sn': 0.0, 'sure_sn': round(scrape_sec, 3)
+                })
+            try:
+                llm_pool.submit(analyze, url, started, scraping_result, scrape_sec)
+            except RuntimeError:
+                # Çalışma iptal edildi, havuz kapatıldı
+                finish(None)
+
+        def scrape(url):
+            if cancelled.is_set():
+                return finish(None)
+            started = time.perf_counter()
+            try:
+                scraping_result = self.scraper.extract_article_content(url)
+            except Exception as e:
+                scraping_result = {'success': False, 'error': str(e)}
+            after_scrape(url, started, scraping_result)
+
+        def scrape_async(url):
+            started = time.perf_counter()
+
+            def done(future):
+                try:
+                    scraping_result = future.result()
+                except Exception as e:
+                    scraping_result = {'success': False, 'error': str(e)}
+                after_scrape(url, started, scraping_result)
+
+            fetcher.submit(url).add_done_callback(done)
+
+        fetcher = None
+        if self.async_scrape:
+            from async_scraper import BackgroundAsyncScraper
+            fetcher = BackgroundAsyncScraper(max_connections=self.scrape_workers)
+
+        def feeder():
+            for url in urls:
+                in_flight.acquire()
+                if cancelled.is_set():
+                    in_flight.release()
+                    results.put(None)
+                    continue
+                if fetcher:
+                    scrape_async(url)
+                else:
+                    scrape_pool.submit(scrape, url)
+
+        threading.Thread(target=feeder, daemon=True, name='batch-feeder').start()
+
+        try:
+            for _ in range(len(urls)):
+                record = results.get()
+                if record is None:
+                    continue
+                if stats:
+                    stats.record(record)
+                yield record
+        finally:
+            cancelled.set()
+            scrape_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+            if fetcher:
+                fetcher.close()
+
+    def run(self, urls: List[str], output=None, checkpoint_path: Optional[str] = None) -> Dict:
+        """CLI akışı: checkpoint'i okur, sonuçları JSONL yazar, özeti döndürür"""
+        stats = BatchStats()
+        done = load_checkpoint(checkpoint_path)
+        pending = [url for url in urls if url not in done]
+        stats.skipped = len(urls) - len(pending)
+
+        checkpoint = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+        try:
+            for record in self.iter_results(pending, stats):
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+                if checkpoint:
+                    checkpoint.write(json.dumps({'url': record['url'], 'success': record['success']}) + '\n')
+                    checkpoint.flush()
+        finally:
+            if checkpoint:
+                checkpoint.close()
+        return stats.summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Medium makalelerini toplu analiz eder')
+    parser.add_argument('input', help='URL listesi (satır başına bir URL ya da {"url": ...} JSONL)')
+    parser.add_argument('-o', '--output', help='Sonuç JSONL dosyası (varsayılan: stdout)')
+    parser.add_argument('--checkpoint', help='Checkpoint dosyası (varsayılan: <output>.checkpoint)')
+    parser.add_argument('--scrape-workers', type=int, help='Eşzamanlı scraping (varsayılan: 8)')
+    parser.add_argument('--llm-workers', type=int, help='Eşzamanlı LLM analizi (varsayılan: 1)')
+    parser.add_argument('--async-scrape', action='store_true', default=None,
+                        help='Scraping için asyncio/HTTP/2 istemcisini kullan')
+    args = parser.parse_args(argv)
+
+    from scraper import MediumScraper
+    from analyzer import ContentAnalyzer
+
+    urls = read_urls(args.input)
+    checkpoint_path = args.checkpoint or (f"{args.output}.checkpoint" if args.output else None)
+    runner = BatchRunner(MediumScraper(), ContentAnalyzer(), args.scrape_workers, args.llm_workers,
+                         args.async_scrape)
+
+    output = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    try:
+        summary = runner.run(urls, output, checkpoint_path)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(json.dumps({'ozet': summary}, ensure_ascii=False), file=sys.stderr)
+    return 0 if summary['basarisiz'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import metrics
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+
+
+def normalize_content(text: str) -> str:
+    """Önbellek anahtarı için içeriği normalize eder (NFC + boşluk sadeleştirme)"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace('\u00a0', ' ')
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+# Paylaşım bağlantılarına eklenen ve içeriği değiştirmeyen parametreler
+TRACKING_PARAMS = {'source', 'gi', 'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src', 'trk'}
+
+
+def normalize_url(url: str) -> str:
+    """Aynı makalenin farklı yazımlarını tek anahtara indirger (fragment, büyük
+    harfli host, sondaki /, utm_* ve Medium'un ?source= gibi izleme parametreleri)"""
+    parts = urlsplit((url or '').strip())
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith('utm_')
+    ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def content_digest(article_data: Dict) -> str:
+    """Makalenin başlık + içerik özeti; farklı URL'lerden gelen aynı makaleyi eşler"""
+    material = normalize_content(article_data.get('title', '')) + '\n' + normalize_content(article_data.get('content', ''))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """Analiz sonuçları için bellek içi LRU + SQLite destekli kalıcı önbellek.
+
+    Anahtar; normalize edilmiş makale içeriği, checklist versiyonu, config
+    dosyalarının parmak izi ve model adından üretilir. Config değiştiğinde
+    eski parmak izine ait kayıtlar `purge_stale` ile silinir.
+    """
+
+    def __init__(self, db_path=None, max_items=256):
+        data_dir = os.getenv("DATA_DIR", DEFAULT_DATA_DIR)
+        self.db_path = os.getenv("ANALYSIS_CACHE_DB", db_path or os.path.join(data_dir, 'analysis_cache.sqlite3'))
+        self.max_items = int(os.getenv("ANALYSIS_CACHE_SIZE", max_items))
+        self.enabled = os.getenv("ANALYSIS_CACHE", "1") != "0"
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+
+        self._disk_ok = False
+        if self.enabled:
+            self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                    " cache_key TEXT PRIMARY KEY,"
+                    " fingerprint TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " payload TEXT NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_analysis_cache_fp ON analysis_cache(fingerprint)"
+                )
+            self._disk_ok = True
+        except Exception as e:
+            print(f"Önbellek veritabanı açılamadı ({self.db_path}): {e}")
+            self._disk_ok = False
+
+    @staticmethod
+    def make_key(article_data: Dict, fingerprint: str, model_name: str) -> str:
+        """İçerik adresli önbellek anahtarı üretir"""
+        material = json.dumps({
+            'title': normalize_content(article_data.get('title', '')),
+            'author': normalize_content(article_data.get('author', '')),
+            'content': normalize_content(article_data.get('content', '')),
+            'fingerprint': fingerprint,
+            'model': model_name,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                metrics.CACHE_REQUESTS.labels(cache='analiz', sonuc='bellek').inc()
+                return self._memory[key]
+
+        if self._disk_ok:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT payload FROM analysis_cache WHERE cache_key = ?", (key,)
+                    ).fetchone()
+                if row:
+                    value = json.loads(row[0])
+                    with self._lock:
+                        self._remember(key, value)
+                        self.stats['disk_hits'] += 1
+                    metrics.CACHE_REQUESTS.labels(cache='analiz', sonuc='disk').inc()
+                    return value
+            except Exception as e:
+                print(f"Önbellek okuma hatası: {e}")
+
+        with self._lock:
+            self.stats['misses'] += 1
+        metrics.CACHE_REQUESTS.labels(cache='analiz', sonuc='iska').inc()
+        return None
+
+    def set(self, key: str, value: Dict, fingerprint: str = ''):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._remember(key, value)
+            self.stats['writes'] += 1
+
+        if self._disk_ok:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO analysis_cache (cache_key, fingerprint, created_at, payload)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, fingerprint, time.time(), json.dumps(value, ensure_ascii=False))
+                    )
+            except Exception as e:
+                print(f"Önbellek yazma hatası: {e}")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def purge_stale(self, fingerprint: str):
+        """Güncel config parmak izine ait olmayan tüm kayıtları siler"""
+        with self._lock:
+            self._memory.clear()
+        if self._disk_ok:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM analysis_cache WHERE fingerprint != ?", (fingerprint,))
+            except Exception as e:
+                print(f"Önbellek temizleme hatası: {e}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_items'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        total = hits + stats['misses']
+        stats['hits'] = hits
+        stats['hit_ratio'] = round(hits / total, 3) if total else 0.0
+        stats['enabled'] = self.enabled
+        stats['persistent'] = self._disk_ok
+        return stats
+
+
+class PageCache:
+    """Scrape edilen sayfalar için koşullu GET önbelleği.
+
+    Her URL için ETag/Last-Modified ile birlikte zaten çıkarılmış
+    {title, author, content} saklanır. Sonraki isteklerde If-None-Match /
+    If-Modified-Since gönderilir; 304 gelirse HTML indirilmeden ve
+    ayrıştırılmadan saklı çıkarım kullanılır. Toplam boyut sınırı aşılınca
+    en uzun süredir kullanılmayan kayıtlar silinir (LRU).
+    """
+
+    def __init__(self, db_path=None, ttl_seconds=7 * 24 * 3600, max_bytes=50 * 1024 * 1024):
+        data_dir = os.getenv("DATA_DIR", DEFAULT_DATA_DIR)
+        self.db_path = os.getenv("PAGE_CACHE_DB", db_path or os.path.join(data_dir, 'page_cache.sqlite3'))
+        self.ttl_seconds = int(os.getenv("PAGE_CACHE_TTL_SECONDS", ttl_seconds))
+        self.max_bytes = int(float(os.getenv("PAGE_CACHE_MAX_MB", max_bytes / (1024 * 1024))) * 1024 * 1024)
+        self.enabled = os.getenv("PAGE_CACHE", "1") != "0"
+
+        self._lock = threading.Lock()
+        self.stats = {'revalidated': 0, 'refetched': 0, 'misses': 0, 'evictions': 0}
+
+        self._disk_ok = False
+        if self.enabled:
+            self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS page_cache ("
+                    " url TEXT PRIMARY KEY,"
+                    " etag TEXT,"
+                    " last_modified TEXT,"
+                    " article TEXT NOT NULL,"
+                    " size INTEGER NOT NULL,"
+                    " stored_at REAL NOT NULL,"
+                    " last_access REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_page_cache_access ON page_cache(last_access)")
+            self._disk_ok = True
+        except Exception as e:
+            print(f"Sayfa önbelleği açılamadı ({self.db_path}): {e}")
+            self._disk_ok = False
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return normalize_url(url)
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Geçerli kaydı {'etag', 'last_modified', 'article'} olarak döndürür"""
+        if not self._disk_ok:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT etag, last_modified, article, stored_at FROM page_cache WHERE url = ?",
+                    (self._key(url),)
+                ).fetchone()
+                if not row:
+                    with self._lock:
+                        self.stats['misses'] += 1
+                    metrics.CACHE_REQUESTS.labels(cache='sayfa', sonuc='iska').inc()
+                    return None
+                if time.time() - row[3] > self.ttl_seconds:
+                    conn.execute("DELETE FROM page_cache WHERE url = ?", (self._key(url),))
+                    with self._lock:
+                        self.stats['misses'] += 1
+                    metrics.CACHE_REQUESTS.labels(cache='sayfa', sonuc='suresi_dolmus').inc()
+                    return None
+            return {'etag': row[0], 'last_modified': row[1], 'article': json.loads(row[2])}
+        except Exception as e:
+            print(f"Sayfa önbelleği okuma hatası: {e}")
+            return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict:
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def mark_revalidated(self, url: str):
+        """304 sonrası kaydın tazeliğini ve LRU konumunu günceller"""
+        with self._lock:
+            self.stats['revalidated'] += 1
+        metrics.CACHE_REQUESTS.labels(cache='sayfa', sonuc='304').inc()
+        if not self._disk_ok:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE page_cache SET stored_at = ?, last_access = ? WHERE url = ?",
+                    (now, now, self._key(url))
+                )
+        except Exception as e:
+            print(f"Sayfa önbelleği güncelleme hatası: {e}")
+
+    def set(self, url: str, etag: Optional[str], last_modified: Optional[str], article: Dict):
+        if not self._disk_ok or not (etag or last_modified):
+            return
+        payload = json.dumps(
+            {k: article.get(k) for k in ('title', 'author', 'content', 'word_count')},
+            ensure_ascii=False
+        )
+        now = time.time()
+        with self._lock:
+            self.stats['refetched'] += 1
+        metrics.CACHE_REQUESTS.labels(cache='sayfa', sonuc='yeniden_indirildi').inc()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO page_cache"
+                    " (url, etag, last_modified, article, size, stored_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self._key(url), etag, last_modified, payload, len(payload.encode('utf-8')), now, now)
+                )
+                self._evict(conn)
+        except Exception as e:
+            print(f"Sayfa önbelleği yazma hatası: {e}")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT url, size FROM page_cache ORDER BY last_access ASC").fetchall()
+        removed = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            removed.append((url,))
+            total -= size
+        conn.executemany("DELETE FROM page_cache WHERE url = ?", removed)
+        with self._lock:
+            self.stats['evictions'] += len(removed)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['enabled'] = self.enabled
+        stats['persistent'] = self._disk_ok
+        return stats
@@ -0,0 +1,240 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+# Türkçe ekler için kaba kök: kelimenin ilk 5 harfi ("lisanslı" ~ "lisans")
+STEM_LEN = 5
+
+# Kural sorgularından atılan dolgu kelimeleri (Türkçe/İngilizce) ve checklist
+# başlıklarında geçen, her metinde bulunan genel terimler
+STOPWORDS = {
+    've', 'ile', 'bir', 'bu', 'şu', 'da', 'de', 'ki', 'mi', 'için', 'gibi', 'daha', 'çok', 'en', 'ne',
+    'ya', 'veya', 'ama', 'ise', 'her', 'olan', 'olarak', 'kadar', 'değil', 'var', 'yok', 'dil', 'dili',
+    'veri', 'bilgi', 'içerik', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'is', 'are',
+    'an', 'use', 'pre', 'not', 'no',
+}
+
+# Kod satırı: satır başında anahtar kelime/istem ya da kısa, kod biçimli satır
+CODE_LINE_START_RE = re.compile(
+    r'^\s*(def |class |import |from \S+ import |function |const |let |var |SELECT |\$ |>>> |#include|```)'
+)
+CODE_LINE_RE = re.compile(
+    r'^(\s{4,}|\t)\S'                                # girintili blok
+    r'|^\s*[\w.\[\]]+\s*(=|\+=|:=)\s*\S[^ ]*$'       # tek ifadeli atama
+    r'|^\s*[\w.]+\([^)]*\)\s*;?\s*$'                 # tek başına çağrı
+    r'|[{};]\s*$'
+)
+CODE_MAX_LINE_CHARS = 120
+# Görsel altyazısı: yalnızca kısa paragraflarda ve açık atıf kalıplarıyla
+CAPTION_HINT_RE = re.compile(
+    r'(?i)((görsel|resim|fotoğraf|kaynak|source|image|photo)\s*:|photo by|image by|image credit|'
+    r'photo credit|görsel kaynağı|unsplash|pexels|pixabay|\bcc0\b|\bcc by\b|©)'
+)
+CAPTION_MAX_CHARS = 300
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+MAX_BLOCK_CHARS = 600
+MAX_PARAGRAPH_CHARS = 1200
+GAP_MARKER = '[...]'
+
+
+def tokenize(text: str) -> List[str]:
+    return [t[:STEM_LEN] for t in TOKEN_RE.findall(text.casefold()) if len(t) > 1]
+
+
+def query_terms(text: str) -> List[str]:
+    return [t[:STEM_LEN] for t in TOKEN_RE.findall(text.casefold()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def looks_like_code(paragraph: str) -> bool:
+    """Paragraf kod bloğu mu: anahtar kelimeyle başlayan satır ya da en az iki
+    satırın çoğunluğu kısa, kod biçimli satırlar"""
+    lines = [line for line in paragraph.splitlines() if line.strip()]
+    if any(CODE_LINE_START_RE.match(line) for line in lines):
+        return True
+    code_lines = sum(1 for line in lines if len(line) <= CODE_MAX_LINE_CHARS and CODE_LINE_RE.search(line))
+    return code_lines >= 2 and code_lines * 2 >= len(lines)
+
+
+def estimate_tokens(text: str) -> int:
+    # llama tokenizer için kaba tahmin: ~4 karakter/token
+    return max(1, len(text) // 4)
+
+
+class ContentSelector:
+    """Sabit content[:3000] kesimi yerine kurallara göre ilgili paragrafları seçer.
+
+    Kural sorguları (anahtar_kelimeler + başlık terimleri) config yüklenirken
+    bir kez hazırlanır. Her makale için paragraflar BM25 ile her kurala göre
+    puanlanır, en ilgili paragraflar kurallar arasında sırayla token
+    bütçesine yerleştirilir. Kod blokları ve görsel altyazıları bütçenin en
+    fazla `CONTENT_PROTECTED_SHARE` kadarını kaplayacak şekilde önce
+    tutulur; seçim makale sırasıyla döner.
+    """
+
+    def __init__(self, checklist: Dict, token_budget: int = None):
+        self.token_budget = token_budget or int(os.getenv("CONTENT_TOKEN_BUDGET", "750"))
+        self.protected_share = float(os.getenv("CONTENT_PROTECTED_SHARE", "0.4"))
+        self.rule_queries = {}
+        for rule in checklist.get('kontrol_maddeleri', []):
+            terms = []
+            for kw in rule.get('anahtar_kelimeler', []):
+                terms.extend(query_terms(kw))
+            terms.extend(query_terms(rule.get('baslik', '')))
+            self.rule_queries[rule['id']] = list(dict.fromkeys(terms))
+
+    @staticmethod
+    def split_paragraphs(content: str) -> List[str]:
+        return [p.strip() for p in re.split(r'\n\s*\n', content or '') if p.strip()]
+
+    @staticmethod
+    def is_protected(paragraph: str) -> bool:
+        """Kod bloğu ya da görsel altyazısı gibi her zaman tutulacak paragraflar"""
+        if looks_like_code(paragraph):
+            return True
+        return len(paragraph) <= CAPTION_MAX_CHARS and bool(CAPTION_HINT_RE.search(paragraph))
+
+    def _bm25_rankings(self, paragraphs: List[str], rule_ids: List[str]) -> Dict[str, List[int]]:
+        docs = [Counter(tokenize(p)) for p in paragraphs]
+        lengths = [sum(d.values()) for d in docs]
+        avg_len = (sum(lengths) / len(lengths)) if lengths else 0.0
+        n = len(docs)
+        df = Counter()
+        for d in docs:
+            df.update(d.keys())
+
+        rankings = {}
+        for rule_id in rule_ids:
+            scores = []
+            for i, d in enumerate(docs):
+                score = 0.0
+                for term in self.rule_queries.get(rule_id, []):
+                    tf = d.get(term)
+                    # Paragrafların yarısından fazlasında geçen terim ayırt edici değildir
+                    if not tf or (n >= 4 and df[term] * 2 > n):
+                        continue
+                    idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[i] / (avg_len or 1))
+                    score += idf * tf * (BM25_K1 + 1) / norm
+                if score > 0:
+                    scores.append((score, i))
+            scores.sort(key=lambda x: (-x[0], x[1]))
+            rankings[rule_id] = [i for _, i in scores]
+        return rankings
+
+    def select(self, content: str, rule_ids: Optional[List[str]] = None) -> str:
+        """Token bütçesine sığan, kurallarla en ilgili içeriği döndürür"""
+        content = content or ''
+        if estimate_tokens(content) <= self.token_budget:
+            return content
+
+        paragraphs = self.split_paragraphs(content)
+        if not paragraphs:
+            return content[:self.token_budget * 4]
+
+        rule_ids = rule_ids or list(self.rule_queries)
+        clipped = []
+        for p in paragraphs:
+            limit = MAX_BLOCK_CHARS if self.is_protected(p) else MAX_PARAGRAPH_CHARS
+            clipped.append(p if len(p) <= limit else p[:limit] + ' …')
+        costs = [estimate_tokens(p) for p in clipped]
+
+        selected = set()
+        used = 0
+
+        def take(i):
+            nonlocal used
+            if i in selected or used + costs[i] > self.token_budget:
+                return False
+            selected.add(i)
+            used += costs[i]
+            return True
+
+        # Giriş paragrafı bağlam için, ardından bütçenin bir payı kadar kod
+        # blokları ve altyazılar (kalan bütçe kural sıralamasına kalır)
+        take(0)
+        protected_budget = self.token_budget * self.protected_share
+        protected_used = 0
+        for i, p in enumerate(paragraphs):
+            if self.is_protected(p) and protected_used + costs[i] <= protected_budget and take(i):
+                protected_used += costs[i]
+
+        # Kurallar arasında sırayla, her kuralın bir sonraki en ilgili paragrafı
+        rankings = self._bm25_rankings(paragraphs, rule_ids)
+        depth = 0
+        while used < self.token_budget:
+            progressed = False
+            for rule_id in rule_ids:
+                ranked = rankings.get(rule_id, [])
+                if depth < len(ranked):
+                    progressed = True
+                    take(ranked[depth])
+            if not progressed:
+                break
+            depth += 1
+
+        # Kalan bütçeyi makale sırasıyla doldur
+        for i in range(len(paragraphs)):
+            if used >= self.token_budget:
+                break
+            take(i)
+
+        parts = []
+        previous = -1
+        for i in sorted(selected):
+            if previous != -1 and i != previous + 1:
+                parts.append(GAP_MARKER)
+            parts.append(clipped[i])
+            previous = i
+        if previous != len(paragraphs) - 1:
+            parts.append(GAP_MARKER)
+        return '\n\n'.join(parts)
+
+
+def chunk_content(content: str, chunk_tokens: int, overlap_tokens: int = 0) -> List[Dict]:
+    """İçeriği paragraf sınırlarında, örtüşen parçalara böler.
+
+    Her parça bir önceki parçanın son paragraflarını (yaklaşık overlap_tokens
+    kadar) tekrar içerir; böylece iki parçanın sınırına düşen bir ifade de
+    bütün olarak görülür. Bütçeden büyük tek paragraflar karakter bazında
+    bölünür. Dönen öğeler: {'parca', 'baslangic_paragraf', 'token_tahmini', 'metin'}
+    """
+    max_chars = max(1, chunk_tokens * 4)
+    paragraphs = []
+    for p in ContentSelector.split_paragraphs(content):
+        while len(p) > max_chars:
+            paragraphs.append(p[:max_chars])
+            p = p[max_chars:]
+        if p:
+            paragraphs.append(p)
+
+    chunks = []
+    start = 0
+    while start < len(paragraphs):
+        end = start
+        used = 0
+        while end < len(paragraphs) and (end == start or used + estimate_tokens(paragraphs[end]) <= chunk_tokens):
+            used += estimate_tokens(paragraphs[end])
+            end += 1
+        chunks.append({
+            'parca': len(chunks),
+            'baslangic_paragraf': start,
+            'token_tahmini': used,
+            'metin': '\n\n'.join(paragraphs[start:end])
+        })
+        if end >= len(paragraphs):
+            break
+
+        # Sonraki parça, bu parçanın sonundaki örtüşme paragraflarıyla başlar
+        next_start = end
+        overlap = 0
+        while next_start - 1 > start and overlap + estimate_tokens(paragraphs[next_start - 1]) <= overlap_tokens:
+            next_start -= 1
+            overlap += estimate_tokens(paragraphs[next_start])
+        start = next_start
+    return chunks
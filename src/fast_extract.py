@@ -0,0 +1,274 @@
+import html
+import os
+import re
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lxml import etree
+
+
+CONTENT_TAGS = ('p', 'li', 'pre', 'code', 'h2', 'h3', 'h4')
+# Metni BeautifulSoup.get_text() tarafından zaten sayılmayan öğeler
+SKIP_TAGS = ('script', 'style', 'template')
+# Toplu normalizasyonda paragrafları ayıran işaret (boşluk sayılmaz, entity'leri bölmez)
+SEPARATOR = '\x00'
+WHITESPACE_RE = re.compile(r'\s+')
+# Ayrıştırmadan önce ham HTML'de aranan makale kapsayıcıları (öncelik sırasıyla)
+CONTAINER_TAGS = ('article', 'main')
+# Kapsayıcıdan sonraki kısımda (küçük harfe çevrilmiş) aranan işaretler: biri
+# geçiyorsa tam yürüyüşün sonucu değişebilir, tüm belge ayrıştırılır.
+# Sıraları TITLE/AUTHOR/CONTENT_MATCHERS ile aynıdır.
+TITLE_MARKERS = ('storytitle', 'graf--title', '<h1', 'graf--title', 'og:title')
+AUTHOR_MARKERS = ('authorname', 'author-name', 'js-authorname', 'author', 'author')
+CONTENT_MARKERS = ('storycontent', '<article', '<article', 'postarticle-content', 'section-content',
+                   '<section', 'data-field')
+PARAGRAPH_MARKERS = ('<p>', '<p ')
+LDJSON_MARKER = 'ld+json'
+
+
+def _text(el) -> str:
+    # BeautifulSoup get_text() karşılığı: öğenin ve alt öğelerinin metni
+    return ''.join(el.itertext())
+
+
+def _has_class(el, name: str) -> bool:
+    return name in (el.get('class') or '').split()
+
+
+# MediumScraper'daki CSS seçicilerinin birebir karşılıkları; sıra önemlidir
+TITLE_MATCHERS = [
+    lambda el, in_article: el.tag == 'h1' and el.get('data-testid') == 'storyTitle',
+    lambda el, in_article: el.tag == 'h1' and _has_class(el, 'graf--title'),
+    lambda el, in_article: el.tag == 'h1',
+    lambda el, in_article: _has_class(el, 'graf--title'),
+    lambda el, in_article: el.tag == 'meta' and el.get('property') == 'og:title',
+]
+
+AUTHOR_MATCHERS = [
+    lambda el, in_article: el.get('data-testid') == 'authorName',
+    lambda el, in_article: _has_class(el, 'author-name'),
+    lambda el, in_article: _has_class(el, 'js-authorName'),
+    lambda el, in_article: el.tag == 'meta' and el.get('name') == 'author',
+    lambda el, in_article: el.tag == 'a' and ' '.join((el.get('rel') or '').split()) == 'author',
+]
+
+CONTENT_MATCHERS = [
+    lambda el, in_article: el.get('data-testid') == 'storyContent',
+    lambda el, in_article: el.tag == 'section' and in_article,
+    lambda el, in_article: el.tag == 'article',
+    lambda el, in_article: _has_class(el, 'postArticle-content'),
+    lambda el, in_article: _has_class(el, 'section-content'),
+    lambda el, in_article: el.tag == 'section' and el.get('tabindex') is not None,
+    lambda el, in_article: el.tag == 'div' and el.get('data-field') == 'body',
+]
+
+
+class LxmlExtractor:
+    """lxml tabanlı hızlı çıkarım: BeautifulSoup/html.parser yolunun çıktısını
+    birebir üretmeyi hedefler.
+
+    - sayfada <article>/<main> varsa belge kapsayıcının son kapanışında
+      kesilir (öneriler, yorumlar ve alt bilgi ağaca girmez). Kesilen kısım
+      başlık/yazar/içerik seçicilerinden, seçilenden daha öncelikli birine
+      ya da ld+json'a uyabilecek bir öğe içeriyorsa tüm belge ayrıştırılır
+    - script/style öğeleri (ld+json okunduktan sonra) en başta ağaçtan atılır
+    - başlık, yazar ve içerik kapsayıcıları tek bir ağaç yürüyüşünde bulunur
+    - paragraf metinleri tek seferde normalize edilir (clean_text ile aynı sonuç)
+    """
+
+    def __init__(self, clean_text: Callable[[str], str], ldjson_from_texts: Callable[[List[str]], Optional[Dict]],
+                 article_first: Optional[bool] = None):
+        self.clean_text = clean_text
+        if article_first is None:
+            article_first = os.getenv("SCRAPER_ARTICLE_FIRST", "1") != "0"
+        self.article_first = article_first
+        self.ldjson_from_texts = ldjson_from_texts
+        self._parser = etree.HTMLParser(remove_comments=True, remove_pis=True)
+
+    def clean_many(self, texts: List[str]) -> List[str]:
+        """clean_text'i tüm listeye tek geçişte uygular"""
+        if not texts:
+            return []
+        joined = SEPARATOR.join(texts)
+        parts = self.clean_text_keep_separator(joined).split(SEPARATOR)
+        if len(parts) != len(texts):
+            # Metnin kendisi ayırıcı içeriyorsa tek tek işle
+            return [self.clean_text(t) for t in texts]
+        return [p.strip() for p in parts]
+
+    @staticmethod
+    def clean_text_keep_separator(text: str) -> str:
+        """clean_text ile aynı adımlar; strip her parça için ayrıca yapılır"""
+        text = html.unescape(text)
+        text = unicodedata.normalize("NFC", text)
+        text = text.replace('\u00a0', ' ')
+        return WHITESPACE_RE.sub(' ', text)
+
+    @staticmethod
+    def _in_script(html_text: str, pos: int) -> bool:
+        opening = html_text.rfind('<script', 0, pos)
+        return opening != -1 and html_text.rfind('</script', opening, pos) == -1
+
+    @staticmethod
+    def _head_metadata(head: str) -> str:
+        """<head> içinden ld+json dışındaki script/style bloklarını atar
+        (uygulama durumu gibi büyük bloklar ayrıştırılmaz)"""
+        parts = []
+        pos = 0
+        while True:
+            starts = [i for i in (head.find('<script', pos), head.find('<style', pos)) if i != -1]
+            if not starts:
+                parts.append(head[pos:])
+                return ''.join(parts)
+            start = min(starts)
+            tag_end = head.find('>', start)
+            closing = '</script>' if head.startswith('<script', start) else '</style>'
+            end = head.find(closing, tag_end)
+            if tag_end == -1 or end == -1:
+                parts.append(head[pos:])
+                return ''.join(parts)
+            end += len(closing)
+            keep = 'application/ld+json' in head[start:tag_end]
+            parts.append(head[pos:end] if keep else head[pos:start])
+            pos = end
+
+    @classmethod
+    def split_at_container(cls, html_text: str) -> Optional[Tuple[str, str]]:
+        """(<head> meta verisi + gövdenin son <article> (yoksa <main>)
+        kapanışına kadarki kısmı, kalan kısım); script içindeki etiketler
+        sayılmaz. Kapsayıcı yoksa None"""
+        head_end = html_text.find('</head>')
+        body_start = head_end + len('</head>') if head_end != -1 else 0
+        for tag in CONTAINER_TAGS:
+            start = html_text.find(f'<{tag}', body_start)
+            while start != -1 and (html_text[start + len(tag) + 1:start + len(tag) + 2] not in ('>', ' ', '\n', '\t')
+                                   or cls._in_script(html_text, start)):
+                start = html_text.find(f'<{tag}', start + 1)
+            if start == -1:
+                continue
+            end = html_text.rfind(f'</{tag}>')
+            while end > start and cls._in_script(html_text, end):
+                end = html_text.rfind(f'</{tag}>', start, end)
+            if end <= start:
+                continue
+            end += len(tag) + 3
+            head = cls._head_metadata(html_text[:body_start]) if head_end != -1 else ''
+            return f"{head}{html_text[body_start:end]}", html_text[end:]
+        return None
+
+    def extract(self, html_text: str) -> Dict[str, str]:
+        if self.article_first and html_text:
+            parts = self.split_at_container(html_text)
+            if parts:
+                fields, markers = self._extract(parts[0])
+                tail = parts[1].lower()
+                if fields['content'] and not any(marker in tail for marker in markers):
+                    return fields
+        return self._extract(html_text)[0]
+
+    def _extract(self, html_text: str) -> Tuple[Dict[str, str], set]:
+        """(alanlar, kesilen kısımda geçmemesi gereken işaretler)"""
+        root = etree.fromstring(html_text, self._parser) if html_text and html_text.strip() else None
+        if root is None:
+            return {'title': '', 'author': '', 'content': ''}, set()
+
+        ld_texts = []
+        for el in list(root.iter(*SKIP_TAGS)):
+            if el.tag == 'script' and el.get('type') == 'application/ld+json' and el.text:
+                ld_texts.append(el.text)
+            self._drop(el)
+
+        title_hits = [None] * len(TITLE_MATCHERS)
+        author_hits = [None] * len(AUTHOR_MATCHERS)
+        content_hits = [[] for _ in CONTENT_MATCHERS]
+        title_tag = None
+        all_paragraphs = []
+
+        article_depth = 0
+        for event, el in etree.iterwalk(root, events=('start', 'end')):
+            tag = el.tag
+            if not isinstance(tag, str):
+                continue
+            if event == 'end':
+                if tag == 'article':
+                    article_depth -= 1
+                continue
+
+            in_article = article_depth > 0
+            for i, match in enumerate(TITLE_MATCHERS):
+                if title_hits[i] is None and match(el, in_article):
+                    title_hits[i] = el
+            for i, match in enumerate(AUTHOR_MATCHERS):
+                if author_hits[i] is None and match(el, in_article):
+                    author_hits[i] = el
+            for i, match in enumerate(CONTENT_MATCHERS):
+                if match(el, in_article):
+                    content_hits[i].append(el)
+            if tag == 'title' and title_tag is None:
+                title_tag = el
+            elif tag == 'p':
+                all_paragraphs.append(el)
+
+            if tag == 'article':
+                article_depth += 1
+
+        ld = self.ldjson_from_texts(ld_texts)
+        title = (ld or {}).get('title') or ''
+        author = (ld or {}).get('author') or ''
+        markers = {LDJSON_MARKER}
+
+        if not title:
+            title = self._first_text(title_hits)
+            if not title and title_tag is not None:
+                title = self.clean_text(_text(title_tag))
+            markers.update(TITLE_MARKERS[:self._first_hit(title_hits)])
+
+        content, used = self._content(content_hits, all_paragraphs)
+        markers.update(CONTENT_MARKERS[:used + 1])
+        if used == len(CONTENT_MATCHERS):
+            markers.update(PARAGRAPH_MARKERS)
+
+        if not author:
+            author = self._first_text(author_hits)
+            markers.update(AUTHOR_MARKERS[:self._first_hit(author_hits)])
+
+        return {'title': title, 'author': author, 'content': content}, markers
+
+    @staticmethod
+    def _drop(el):
+        parent = el.getparent()
+        if parent is None:
+            return
+        if el.tail:
+            prev = el.getprevious()
+            if prev is not None:
+                prev.tail = (prev.tail or '') + el.tail
+            else:
+                parent.text = (parent.text or '') + el.tail
+        parent.remove(el)
+
+    @staticmethod
+    def _first_hit(hits) -> int:
+        return next((i for i, el in enumerate(hits) if el is not None), len(hits))
+
+    def _first_text(self, hits) -> str:
+        for el in hits:
+            if el is not None:
+                if el.tag == 'meta':
+                    return self.clean_text(el.get('content', ''))
+                return self.clean_text(_text(el))
+        return ""
+
+    def _content(self, content_hits, all_paragraphs) -> Tuple[str, int]:
+        """(içerik, kullanılan seçicinin sırası; tüm <p>'lere dönüldüyse seçici sayısı)"""
+        for i, nodes in enumerate(content_hits):
+            if not nodes:
+                continue
+            raw = [_text(para) for el in nodes for para in el.iterdescendants(*CONTENT_TAGS)]
+            paragraphs = [t for t in self.clean_many(raw) if t and len(t) > 5]
+            if paragraphs:
+                return '\n\n'.join(paragraphs), i
+
+        raw = [_text(p) for p in all_paragraphs]
+        paragraphs = [t for t in self.clean_many(raw) if t and len(t) > 10]
+        return '\n\n'.join(paragraphs), len(CONTENT_MATCHERS)
@@ -0,0 +1,66 @@
+import time
+
+
+def format_rule_for_api(detail):
+    rule = {
+        'id': detail.get('kural_id', ''),
+        'baslik': detail.get('kural_baslik', ''),
+        'durum': detail.get('durum', ''),
+        'puan': detail.get('puan', 0),
+        'aciklama': detail.get('aciklama', ''),
+        'ornekler': detail.get('ornek', '')
+    }
+    if 'katman' in detail:
+        rule['katman'] = detail['katman']
+    return rule
+
+
+def format_analysis_for_api(analysis_result):
+    try:
+        makale = analysis_result['makale_bilgi']
+        final = analysis_result['final_puanlama']
+        detaylar = analysis_result['analiz_sonucu'].get('detaylar', [])
+
+        emoji_map = {
+            'mukemmel': '🏆',
+            'iyi': '✅',
+            'orta': '⚠️',
+            'zayif': '❌',
+            'basarisiz': '🚫'
+        }
+
+        uygun_kurallar = []
+        uygun_olmayan_kurallar = []
+
+        for detail in detaylar:
+            rule_data = format_rule_for_api(detail)
+            if detail.get('durum') == 'uygun':
+                uygun_kurallar.append(rule_data)
+            else:
+                uygun_olmayan_kurallar.append(rule_data)
+
+        formatted = {
+            'id': f"analysis_{int(time.time())}",
+            'timestamp': analysis_result.get('timestamp'),
+            'makale': makale,
+            'puan': {
+                'deger': final.get('puan', 0),
+                'kategori': final.get('kategori', 'basarisiz'),
+                'aciklama': final.get('aciklama', ''),
+                'emoji': emoji_map.get(final.get('kategori', 'basarisiz'), '📊')
+            },
+            'kural_analizi': {
+                'toplam_kural': len(detaylar),
+                'uygun': len(uygun_kurallar),
+                'uygun_olmayan': len(uygun_olmayan_kurallar),
+                'uygun_kurallar': uygun_kurallar,
+                'uygun_olmayan_kurallar': uygun_olmayan_kurallar
+            },
+            'oneri': analysis_result['analiz_sonucu'].get('oneriler', [])
+        }
+        for key in ('artimli_analiz', 'benzerlik', 'kademe'):
+            if key in analysis_result['analiz_sonucu']:
+                formatted[key] = analysis_result['analiz_sonucu'][key]
+        return formatted
+    except Exception as e:
+        return {'error': f'Format hatası: {str(e)}', 'raw_data': analysis_result}
@@ -0,0 +1,453 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from queue import Empty, Queue
+from typing import Dict, List, Optional, Tuple
+
+from cache import DEFAULT_DATA_DIR, normalize_url
+import startup
+
+
+# /history?donem= kısayolları
+PERIODS = ('bugun', 'bu_hafta', 'bu_ay')
+
+
+def period_start(period: str, now: Optional[datetime] = None) -> Optional[float]:
+    now = now or datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'bugun':
+        return midnight.timestamp()
+    if period == 'bu_hafta':
+        return (midnight - timedelta(days=midnight.weekday())).timestamp()
+    if period == 'bu_ay':
+        return midnight.replace(day=1).timestamp()
+    return None
+
+
+def parse_date(value: Optional[str]) -> Optional[float]:
+    """'2024-05-01' ya da '2024-05-01T10:00:00' biçimini zaman damgasına çevirir"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class HistoryStore:
+    """Analiz geçmişi: SQLite (WAL) üzerinde, tüm gunicorn worker'larınca paylaşılır.
+
+    - URL, zaman, puan, kategori ve kural bazında durum indekslidir
+    - Yazmalar istek yolunda yapılmaz: kuyruğa alınır, arka plan thread'i
+      toplu olarak tek transaction'da yazar
+    - /history sorguları id tabanlı imleçle (cursor) sayfalanır
+    - Aynı URL'nin son analizi yeniden analiz yapılmadan döndürülebilir
+    """
+
+    def __init__(self, db_path=None, flush_interval=0.2, batch_size=100):
+        data_dir = os.getenv("DATA_DIR", DEFAULT_DATA_DIR)
+        self.db_path = os.getenv("HISTORY_DB", db_path or os.path.join(data_dir, 'history.sqlite3'))
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " url TEXT NOT NULL,"
+                " url_key TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " puan INTEGER,"
+                " kategori TEXT,"
+                " baslik TEXT,"
+                " yazar TEXT,"
+                " fingerprint TEXT,"
+                " payload TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rule_results ("
+                " analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,"
+                " kural_id TEXT NOT NULL,"
+                " durum TEXT,"
+                " puan REAL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_url ON analyses(url_key, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_puan ON analyses(puan)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_kategori ON analyses(kategori, created_at)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_rule_results_rule ON rule_results(kural_id, durum, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rule_results_analysis ON rule_results(analysis_id)")
+            # /analytics kısmi gün aralıkları yalnızca zamana göre süzer
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_rule_results_created ON rule_results(created_at, kural_id, durum)")
+
+            # Özet (rollup) tablolar: her kayıtla aynı transaction'da artırılır;
+            # /analytics geçmişin boyutundan bağımsız olarak bunları okur
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup_rule_status ("
+                " gun TEXT NOT NULL, kural_id TEXT NOT NULL, durum TEXT NOT NULL, adet INTEGER NOT NULL,"
+                " PRIMARY KEY (gun, kural_id, durum))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup_score_hist ("
+                " gun TEXT NOT NULL, kategori TEXT NOT NULL, kova INTEGER NOT NULL, adet INTEGER NOT NULL,"
+                " PRIMARY KEY (gun, kategori, kova))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup_author ("
+                " gun TEXT NOT NULL, yazar TEXT NOT NULL, adet INTEGER NOT NULL, puan_toplam REAL NOT NULL,"
+                " PRIMARY KEY (gun, yazar))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollup_daily ("
+                " gun TEXT PRIMARY KEY, adet INTEGER NOT NULL, puan_toplam REAL NOT NULL)"
+            )
+            has_history = conn.execute("SELECT 1 FROM analyses LIMIT 1").fetchone()
+            has_rollups = conn.execute("SELECT 1 FROM rollup_daily LIMIT 1").fetchone()
+        if has_history and not has_rollups:
+            self.rebuild_rollups()
+
+        self._start_writer()
+        startup.after_fork(self._start_writer)
+        atexit.register(self.flush)
+
+    def _start_writer(self):
+        self._queue = Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name='history-writer')
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # --- Yazma ---
+
+    def add(self, analysis_data: Dict, fingerprint: str = ''):
+        """format_analysis_for_api çıktısını yazma kuyruğuna ekler (bloklamaz)"""
+        self._queue.put((time.time(), analysis_data, fingerprint))
+
+    def flush(self, timeout: float = 5.0):
+        """Kuyruktaki tüm kayıtlar yazılana kadar bekler"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _write_loop(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except Empty:
+                    break
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"Geçmiş yazma hatası ({len(batch)} kayıt): {e}")
+            for waiter in waiters:
+                waiter.set()
+
+    @staticmethod
+    def _rule_rows(data: Dict) -> List[Tuple]:
+        analysis = data.get('kural_analizi', {})
+        return [
+            (rule.get('id'), rule.get('durum'), rule.get('puan'))
+            for rule in analysis.get('uygun_kurallar', []) + analysis.get('uygun_olmayan_kurallar', [])
+            if rule.get('id')
+        ]
+
+    def _write_batch(self, batch):
+        with self._connect() as conn:
+            for created_at, data, fingerprint in batch:
+                makale = data.get('makale', {})
+                puan = data.get('puan', {})
+                url = makale.get('url', '')
+                cursor = conn.execute(
+                    "INSERT INTO analyses (url, url_key, created_at, puan, kategori, baslik, yazar, fingerprint, payload)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, normalize_url(url), created_at, puan.get('deger'), puan.get('kategori'),
+                     makale.get('baslik'), makale.get('yazar'), fingerprint,
+                     json.dumps(data, ensure_ascii=False))
+                )
+                conn.executemany(
+                    "INSERT INTO rule_results (analysis_id, kural_id, durum, puan, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, kural_id, durum, rule_puan, created_at)
+                     for kural_id, durum, rule_puan in self._rule_rows(data)]
+                )
+                self._update_rollups(conn, created_at, data)
+
+    @staticmethod
+    def score_bucket(puan) -> int:
+        """0-100 puanı 10'luk kovaya indirger (100, 90 kovasına düşer)"""
+        try:
+            return min(int(puan) // 10, 9) * 10
+        except (TypeError, ValueError):
+            return 0
+
+    def _update_rollups(self, conn, created_at: float, data: Dict):
+        gun = datetime.fromtimestamp(created_at).strftime('%Y-%m-%d')
+        puan = data.get('puan', {})
+        score = puan.get('deger') or 0
+        conn.executemany(
+            "INSERT INTO rollup_rule_status (gun, kural_id, durum, adet) VALUES (?, ?, ?, 1)"
+            " ON CONFLICT(gun, kural_id, durum) DO UPDATE SET adet = adet + 1",
+            [(gun, kural_id, durum or 'bilinmiyor') for kural_id, durum, _ in self._rule_rows(data)]
+        )
+        conn.execute(
+            "INSERT INTO rollup_score_hist (gun, kategori, kova, adet) VALUES (?, ?, ?, 1)"
+            " ON CONFLICT(gun, kategori, kova) DO UPDATE SET adet = adet + 1",
+            (gun, puan.get('kategori') or 'bilinmiyor', self.score_bucket(score))
+        )
+        conn.execute(
+            "INSERT INTO rollup_author (gun, yazar, adet, puan_toplam) VALUES (?, ?, 1, ?)"
+            " ON CONFLICT(gun, yazar) DO UPDATE SET adet = adet + 1, puan_toplam = puan_toplam + excluded.puan_toplam",
+            (gun, data.get('makale', {}).get('yazar') or 'bilinmiyor', score)
+        )
+        conn.execute(
+            "INSERT INTO rollup_daily (gun, adet, puan_toplam) VALUES (?, 1, ?)"
+            " ON CONFLICT(gun) DO UPDATE SET adet = adet + 1, puan_toplam = puan_toplam + excluded.puan_toplam",
+            (gun, score)
+        )
+
+    ROLLUP_TABLES = ('rollup_rule_status', 'rollup_score_hist', 'rollup_author', 'rollup_daily')
+
+    def rebuild_rollups(self):
+        """Özet tabloları mevcut geçmişten baştan hesaplar (eski veritabanları için)"""
+        with self._connect() as conn:
+            for table in self.ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+            for created_at, payload in conn.execute("SELECT created_at, payload FROM analyses ORDER BY id").fetchall():
+                self._update_rollups(conn, created_at, json.loads(payload))
+
+    # --- Okuma ---
+
+    def query(self, limit: int = 10, cursor: Optional[int] = None, url: Optional[str] = None,
+              kategori: Optional[str] = None, min_puan: Optional[int] = None, max_puan: Optional[int] = None,
+              kural_id: Optional[str] = None, durum: Optional[List[str]] = None,
+              since: Optional[float] = None, until: Optional[float] = None) -> Tuple[List[Dict], Optional[int]]:
+        """En yeniden eskiye sayfalı sorgu; (kayıtlar, sonraki_imleç) döner.
+
+        kural_id + durum birlikte verilirse o kuralda verilen durumlardan
+        birine sahip analizler döner (ör. kod_gizli_veri, ['uygun_degil']).
+        """
+        where, params = [], []
+        if cursor is not None:
+            where.append("a.id < ?")
+            params.append(cursor)
+        if url:
+            where.append("a.url_key = ?")
+            params.append(normalize_url(url))
+        if kategori:
+            where.append("a.kategori = ?")
+            params.append(kategori)
+        if min_puan is not None:
+            where.append("a.puan >= ?")
+            params.append(min_puan)
+        if max_puan is not None:
+            where.append("a.puan <= ?")
+            params.append(max_puan)
+        if since is not None:
+            where.append("a.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("a.created_at < ?")
+            params.append(until)
+        if kural_id:
+            clause = "EXISTS (SELECT 1 FROM rule_results r WHERE r.analysis_id = a.id AND r.kural_id = ?"
+            params.append(kural_id)
+            if durum:
+                clause += f" AND r.durum IN ({','.join('?' * len(durum))})"
+                params.extend(durum)
+            where.append(clause + ")")
+
+        sql = "SELECT a.id, a.created_at, a.payload FROM analyses a"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY a.id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        items = []
+        for row_id, created_at, payload in rows[:limit]:
+            item = json.loads(payload)
+            item['gecmis_id'] = row_id
+            item['kayit_zamani'] = datetime.fromtimestamp(created_at).isoformat(timespec='seconds')
+            items.append(item)
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return items, next_cursor
+
+    def latest_for_url(self, url: str, max_age_seconds: float, fingerprint: str = '') -> Optional[Dict]:
+        """Aynı config ile max_age_seconds içinde yapılmış son analizi döndürür"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, created_at, payload FROM analyses"
+                " WHERE url_key = ? AND created_at >= ? AND fingerprint = ?"
+                " ORDER BY created_at DESC LIMIT 1",
+                (normalize_url(url), time.time() - max_age_seconds, fingerprint)
+            ).fetchone()
+        if not row:
+            return None
+        item = json.loads(row[2])
+        item['gecmis_id'] = row[0]
+        item['kayit_zamani'] = datetime.fromtimestamp(row[1]).isoformat(timespec='seconds')
+        return item
+
+    def clear(self):
+        self.flush()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM rule_results")
+            conn.execute("DELETE FROM analyses")
+            for table in self.ROLLUP_TABLES:
+                conn.execute(f"DELETE FROM {table}")
+
+    @staticmethod
+    def _day_start(ts: float) -> float:
+        return datetime.fromtimestamp(ts).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+    def _analytics_ranges(self, since: Optional[float], until: Optional[float]):
+        """/history ile aynı [since, until) sınırları: tam günler özet
+        tablolardan, kısmi kalan baş/son gün ham kayıtlardan okunur.
+        (özet gün aralığı ya da None, [(başlangıç, bitiş)] ham aralıklar) döner"""
+        def day(ts):
+            return datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+
+        full_start = None
+        if since is not None:
+            full_start = since if self._day_start(since) == since else \
+                (datetime.fromtimestamp(self._day_start(since)) + timedelta(days=1)).timestamp()
+        full_end = self._day_start(until) if until is not None else None
+        if full_start is not None and full_end is not None and full_start >= full_end:
+            return None, [(since, until)]
+
+        raw = []
+        if since is not None and full_start > since:
+            raw.append((since, full_start))
+        if until is not None and full_end < until:
+            raw.append((full_end, until))
+        return (day(full_start) if full_start is not None else None,
+                day(full_end) if full_end is not None else None), raw
+
+    def analytics(self, since: Optional[float] = None, until: Optional[float] = None,
+                  top_authors: int = 20) -> Dict:
+        """Özet tablolardan panel verisi: kural × durum sayıları, kategori bazında
+        puan histogramı, yazar ortalamaları ve günlük trend.
+
+        since/until zaman damgasıdır ve /history ile aynı [since, until)
+        aralığını verir; gün ortasına düşen sınırlarda o günün kısmı ham
+        kayıtlardan hesaplanır.
+        """
+        days, raw_ranges = self._analytics_ranges(since, until)
+        rule_counts, hist_counts = {}, {}
+        author_counts, daily_counts = {}, {}
+
+        def add(target, key, *values):
+            current = target.get(key)
+            target[key] = tuple(c + v for c, v in zip(current, values)) if current else values
+
+        with self._connect() as conn:
+            if days is not None:
+                where, params = [], []
+                if days[0] is not None:
+                    where.append("gun >= ?")
+                    params.append(days[0])
+                if days[1] is not None:
+                    where.append("gun < ?")
+                    params.append(days[1])
+                clause = (" WHERE " + " AND ".join(where)) if where else ""
+                for kural_id, durum, adet in conn.execute(
+                        f"SELECT kural_id, durum, SUM(adet) FROM rollup_rule_status{clause} GROUP BY kural_id, durum",
+                        params):
+                    add(rule_counts, (kural_id, durum), adet)
+                for kategori, kova, adet in conn.execute(
+                        f"SELECT kategori, kova, SUM(adet) FROM rollup_score_hist{clause} GROUP BY kategori, kova",
+                        params):
+                    add(hist_counts, (kategori, kova), adet)
+                for yazar, adet, total in conn.execute(
+                        f"SELECT yazar, SUM(adet), SUM(puan_toplam) FROM rollup_author{clause} GROUP BY yazar",
+                        params):
+                    add(author_counts, yazar, adet, total)
+                for gun, adet, total in conn.execute(
+                        f"SELECT gun, adet, puan_toplam FROM rollup_daily{clause}", params):
+                    add(daily_counts, gun, adet, total)
+
+            # Kısmi günler: _update_rollups ile aynı gruplama, ham kayıtlar üzerinde
+            for lo, hi in raw_ranges:
+                where, params = [], []
+                if lo is not None:
+                    where.append("created_at >= ?")
+                    params.append(lo)
+                if hi is not None:
+                    where.append("created_at < ?")
+                    params.append(hi)
+                clause = " WHERE " + " AND ".join(where)
+                for kural_id, durum, adet in conn.execute(
+                        "SELECT kural_id, COALESCE(NULLIF(durum, ''), 'bilinmiyor'), COUNT(*) FROM rule_results"
+                        f"{clause} GROUP BY 1, 2", params):
+                    add(rule_counts, (kural_id, durum), adet)
+                for kategori, kova, adet in conn.execute(
+                        "SELECT COALESCE(NULLIF(kategori, ''), 'bilinmiyor'), MIN(CAST(COALESCE(puan, 0) AS INTEGER) / 10, 9) * 10,"
+                        f" COUNT(*) FROM analyses{clause} GROUP BY 1, 2", params):
+                    add(hist_counts, (kategori, kova), adet)
+                for yazar, adet, total in conn.execute(
+                        "SELECT COALESCE(NULLIF(yazar, ''), 'bilinmiyor'), COUNT(*), SUM(COALESCE(puan, 0))"
+                        f" FROM analyses{clause} GROUP BY 1", params):
+                    add(author_counts, yazar, adet, total)
+                for gun, adet, total in conn.execute(
+                        "SELECT date(created_at, 'unixepoch', 'localtime'), COUNT(*), SUM(COALESCE(puan, 0))"
+                        f" FROM analyses{clause} GROUP BY 1", params):
+                    add(daily_counts, gun, adet, total)
+
+        rules = {}
+        for (kural_id, durum), (adet,) in rule_counts.items():
+            rules.setdefault(kural_id, {})[durum] = adet
+        for counts in rules.values():
+            total = sum(counts.values())
+            counts['toplam'] = total
+            counts['basarisizlik_orani'] = round(counts.get('uygun_degil', 0) / total, 3) if total else 0.0
+            counts['uyum_orani'] = round(counts.get('uygun', 0) / total, 3) if total else 0.0
+
+        histogram = {}
+        for (kategori, kova), (adet,) in hist_counts.items():
+            label = f"{kova}-{kova + 10 if kova == 90 else kova + 9}"
+            histogram.setdefault(kategori, {})[label] = adet
+
+        authors = sorted(author_counts.items(), key=lambda item: (-item[1][0], item[0]))[:top_authors]
+        daily = sorted(daily_counts.items())
+        return {
+            'toplam_analiz': sum(adet for _, (adet, _total) in daily),
+            'kurallar': rules,
+            'puan_dagilimi': histogram,
+            'yazarlar': [
+                {'yazar': yazar, 'adet': adet, 'ortalama_puan': round(total / adet, 1) if adet else 0.0}
+                for yazar, (adet, total) in authors
+            ],
+            'trend': [
+                {'gun': gun, 'adet': adet, 'ortalama_puan': round(total / adet, 1) if adet else 0.0}
+                for gun, (adet, total) in daily
+            ]
+        }
+
+    def get_stats(self) -> Dict:
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        return {'kayit': total, 'yazma_kuyrugu': self._queue.qsize()}
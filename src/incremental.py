@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Set
+
+from cache import DEFAULT_DATA_DIR, normalize_content, normalize_url
+from content_window import ContentSelector
+
+
+def paragraph_hash(paragraph: str) -> str:
+    return hashlib.sha1(normalize_content(paragraph).encode('utf-8')).hexdigest()[:16]
+
+
+class DraftStore:
+    """Aynı URL'nin önceki analizini paragraf özetleriyle saklar.
+
+    Her kayıt: paragraf hash listesi, LLM'in verdiği kural sonuçları ve her
+    kural için kanıt paragraflarının hash'leri. Yazar taslağı yeniden
+    gönderdiğinde yalnızca değişen paragraflardan etkilenen kurallar
+    yeniden değerlendirilir.
+    """
+
+    def __init__(self, db_path=None):
+        data_dir = os.getenv("DATA_DIR", DEFAULT_DATA_DIR)
+        self.db_path = os.getenv("DRAFT_DB", db_path or os.path.join(data_dir, 'drafts.sqlite3'))
+        self.enabled = os.getenv("INCREMENTAL", "1") != "0"
+        self._disk_ok = False
+        if self.enabled:
+            try:
+                os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+                with self._connect() as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS drafts ("
+                        " url_key TEXT PRIMARY KEY,"
+                        " analysis_key TEXT NOT NULL,"
+                        " title TEXT,"
+                        " paragraphs TEXT NOT NULL,"
+                        " details TEXT NOT NULL,"
+                        " evidence TEXT NOT NULL,"
+                        " suggestions TEXT NOT NULL,"
+                        " updated_at REAL NOT NULL)"
+                    )
+                self._disk_ok = True
+            except Exception as e:
+                print(f"Taslak deposu açılamadı ({self.db_path}): {e}")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def get(self, url: str, analysis_key: str) -> Optional[Dict]:
+        """Aynı config/model ile yapılmış önceki analizi döndürür"""
+        if not self._disk_ok or not url:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT title, paragraphs, details, evidence, suggestions FROM drafts"
+                    " WHERE url_key = ? AND analysis_key = ?",
+                    (normalize_url(url), analysis_key)
+                ).fetchone()
+        except Exception as e:
+            print(f"Taslak okuma hatası: {e}")
+            return None
+        if not row:
+            return None
+        return {
+            'title': row[0],
+            'paragraphs': json.loads(row[1]),
+            'details': json.loads(row[2]),
+            'evidence': json.loads(row[3]),
+            'suggestions': json.loads(row[4])
+        }
+
+    def save(self, url: str, analysis_key: str, title: str, paragraphs: List[str],
+             details: Dict[str, Dict], evidence: Dict[str, List[str]], suggestions: List):
+        if not self._disk_ok or not url:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO drafts"
+                    " (url_key, analysis_key, title, paragraphs, details, evidence, suggestions, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (normalize_url(url), analysis_key, title, json.dumps(paragraphs),
+                     json.dumps(details, ensure_ascii=False), json.dumps(evidence),
+                     json.dumps(suggestions, ensure_ascii=False), time.time())
+                )
+        except Exception as e:
+            print(f"Taslak yazma hatası: {e}")
+
+
+class DraftDiff:
+    """Yeni içeriği önceki taslakla karşılaştırıp etkilenen kuralları bulur"""
+
+    def __init__(self, selector: ContentSelector, content: str):
+        self.selector = selector
+        self.paragraphs = selector.split_paragraphs(content)
+        self.hashes = [paragraph_hash(p) for p in self.paragraphs]
+
+    def evidence(self, rule_ids: List[str], details: Dict[str, Dict]) -> Dict[str, List[str]]:
+        """Her kural için kanıt paragrafları: anahtar kelimelerle eşleşenler
+        ve LLM'in 'ornek' olarak alıntıladığı cümleyi içeren paragraf"""
+        rankings = self.selector._bm25_rankings(self.paragraphs, rule_ids)
+        lowered = [normalize_content(p).casefold() for p in self.paragraphs]
+        evidence = {}
+        for rule_id in rule_ids:
+            indices = set(rankings.get(rule_id, []))
+            example = normalize_content((details.get(rule_id) or {}).get('ornek') or '').casefold()
+            if len(example) >= 12:
+                indices.update(i for i, p in enumerate(lowered) if example in p)
+            evidence[rule_id] = sorted({self.hashes[i] for i in indices})
+        return evidence
+
+    def affected_rules(self, previous: Dict, rule_ids: List[str], holistic: Set[str] = frozenset()) -> Set[str]:
+        """Kanıt paragrafı silinen/değişen ya da yeni paragraflarla eşleşen kurallar.
+
+        holistic: makalenin bütününe bakan kurallar (özgünlük, pazarlama,
+        gizlilik, lisans …); herhangi bir paragraf eklenip silindiğinde
+        anahtar kelime eşleşmesine bakılmadan yeniden değerlendirilir.
+        """
+        old_hashes = set(previous['paragraphs'])
+        new_hashes = set(self.hashes)
+        removed = old_hashes - new_hashes
+        added = [i for i, h in enumerate(self.hashes) if h not in old_hashes]
+
+        rankings = self.selector._bm25_rankings(self.paragraphs, rule_ids) if added else {}
+        added_set = set(added)
+        affected = set()
+        for rule_id in rule_ids:
+            if rule_id not in previous['details']:
+                affected.add(rule_id)
+            elif (added or removed) and rule_id in holistic:
+                affected.add(rule_id)
+            elif removed & set(previous['evidence'].get(rule_id, [])):
+                affected.add(rule_id)
+            elif added_set & set(rankings.get(rule_id, [])):
+                affected.add(rule_id)
+        return affected
+
+    def change_ratio(self, previous: Dict) -> float:
+        old_hashes = set(previous['paragraphs'])
+        new_hashes = set(self.hashes)
+        changed = len(old_hashes ^ new_hashes)
+        return changed / max(1, len(old_hashes | new_hashes))
@@ -0,0 +1,408 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from cache import DEFAULT_DATA_DIR, content_digest, normalize_url
+from scheduler import RequestContext, client_disconnected, use_context
+
+FINAL_STATUSES = ('completed', 'failed')
+
+
+class QueueFullError(Exception):
+    """Bekleyen iş sayısı sınırı aşıldığında fırlatılır (HTTP 429)"""
+
+
+class JobStore:
+    """İş durumlarını SQLite'ta tutar; böylece tüm gunicorn worker'ları aynı
+    işi görebilir (session tabanlı durumun aksine).
+
+    Aynı normalize URL'ye ya da aynı içeriğe sahip devam eden bir iş varsa
+    yeni iş ona bağlanır (leader_id): kendi kimliği olur ama durumu ve
+    sonucu öncü işten okunur. Bağlanma kararı BEGIN IMMEDIATE ile alındığı
+    için aynı anda gelen istekler farklı worker'larda olsa da tek iş çalışır.
+    """
+
+    def __init__(self, db_path=None, ttl_seconds=3600, coalesce_max_age=900):
+        data_dir = os.getenv("DATA_DIR", DEFAULT_DATA_DIR)
+        self.db_path = os.getenv("JOB_DB", db_path or os.path.join(data_dir, 'jobs.sqlite3'))
+        self.ttl_seconds = int(os.getenv("JOB_TTL_SECONDS", ttl_seconds))
+        self.coalesce = os.getenv("JOB_COALESCE", "1") != "0"
+        # Çöken bir worker'ın yarım bıraktığı işe sonsuza kadar bağlanılmaması için
+        self.coalesce_max_age = float(os.getenv("JOB_COALESCE_MAX_AGE", coalesce_max_age))
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " url TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " http_status INTEGER,"
+                " result TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (('url_key', 'TEXT'), ('content_key', 'TEXT'), ('leader_id', 'TEXT'),
+                                 ('cancel_requested', 'INTEGER NOT NULL DEFAULT 0')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_url_key ON jobs(url_key, status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_content_key ON jobs(content_key, status)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _active_leader(self, conn, column: str, key: str, exclude_id: str = '') -> Optional[str]:
+        row = conn.execute(
+            f"SELECT id FROM jobs WHERE {column} = ? AND leader_id IS NULL AND id != ?"
+            " AND status NOT IN ('completed', 'failed') AND created_at > ?"
+            " ORDER BY created_at LIMIT 1",
+            (key, exclude_id, time.time() - self.coalesce_max_age)
+        ).fetchone()
+        return row[0] if row else None
+
+    def create(self, job_id: str, url: str) -> Optional[str]:
+        """İşi kaydeder; aynı URL için devam eden iş varsa ona bağlayıp öncü
+        işin kimliğini döndürür (bu durumda yeni iş çalıştırılmamalıdır)"""
+        now = time.time()
+        url_key = normalize_url(url)
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            leader_id = self._active_leader(conn, 'url_key', url_key) if self.coalesce else None
+            conn.execute(
+                "INSERT INTO jobs (id, url, url_key, leader_id, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, url, url_key, leader_id, 'attached' if leader_id else 'queued', now, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return leader_id
+
+    def claim_content(self, job_id: str, article_data: Dict) -> Optional[str]:
+        """Scraping sonrası: aynı içerik başka bir URL'den zaten analiz
+        ediliyorsa işi ona bağlar ve öncü işin kimliğini döndürür"""
+        content_key = content_digest(article_data)
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            leader_id = self._active_leader(conn, 'content_key', content_key, job_id) if self.coalesce else None
+            if leader_id:
+                conn.execute(
+                    "UPDATE jobs SET leader_id = ?, status = 'attached', updated_at = ? WHERE id = ?",
+                    (leader_id, time.time(), job_id)
+                )
+                # Bu işe URL ile bağlanmış olanlar da öncü işi izlesin
+                conn.execute("UPDATE jobs SET leader_id = ? WHERE leader_id = ?", (leader_id, job_id))
+            else:
+                conn.execute("UPDATE jobs SET content_key = ? WHERE id = ?", (content_key, job_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return leader_id
+
+    def update(self, job_id: str, status: str, result: Optional[Dict] = None, http_status: Optional[int] = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = COALESCE(?, result),"
+                " http_status = COALESCE(?, http_status), updated_at = ? WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 http_status, time.time(), job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """İşi döndürür; bağlı işlerde durum ve sonuç öncü işten gelir"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT j.id, j.url, COALESCE(l.status, j.status), COALESCE(l.http_status, j.http_status),"
+                " COALESCE(l.result, j.result), j.created_at, MAX(j.updated_at, COALESCE(l.updated_at, 0)),"
+                " j.leader_id"
+                " FROM jobs j LEFT JOIN jobs l ON l.id = j.leader_id WHERE j.id = ?",
+                (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'url': row[1],
+            'status': row[2],
+            'http_status': row[3],
+            'result': json.loads(row[4]) if row[4] else None,
+            'created_at': row[5],
+            'updated_at': row[6],
+            'leader_id': row[7]
+        }
+
+    def request_cancel(self, job_id: str, body: Dict) -> bool:
+        """Bitmemiş işi iptal ister. Başka işe bağlı iş öncüden ayrılıp iptal
+        edilmiş olarak kapanır; öncü iş ise onu çalıştıran worker'ın izleyicisi
+        tarafından durdurulur. İş yoksa ya da bitmişse False döner."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT status, leader_id FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not row or row[0] in FINAL_STATUSES:
+                return False
+            if row[1]:
+                conn.execute(
+                    "UPDATE jobs SET leader_id = NULL, status = 'failed', result = ?, http_status = 499,"
+                    " updated_at = ? WHERE id = ?",
+                    (json.dumps(body, ensure_ascii=False), time.time(), job_id)
+                )
+            else:
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+        return True
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def follower_count(self, job_id: str) -> int:
+        """Bu işin sonucunu bekleyen, ona bağlanmış iş sayısı"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE leader_id = ?", (job_id,)).fetchone()[0]
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND status IN ('completed', 'failed', 'attached')", (cutoff,)
+            )
+
+
+class JobQueue:
+    """Scraping ve LLM analizini ayrı, sınırlı havuzlarda çalıştıran iş kuyruğu.
+
+    - scrape_fn(url) -> scraper sonucu (dict, 'success' alanlı)
+    - analyze_fn(scraping_result) -> (yanıt gövdesi, HTTP durum kodu)
+
+    Aynı URL/içerik için eşzamanlı gelen işler JobStore üzerinden tek bir
+    işe bağlanır; bağlı işler kuyruğa yer kaplamaz ve `wait` öncü iş başka
+    bir worker'da çalışsa bile sonucu bekler.
+
+    scheduler verilirse her iş bir istek bağlamında (kulvar, süre sınırı,
+    iptal) çalışır ve LLM eşzamanlılığını scheduler'ın slotları belirler;
+    analiz havuzu yalnızca slot bekleyen işleri tutar.
+    """
+
+    def __init__(self, scrape_fn: Callable, analyze_fn: Callable, store: JobStore = None,
+                 scrape_workers=4, llm_workers=1, max_pending=16, scheduler=None):
+        self.scrape_fn = scrape_fn
+        self.analyze_fn = analyze_fn
+        self.store = store or JobStore()
+        self.scheduler = scheduler
+
+        self.scrape_workers = int(os.getenv("SCRAPE_CONCURRENCY", scrape_workers))
+        self.llm_workers = int(os.getenv("LLM_CONCURRENCY", llm_workers))
+        self.max_pending = int(os.getenv("JOB_QUEUE_SIZE", max_pending))
+
+        # Scheduler varken FIFO havuz öncelikli kulvarları ezmesin diye her
+        # bekleyen iş kendi thread'inde slot sırasına girer
+        analysis_threads = max(self.llm_workers, self.max_pending) if scheduler else self.llm_workers
+        self._scrape_pool = ThreadPoolExecutor(max_workers=self.scrape_workers, thread_name_prefix='scrape')
+        self._llm_pool = ThreadPoolExecutor(max_workers=analysis_threads, thread_name_prefix='llm')
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._events = {}
+        self._contexts = {}
+        self.poll_interval = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'cancelled': 0,
+                      'coalesced_url': 0, 'coalesced_content': 0}
+
+    def submit(self, url: str, lane: str = 'interactive', deadline: Optional[float] = None) -> str:
+        """İşi kuyruğa alır ve hemen iş kimliğini döndürür.
+
+        lane: 'interactive' ya da 'bulk'; deadline: saniye cinsinden süre
+        sınırı (kuyrukta bekleme dahil), aşılırsa iş iptal edilir.
+        """
+        job_id = uuid.uuid4().hex
+        if self.store.coalesce:
+            self.store.purge_expired()
+            if self.store.create(job_id, url):
+                with self._lock:
+                    self.stats['coalesced_url'] += 1
+                return job_id
+            self._start(job_id, url, lane, deadline, created=True)
+            return job_id
+        self._start(job_id, url, lane, deadline)
+        return job_id
+
+    def _start(self, job_id: str, url: str, lane: str, deadline: Optional[float], created: bool = False):
+        ctx = RequestContext(lane, deadline)
+        ctx.checks.append(('iptal', lambda: self.store.cancel_requested(job_id)))
+        with self._lock:
+            full = self._pending >= self.max_pending
+            if full:
+                self.stats['rejected'] += 1
+            else:
+                self._pending += 1
+                self.stats['submitted'] += 1
+                self._events[job_id] = threading.Event()
+                self._contexts[job_id] = ctx
+        if full:
+            error = f"Kuyruk dolu ({self.max_pending} bekleyen iş)"
+            if created:
+                # Kayıt öncü iş olarak açıldı; bitmiş işaretlenmezse bağlanan
+                # istekler hiç çalışmayacak bir işi bekler
+                self.store.update(job_id, 'failed', {'success': False, 'error': error}, 429)
+            raise QueueFullError(error)
+        if self.scheduler:
+            self.scheduler.watch(ctx)
+
+        try:
+            if not created:
+                self.store.purge_expired()
+                self.store.create(job_id, url)
+            self._scrape_pool.submit(self._run_scrape, job_id, url)
+        except Exception:
+            if created:
+                self.store.update(job_id, 'failed', {'success': False, 'error': 'İş başlatılamadı'}, 500)
+            self._finish(job_id, 'failed')
+            raise
+
+    @staticmethod
+    def _cancelled_body(ctx: RequestContext) -> Tuple[Dict, int]:
+        return ({'success': False, 'error': f'İş iptal edildi ({ctx.reason})', 'iptal': ctx.reason},
+                504 if ctx.reason == 'sure_asimi' else 499)
+
+    def _run_scrape(self, job_id: str, url: str):
+        ctx = self._contexts.get(job_id)
+        try:
+            if ctx and ctx.cancelled:
+                self._complete(job_id, *self._cancelled_body(ctx))
+                return
+            self.store.update(job_id, 'scraping')
+            scraping_result = self.scrape_fn(url)
+            if not scraping_result.get('success'):
+                self._complete(job_id, {
+                    'success': False,
+                    'error': f"Scraping Hatası: {scraping_result.get('error', '')}"
+                }, 400)
+                return
+            if self.store.claim_content(job_id, scraping_result):
+                with self._lock:
+                    self.stats['coalesced_content'] += 1
+                self._finish(job_id, None)
+                return
+            self.store.update(job_id, 'waiting_llm')
+            self._llm_pool.submit(self._run_analysis, job_id, scraping_result)
+        except Exception as e:
+            self._complete(job_id, {'success': False, 'error': f'Beklenmeyen hata: {str(e)}'}, 500)
+
+    def _run_analysis(self, job_id: str, scraping_result: Dict):
+        ctx = self._contexts.get(job_id)
+        try:
+            if ctx and ctx.cancelled:
+                self._complete(job_id, *self._cancelled_body(ctx))
+                return
+            self.store.update(job_id, 'analyzing')
+            with use_context(ctx):
+                body, http_status = self.analyze_fn(scraping_result)
+            if ctx and ctx.cancelled:
+                body, http_status = self._cancelled_body(ctx)
+            self._complete(job_id, body, http_status)
+        except Exception as e:
+            self._complete(job_id, {'success': False, 'error': f'Beklenmeyen hata: {str(e)}'}, 500)
+
+    def _complete(self, job_id: str, body: Dict, http_status: int):
+        status = 'completed' if body.get('success') else 'failed'
+        try:
+            self.store.update(job_id, status, body, http_status)
+        except Exception as e:
+            print(f"İş durumu kaydedilemedi ({job_id}): {e}")
+        self._finish(job_id, status)
+
+    def _finish(self, job_id: str, status: Optional[str]):
+        """status None: iş başka bir işe bağlandı, sonucu orada üretilecek"""
+        with self._lock:
+            self._pending = max(0, self._pending - 1)
+            if status:
+                self.stats['completed' if status == 'completed' else 'failed'] += 1
+            event = self._events.pop(job_id, None)
+            ctx = self._contexts.pop(job_id, None)
+        if ctx and self.scheduler:
+            self.scheduler.unwatch(ctx)
+        if event:
+            event.set()
+
+    def cancel(self, job_id: str) -> bool:
+        """İşi iptal eder; bu süreçteyse süren Ollama isteği hemen kesilir,
+        başka bir worker'daysa onun izleyicisi iptal isteğini görür"""
+        body = {'success': False, 'error': 'İş iptal edildi (iptal)', 'iptal': 'iptal'}
+        if not self.store.request_cancel(job_id, body):
+            return False
+        with self._lock:
+            ctx = self._contexts.get(job_id)
+            self.stats['cancelled'] += 1
+        if ctx:
+            ctx.cancel('iptal')
+        return True
+
+    def _client_left(self, job_id: str):
+        """Senkron bekleyen istemci ayrıldı: işi bekleyen başka kimse yoksa iptal eder"""
+        with self._lock:
+            ctx = self._contexts.get(job_id)
+        if ctx is None or self.store.follower_count(job_id):
+            return
+        self.store.request_cancel(job_id, {})
+        with self._lock:
+            self.stats['cancelled'] += 1
+        ctx.cancel('istemci_ayrildi')
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: float = None, client_socket=None) -> Tuple[Optional[Dict], bool]:
+        """İşin (bağlıysa öncü işin) bitmesini bekler; (iş, zamanında_bitti) döner.
+
+        Öncü iş bu süreçteyse olayı beklenir, başka bir worker'daysa
+        ortak depo `JOB_POLL_INTERVAL` aralıklarla yoklanır. client_socket
+        verilirse istemci ayrıldığında beklemeyi bırakır ve işi (başka
+        bekleyeni yoksa) iptal eder.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            if not job or job['status'] in FINAL_STATUSES:
+                return job, True
+            if client_disconnected(client_socket):
+                self._client_left(job_id)
+                return job, False
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return job, False
+            with self._lock:
+                event = self._events.get(job['leader_id'] or job_id)
+            step = self.poll_interval if remaining is None else min(self.poll_interval, remaining)
+            if event:
+                # Yerel işin bağlanması (claim_content) olayı da tetikler; tekrar çözümlenir
+                event.wait(remaining if job['leader_id'] is None and client_socket is None else step)
+            else:
+                time.sleep(step)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = self._pending
+        stats['max_pending'] = self.max_pending
+        stats['scrape_workers'] = self.scrape_workers
+        stats['llm_workers'] = self.llm_workers
+        if self.scheduler:
+            stats['scheduler'] = self.scheduler.get_stats()
+        return stats
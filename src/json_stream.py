@@ -0,0 +1,237 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class DetaylarStreamParser:
+    """LLM token akışını artımlı olarak tarar ve `detaylar` dizisindeki her
+    nesne kapandığı anda onu parse edip döndürür.
+
+    Tüm metni tekrar tekrar json.loads etmek yerine karakter bazlı tek
+    geçişte string/escape durumu ve parantez derinliği izlenir.
+    """
+
+    def __init__(self, key: str = 'detaylar'):
+        self.key = key
+        self._buf = ''
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._array_depth = None
+        self._item_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Yeni gelen parçayı işler; bu parçada tamamlanan kural nesnelerini döndürür"""
+        items = []
+        if not chunk:
+            return items
+        self._buf += chunk
+        buf = self._buf
+
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buf[self._string_start + 1:self._pos]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch in '{[':
+                if (ch == '[' and not self.done and self._array_depth is None
+                        and len(self._stack) == 1 and self._last_string == self.key):
+                    self._array_depth = 2
+                self._stack.append(ch)
+                if ch == '{' and self._array_depth is not None and len(self._stack) == self._array_depth + 1:
+                    self._item_start = self._pos
+            elif ch in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if self._array_depth is not None:
+                    if ch == '}' and self._item_start is not None and len(self._stack) == self._array_depth:
+                        try:
+                            items.append(json.loads(buf[self._item_start:self._pos + 1]))
+                        except json.JSONDecodeError:
+                            pass
+                        self._item_start = None
+                    elif ch == ']' and len(self._stack) == self._array_depth - 1:
+                        self._array_depth = None
+                        self.done = True
+
+            self._pos += 1
+
+        return items
+
+    @property
+    def text(self) -> str:
+        return self._buf
+
+
+_CLOSERS = {'{': '}', '[': ']'}
+_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+# Tek geçişte token'lar: string (kapanmamış olabilir), yorumlar, yapı karakterleri,
+# sayı/literal, boşluk; geri kalan her karakter tek başına (atılır)
+_TOKEN_RE = re.compile(
+    r'\s+'
+    r'|[{}\[\]:,]'
+    r'|"[^"\\]*(?:\\.[^"\\]*)*(?:"|\\?\Z)'
+    r'|[A-Za-z0-9+\-.]+'
+    r'|//[^\n]*'
+    r'|/\*[\s\S]*?(?:\*/|\Z)'
+    r'|.',
+    re.DOTALL
+)
+
+
+def repair_json(text: str) -> Tuple[Optional[Any], Dict]:
+    """Bozuk/kesik LLM çıktısını tek geçişte geçerli JSON'a çevirip parse eder.
+
+    İlk '{' karakterinden başlar; kod bloğu ve serbest metin atlanır,
+    // ve /* */ yorumları silinir, kapanıştan önceki virgüller düşürülür,
+    string içindeki ham satır sonları kaçırılır. Kök değer kapandığında
+    okuma biter. Çıktı yarıda kesilmişse son tamamlanan değere geri
+    dönülür ve açık diziler/nesneler kapatılır; böylece yarım kalan son
+    kural nesnesi dışındaki her şey kurtarılır.
+
+    (sonuç veya None, {'onarildi': bool, 'kesik': bool}) döner.
+    """
+    info = {'onarildi': False, 'kesik': False}
+    text = text if isinstance(text, str) else str(text)
+    start = text.find('{')
+    if start == -1:
+        start = text.find('[')
+    if start == -1:
+        return None, info
+
+    out = []
+    stack = []          # her seviye: [parantez, nesnede sıradaki string anahtar mı]
+    checkpoint = (0, 0)  # son tamamlanan değerden sonraki (çıktı uzunluğu, açık yapı sayısı)
+    finished = False
+    end_of_text = len(text)
+
+    for match in _TOKEN_RE.finditer(text, start):
+        token = match.group()
+        first = token[0]
+
+        if first == '"':
+            if match.end() == end_of_text and (len(token) < 2 or token[-1] != '"' or _odd_backslashes(token)):
+                break  # kesik string
+            if '\n' in token or '\r' in token or '\t' in token:
+                token = ''.join(_ESCAPES.get(ch, ch) for ch in token)
+                info['onarildi'] = True
+            out.append(token)
+            if stack and stack[-1][1]:
+                stack[-1][1] = False
+            else:
+                checkpoint = (len(out), len(stack))
+        elif first == '{' or first == '[':
+            stack.append([first, first == '{'])
+            out.append(first)
+            checkpoint = (len(out), len(stack))
+        elif first == '}' or first == ']':
+            if out and out[-1] == ',':
+                out.pop()
+                info['onarildi'] = True
+            if stack:
+                stack.pop()
+            out.append(first)
+            checkpoint = (len(out), len(stack))
+            if not stack:
+                finished = True
+                break
+        elif first == ',':
+            if stack and stack[-1][0] == '{':
+                stack[-1][1] = True
+            out.append(first)
+        elif first == ':':
+            out.append(first)
+        elif first.isalnum() or first in '+-.':
+            # Sayı/literal ancak ardından bir ayraç gelirse tamamlanmış sayılır
+            out.append(token)
+            if match.end() < end_of_text:
+                checkpoint = (len(out), len(stack))
+        elif not first.isspace():
+            info['onarildi'] = True  # yorum ya da JSON dışı karakter
+
+    if not finished:
+        # Kesik çıktı: yarım string/sayı/anahtar atılır, açık yapılar kapatılır.
+        # Checkpoint'ten sonra kapanan her yapı yeni checkpoint ürettiği için
+        # ilk `depth` seviye checkpoint anındakilerle aynıdır.
+        info['kesik'] = True
+        info['onarildi'] = True
+        length, depth = checkpoint
+        out = out[:length]
+        out.extend(_CLOSERS[frame[0]] for frame in reversed(stack[:depth]))
+
+    try:
+        return json.loads(''.join(out)), info
+    except json.JSONDecodeError:
+        return None, info
+
+
+def _odd_backslashes(token: str) -> bool:
+    """String'in son tırnağı kaçırılmış mı, yani metin kaçış içinde mi bitti"""
+    count = len(token) - 1 - len(token[:-1].rstrip('\\'))
+    return count % 2 == 1
+
+
+def validate_details(details: Iterable, item_template: Dict, rule_ids: Optional[Iterable[str]] = None,
+                     statuses: Iterable[str] = ('uygun', 'kismen_uygun', 'uygun_degil', 'belirsiz')
+                     ) -> Tuple[List[Dict], List[Dict]]:
+    """`detaylar` girdilerini prompts.json'daki json_sablonu'na göre doğrular.
+
+    kural_id, durum, puan ve aciklama zorunludur (kesik çıktıda yarım kalan
+    nesne böylece elenir); puan 0–10 aralığına sıkıştırılır, eksik isteğe
+    bağlı alanlar şablondaki varsayılanla doldurulur. İstenmeyen
+    ya da tekrarlanan kural kimlikleri reddedilir.
+    (geçerli girdiler, [{'kural_id', 'neden'}] reddedilenler) döner.
+    """
+    allowed = set(rule_ids) if rule_ids is not None else None
+    statuses = set(statuses)
+    valid, rejected, seen = [], [], set()
+    for item in details or []:
+        if not isinstance(item, dict):
+            rejected.append({'kural_id': None, 'neden': 'nesne değil'})
+            continue
+        rule_id = item.get('kural_id')
+        if not isinstance(rule_id, str) or not rule_id:
+            rejected.append({'kural_id': None, 'neden': 'kural_id eksik'})
+            continue
+        if allowed is not None and rule_id not in allowed:
+            rejected.append({'kural_id': rule_id, 'neden': 'istenmeyen kural'})
+            continue
+        if rule_id in seen:
+            rejected.append({'kural_id': rule_id, 'neden': 'tekrar'})
+            continue
+        if item.get('durum') not in statuses:
+            rejected.append({'kural_id': rule_id, 'neden': f"geçersiz durum: {item.get('durum')!r}"})
+            continue
+        try:
+            score = float(item.get('puan'))
+        except (TypeError, ValueError):
+            rejected.append({'kural_id': rule_id, 'neden': 'puan sayı değil'})
+            continue
+        if not isinstance(item.get('aciklama'), str):
+            rejected.append({'kural_id': rule_id, 'neden': 'aciklama eksik'})
+            continue
+
+        entry = dict(item)
+        for key, default in item_template.items():
+            if key not in entry or entry[key] is None:
+                entry[key] = default
+            elif isinstance(default, str) and not isinstance(entry[key], str):
+                entry[key] = str(entry[key])
+        score = min(10.0, max(0.0, score))
+        entry['puan'] = int(score) if score.is_integer() else score
+        seen.add(rule_id)
+        valid.append(entry)
+    return valid, rejected
@@ -0,0 +1,533 @@
+import json
+from abc import ABC, abstractmethod
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import metrics
+import startup
+from scheduler import Cancelled, current_request
+
+
+class NoHealthyEndpointError(requests.RequestException):
+    """Tüm uç noktalar sağlıksız ya da devre kesici açık"""
+
+
+def _shutdown_socket(conn):
+    sock = getattr(conn, 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class _CancellablePoolMixin:
+    """Bağlantı, etkin istek bağlamı iptal edildiğinde soketi kapatılacak
+    şekilde kaydedilir. Yanıt başlıkları gelmeden (prompt değerlendirilirken)
+    bekleyen okuma da bu sayede hemen kesilir; Ollama bağlantı kopunca
+    üretimi bırakır."""
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        ctx = current_request()
+        if ctx is not None:
+            conn._cancel_hook = (ctx, ctx.on_cancel(lambda: _shutdown_socket(conn)))
+        return conn
+
+    def _put_conn(self, conn):
+        hook = getattr(conn, '_cancel_hook', None)
+        if hook:
+            hook[0].remove_callback(hook[1])
+            conn._cancel_hook = None
+        super()._put_conn(conn)
+
+
+class _CancellableHTTPPool(_CancellablePoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CancellableHTTPSPool(_CancellablePoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class CancellableAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _CancellableHTTPPool, 'https': _CancellableHTTPSPool}
+
+
+class Endpoint:
+    """Tek bir LLM sunucusu: eşzamanlı istek sayısı, sağlık ve devre kesici durumu"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self.requests = 0
+        self.errors = 0
+        self.last_error = ''
+
+    def state(self, now: float) -> str:
+        if self.open_until == 0.0:
+            return 'kapali'
+        return 'acik' if now < self.open_until else 'yari_acik'
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            'url': self.url,
+            'saglikli': self.healthy,
+            'devre': self.state(now),
+            'bekleyen': self.outstanding,
+            'istek': self.requests,
+            'hata': self.errors,
+            'son_hata': self.last_error
+        }
+
+
+class LLMBackend(ABC):
+    """Birden çok uç noktaya dağıtım yapan, bağlantı havuzlu LLM istemcisi.
+
+    - Tek requests.Session + HTTPAdapter ile keep-alive bağlantı havuzu
+    - En az bekleyen isteği olan sağlıklı uç nokta seçilir
+    - Arka plan thread'i uç noktaları periyodik yoklar; istek başına kontrol yapılmaz
+    - Üst üste failure_threshold hata sonrası devre açılır, cooldown sonrası tek
+      deneme isteğiyle (yarı açık) yeniden kapatılır
+    - scheduler verilirse her üretim isteği kulvarında slot bekler; etkin
+      istek bağlamı iptal edilince HTTP bağlantısı kapatılır
+
+    Alt sınıflar payload, yanıt ayrıştırma ve sağlık yolunu tanımlar.
+    """
+
+    kind = ''
+    health_path = ''
+
+    def __init__(self, urls: List[str], model_name: str, pool_size: int = 8, timeout: float = 180,
+                 probe_interval: float = 15, failure_threshold: int = 3, cooldown: float = 30,
+                 scheduler=None):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.scheduler = scheduler
+        self.model_name = model_name
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.pool_size = pool_size
+        self._rr = 0
+        self.last_probe = None
+        self._start()
+        # gunicorn --preload: ana süreçteki bağlantı havuzu ve yoklama thread'i worker'a geçmez
+        self._fork_hook = startup.after_fork(self._start)
+
+    def _start(self):
+        self.session = requests.Session()
+        adapter = CancellableAdapter(pool_connections=max(1, len(self.endpoints)), pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prober = None
+        if self.probe_interval > 0:
+            self._prober = threading.Thread(target=self._probe_loop, daemon=True, name='llm-health')
+            self._prober.start()
+
+    # --- Uç nokta seçimi ve devre kesici ---
+
+    def _acquire(self) -> Endpoint:
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for ep in self.endpoints:
+                state = ep.state(now)
+                if not ep.healthy or state == 'acik':
+                    continue
+                if state == 'yari_acik' and ep.trial_in_flight:
+                    continue
+                candidates.append(ep)
+            if not candidates:
+                raise NoHealthyEndpointError("Kullanılabilir LLM uç noktası yok")
+
+            # Eşitlikte sırayla dağıt
+            self._rr = (self._rr + 1) % len(self.endpoints)
+            offset = self._rr
+            ep = min(candidates, key=lambda e: (e.outstanding, (self.endpoints.index(e) - offset) % len(self.endpoints)))
+            if ep.state(now) == 'yari_acik':
+                ep.trial_in_flight = True
+            ep.outstanding += 1
+            ep.requests += 1
+            return ep
+
+    def _release(self, ep: Endpoint, ok: bool, error: str = ''):
+        with self._lock:
+            ep.outstanding -= 1
+            ep.trial_in_flight = False
+            if ok:
+                ep.failures = 0
+                ep.open_until = 0.0
+                return
+            ep.errors += 1
+            ep.failures += 1
+            ep.last_error = error[:200]
+            if ep.failures >= self.failure_threshold or ep.open_until:
+                ep.open_until = time.monotonic() + self.cooldown
+                print(f"LLM uç noktası devre dışı ({self.cooldown:.0f} sn): {ep.url} — {error[:120]}")
+
+    @staticmethod
+    def _is_node_failure(exc: Exception) -> bool:
+        # 4xx istek hatasıdır, düğüm hatası sayılmaz
+        if isinstance(exc, requests.HTTPError) and exc.response is not None:
+            return exc.response.status_code >= 500 or exc.response.status_code == 429
+        return isinstance(exc, requests.RequestException)
+
+    # --- Sağlık yoklaması ---
+
+    def probe(self, ep: Endpoint) -> bool:
+        try:
+            response = self.session.get(f"{ep.url}{self.health_path}", timeout=5)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        with self._lock:
+            ep.healthy = ok
+            if ok and ep.state(time.monotonic()) == 'yari_acik':
+                ep.failures = 0
+                ep.open_until = 0.0
+        return ok
+
+    def probe_all(self) -> bool:
+        ok = any([self.probe(ep) for ep in self.endpoints])
+        self.last_probe = time.time()
+        return ok
+
+    def _probe_loop(self):
+        while True:
+            self.probe_all()
+            if self._stop.wait(self.probe_interval):
+                return
+
+    def warmup(self) -> Dict:
+        """Modeli tüm uç noktalarda belleğe yükler; ilk gerçek istek model
+        yükleme süresini ödemez. Uç nokta başına süre döner."""
+        results = {}
+        for ep in self.endpoints:
+            started = time.perf_counter()
+            try:
+                response = self.session.post(f"{ep.url}{self.generate_path}", json=self.warmup_payload(),
+                                             headers=self.headers(), timeout=self.timeout)
+                response.raise_for_status()
+                results[ep.url] = {'success': True, 'sure_sn': round(time.perf_counter() - started, 3)}
+            except requests.RequestException as e:
+                results[ep.url] = {'success': False, 'error': str(e)[:200]}
+        return results
+
+    def is_available(self) -> bool:
+        """Ağ isteği yapmadan, seçilebilir bir uç nokta var mı"""
+        now = time.monotonic()
+        with self._lock:
+            return any(ep.healthy and ep.state(now) != 'acik' for ep in self.endpoints)
+
+    def close(self):
+        startup.remove_after_fork(self._fork_hook)
+        self._stop.set()
+        self.session.close()
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'backend': self.kind,
+                'model': self.model_name,
+                'son_yoklama': datetime.fromtimestamp(self.last_probe).isoformat() if self.last_probe else None,
+                'uc_noktalar': [ep.to_dict(now) for ep in self.endpoints]
+            }
+
+    # --- Üretim ---
+
+    def _slot(self):
+        return self.scheduler.slot() if self.scheduler is not None else nullcontext()
+
+    def generate(self, prompt: str, temperature: float = 0.1, fmt='json', options: Optional[Dict] = None) -> Dict:
+        """{'success', 'content', 'done', 'stats'} ya da {'success': False, 'error'} döner.
+
+        Etkin bir istek bağlamında yanıt akış olarak alınıp birleştirilir;
+        böylece iptal ya da süre aşımında üretim yarıda kesilebilir.
+        """
+        try:
+            with self._slot():
+                if current_request() is None:
+                    return self._generate_once(prompt, temperature, fmt, options)
+                pieces, stats = [], {}
+                for piece, final in self._stream(prompt, temperature, fmt, options):
+                    pieces.append(piece)
+                    if final is not None:
+                        stats = final
+        except Cancelled as e:
+            return {'success': False, 'error': str(e), 'iptal': e.reason}
+        except requests.HTTPError as e:
+            return {'success': False, 'error': f"API Hatası: {e.response.status_code if e.response is not None else ''}"}
+        except requests.RequestException as e:
+            return {'success': False, 'error': f"Bağlantı Hatası: {str(e)}"}
+        except Exception as e:
+            return {'success': False, 'error': f"Genel Hata: {str(e)}"}
+        return {'success': True, 'content': ''.join(pieces), 'done': True, 'stats': stats}
+
+    def _generate_once(self, prompt: str, temperature: float, fmt, options: Optional[Dict]) -> Dict:
+        try:
+            ep = self._acquire()
+        except NoHealthyEndpointError as e:
+            return {'success': False, 'error': f"Bağlantı Hatası: {str(e)}"}
+
+        try:
+            with metrics.timed(metrics.OLLAMA_REQUEST_SECONDS, model=self.model_name, stream='0'):
+                response = self.session.post(
+                    f"{ep.url}{self.generate_path}",
+                    json=self.payload(prompt, temperature, False, fmt, options),
+                    headers=self.headers(),
+                    timeout=self.timeout
+                )
+            if response.status_code != 200:
+                self._release(ep, response.status_code < 500 and response.status_code != 429,
+                              f"HTTP {response.status_code}")
+                return {'success': False, 'error': f"API Hatası: {response.status_code}"}
+            content, stats = self.parse_response(response.json())
+            self._release(ep, True)
+        except requests.RequestException as e:
+            self._release(ep, not self._is_node_failure(e), str(e))
+            return {'success': False, 'error': f"Bağlantı Hatası: {str(e)}"}
+        except Exception as e:
+            self._release(ep, True)
+            return {'success': False, 'error': f"Genel Hata: {str(e)}"}
+
+        metrics.observe_ollama_stats(stats, self.model_name)
+        return {'success': True, 'content': content, 'done': True, 'stats': stats}
+
+    def generate_stream(self, prompt: str, temperature: float = 0.1, fmt='json',
+                        options: Optional[Dict] = None) -> Iterator[str]:
+        """Üretilen metin parçalarını verir; hatalar requests.RequestException,
+        iptal ve süre aşımı scheduler.Cancelled olarak yükselir"""
+        with self._slot():
+            for piece, _stats in self._stream(prompt, temperature, fmt, options):
+                if piece:
+                    yield piece
+
+    def _stream(self, prompt: str, temperature: float, fmt, options: Optional[Dict]):
+        """(parça, son parçada stats) üretir; her parçada istek bağlamının iptali kontrol edilir"""
+        ctx = current_request()
+        if ctx is not None:
+            ctx.check()
+        ep = self._acquire()
+        started = time.perf_counter()
+        ok, error = True, ''
+        try:
+            with self.session.post(
+                f"{ep.url}{self.generate_path}",
+                json=self.payload(prompt, temperature, True, fmt, options),
+                headers=self.headers(),
+                stream=True,
+                timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                for piece, stats in self.parse_stream(response.iter_lines()):
+                    if ctx is not None:
+                        ctx.check()
+                    yield piece, stats
+                    if stats is not None:
+                        metrics.OLLAMA_REQUEST_SECONDS.labels(model=self.model_name, stream='1').observe(
+                            time.perf_counter() - started)
+                        metrics.observe_ollama_stats(stats, self.model_name)
+                        break
+        except Cancelled:
+            raise
+        except Exception as e:
+            # İptalde soket kapatıldığı için okuma hata verir; uç nokta hatası sayılmaz
+            if ctx is not None and ctx.cancelled:
+                raise Cancelled(ctx.reason) from e
+            if isinstance(e, requests.RequestException):
+                ok, error = not self._is_node_failure(e), str(e)
+            raise
+        finally:
+            self._release(ep, ok, error)
+
+    # --- Alt sınıfların tanımladıkları ---
+
+    generate_path = ''
+
+    def headers(self) -> Dict:
+        return {}
+
+    @abstractmethod
+    def payload(self, prompt: str, temperature: float, stream: bool, fmt, options: Optional[Dict]) -> Dict:
+        ...
+
+    def warmup_payload(self) -> Dict:
+        return self.payload('', 0.0, False, None, {'num_predict': 1})
+
+    @abstractmethod
+    def parse_response(self, result: Dict):
+        """(metin, stats) döner"""
+
+    @abstractmethod
+    def parse_stream(self, lines):
+        """(parça, stats ya da None) üretir; stats geldiğinde akış biter"""
+
+
+class OllamaBackend(LLMBackend):
+    kind = 'ollama'
+    health_path = '/api/tags'
+    generate_path = '/api/generate'
+
+    STAT_KEYS = ('prompt_eval_count', 'prompt_eval_duration', 'eval_count',
+                 'eval_duration', 'load_duration', 'total_duration')
+
+    def __init__(self, urls: List[str], model_name: str, keep_alive: str = '30m', **kwargs):
+        self.keep_alive = keep_alive
+        super().__init__(urls, model_name, **kwargs)
+
+    def payload(self, prompt, temperature, stream, fmt, options):
+        opts = {"num_predict": 2048, "top_k": 10, "top_p": 0.9}
+        opts.update(options or {})
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "temperature": temperature,
+            "stream": stream,
+            # Model ve KV-cache bellekte kalsın; sabit prompt öneki sonraki
+            # çağrılarda yeniden değerlendirilmez
+            "keep_alive": self.keep_alive,
+            "options": opts
+        }
+        if fmt:
+            payload["format"] = fmt
+        return payload
+
+    def warmup_payload(self):
+        # Boş prompt: Ollama yalnızca modeli yükler ve keep_alive süresince tutar
+        return {"model": self.model_name, "prompt": "", "stream": False, "keep_alive": self.keep_alive}
+
+    @classmethod
+    def stats(cls, result: Dict) -> Dict:
+        """Ollama yanıtındaki sayaçları (süreler nanosaniye) ayıklar"""
+        return {k: result[k] for k in cls.STAT_KEYS if k in result}
+
+    def parse_response(self, result):
+        return result.get('response', ''), self.stats(result)
+
+    def parse_stream(self, lines):
+        for line in lines:
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get('error'):
+                raise requests.RequestException(chunk['error'])
+            yield chunk.get('response', ''), (self.stats(chunk) if chunk.get('done') else None)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """llama.cpp server, vLLM vb. OpenAI uyumlu /v1/chat/completions sunucuları"""
+
+    kind = 'openai'
+    health_path = '/v1/models'
+    generate_path = '/v1/chat/completions'
+
+    def __init__(self, urls: List[str], model_name: str, api_key: str = '', **kwargs):
+        self.api_key = api_key
+        super().__init__(urls, model_name, **kwargs)
+
+    def headers(self):
+        return {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
+
+    def payload(self, prompt, temperature, stream, fmt, options):
+        options = options or {}
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "top_p": options.get('top_p', 0.9),
+            "max_tokens": options.get('num_predict', 2048),
+            "stream": stream
+        }
+        if isinstance(fmt, dict):
+            payload["response_format"] = {"type": "json_schema",
+                                          "json_schema": {"name": "analiz", "schema": fmt}}
+        elif fmt:
+            payload["response_format"] = {"type": "json_object"}
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    @staticmethod
+    def stats(result: Dict) -> Dict:
+        """usage/timings alanlarını Ollama sayaç adlarına çevirir (süreler nanosaniye)"""
+        stats = {}
+        usage = result.get('usage') or {}
+        if 'prompt_tokens' in usage:
+            stats['prompt_eval_count'] = usage['prompt_tokens']
+        if 'completion_tokens' in usage:
+            stats['eval_count'] = usage['completion_tokens']
+        timings = result.get('timings') or {}  # llama.cpp
+        if 'prompt_ms' in timings:
+            stats['prompt_eval_duration'] = int(timings['prompt_ms'] * 1e6)
+        if 'predicted_ms' in timings:
+            stats['eval_duration'] = int(timings['predicted_ms'] * 1e6)
+        return stats
+
+    def parse_response(self, result):
+        choices = result.get('choices') or [{}]
+        return (choices[0].get('message') or {}).get('content', ''), self.stats(result)
+
+    def parse_stream(self, lines):
+        for line in lines:
+            if not line or not line.startswith(b'data:'):
+                continue
+            data = line[5:].strip()
+            if data == b'[DONE]':
+                yield '', {}
+                return
+            chunk = json.loads(data)
+            if chunk.get('error'):
+                raise requests.RequestException(str(chunk['error']))
+            choices = chunk.get('choices') or []
+            piece = ''
+            if choices:
+                piece = (choices[0].get('delta') or {}).get('content') or ''
+            if chunk.get('usage') or chunk.get('timings'):
+                yield piece, self.stats(chunk)
+                return
+            yield piece, None
+
+
+def create_backend(model_name: str, keep_alive: str, default_url: str,
+                   model_env: Optional[str] = "LLM_MODEL", scheduler=None) -> LLMBackend:
+    """Ortam değişkenlerinden backend kurar.
+
+    LLM_BACKEND: 'ollama' (varsayılan) ya da 'openai'
+    LLM_ENDPOINTS: virgülle ayrılmış sunucu adresleri (yoksa OLLAMA_URL)
+    model_env: OpenAI uyumlu sunucuda model adını ezen değişken (None ise ezilmez)
+    """
+    urls = [u.strip() for u in os.getenv("LLM_ENDPOINTS", "").split(',') if u.strip()] or [default_url]
+    kwargs = {
+        'pool_size': int(os.getenv("LLM_POOL_SIZE", "8")),
+        'timeout': float(os.getenv("LLM_TIMEOUT", "180")),
+        'probe_interval': float(os.getenv("LLM_HEALTH_INTERVAL", "15")),
+        'failure_threshold': int(os.getenv("LLM_FAILURE_THRESHOLD", "3")),
+        'cooldown': float(os.getenv("LLM_CIRCUIT_COOLDOWN", "30")),
+        'scheduler': scheduler,
+    }
+    if os.getenv("LLM_BACKEND", "ollama") == 'openai':
+        model = os.getenv(model_env, model_name) if model_env else model_name
+        return OpenAICompatibleBackend(urls, model,
+                                       api_key=os.getenv("LLM_API_KEY", ""), **kwargs)
+    return OllamaBackend(urls, model_name, keep_alive=keep_alive, **kwargs)
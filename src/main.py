@@ -1,11 +1,13 @@
+import time
+IMPORT_STARTED = time.perf_counter()
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import sys
 import json
+import threading
 from datetime import datetime
-import time
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,11 +15,16 @@ if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR) 
 
 
-import analyzer as analyzer_module
-print(f"[DEBUG] analyzer module path => {analyzer_module.__file__}")
-
 from scraper import MediumScraper
 from analyzer import ContentAnalyzer
+from jobs import JobQueue, QueueFullError
+from formatting import format_analysis_for_api, format_rule_for_api
+from batch import BatchRunner, BatchStats
+from history import HistoryStore, PERIODS, parse_date, period_start
+import metrics
+import startup
+
+startup.record('importlar', IMPORT_STARTED)
 
 
 app = Flask(__name__, template_folder='../templates', static_folder='../static')
@@ -28,7 +35,42 @@ scraper = MediumScraper()
 analyzer = ContentAnalyzer()
 
 
-analysis_history = []
+history_store = HistoryStore()
+# Aynı URL bu süre içinde (aynı config ile) analiz edildiyse sonuç scraping yapılmadan
+# geçmişten döner. İçerik değişikliğini görmediği için varsayılan kapalı (0); değişmemiş
+# içerik zaten analiz önbelleğinden (içerik + config anahtarlı) gelir
+HISTORY_REUSE_SECONDS = float(os.getenv("HISTORY_REUSE_SECONDS", "0"))
+startup.record('bilesenler')
+
+
+def start_warmup():
+    """Modeli arka planda önceden yükler (OLLAMA_WARMUP=0 ile kapatılır).
+
+    gunicorn'da her worker hazır olduğunda (gunicorn.conf.py) çağrılır.
+    """
+    if os.getenv("OLLAMA_WARMUP", "1") == "0":
+        return
+    threading.Thread(target=analyzer.warmup, daemon=True, name='llm-warmup').start()
+
+
+startup.on_worker_ready(start_warmup)
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_time(response):
+    # Akışlı yanıtlarda (SSE/NDJSON) süre, başlıklar gönderilene kadar ölçülür
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'eslesmeyen'
+        metrics.HTTP_REQUEST_SECONDS.labels(
+            endpoint=endpoint, method=request.method, status=str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    return response
 
 
 @app.route('/')
@@ -36,9 +78,66 @@ def index():
     return render_template('index.html')
 
 
+def run_analysis_stage(scraping_result):
+    """LLM havuzunda çalışır: analiz + formatlama + geçmişe ekleme"""
+    analysis_result = analyzer.analyze_article(scraping_result)
+
+    if not analysis_result['success']:
+        return {
+            'success': False,
+            'error': f"Analiz Hatası: {analysis_result.get('error', '')}",
+            'raw_response': analysis_result.get('raw_response', '')
+        }, 500
+
+    formatted_result = format_analysis_for_api(analysis_result)
+    if not analysis_result.get('cached'):
+        add_to_history(formatted_result)
+    return {'success': True, 'data': formatted_result}, 200
+
+
+job_queue = JobQueue(scraper.extract_article_content, run_analysis_stage, scheduler=analyzer.scheduler)
+SYNC_WAIT_TIMEOUT = float(os.getenv("ANALYZE_SYNC_TIMEOUT", "300"))
+# Tekil analizlerin varsayılan süre sınırı (sn, kuyrukta bekleme dahil); 0 kapalı
+ANALYZE_DEADLINE = float(os.getenv("ANALYZE_DEADLINE", "0"))
+
+
+def client_socket():
+    """İstemci bağlantısının soketi (gunicorn / werkzeug); ayrılma tespiti için"""
+    return request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+
+
+def request_priority(data=None):
+    """İstekten (gövde ya da sorgu) kulvar ve süre sınırı: lane, deadline_sn"""
+    data = data or {}
+    lane = data.get('lane') or request.args.get('lane') or 'interactive'
+    try:
+        deadline = float(data.get('deadline_sn') or request.args.get('deadline_sn') or ANALYZE_DEADLINE)
+    except (TypeError, ValueError):
+        deadline = ANALYZE_DEADLINE
+    return lane, (deadline if deadline > 0 else None)
+
+
+def job_to_api(job):
+    return {
+        'id': job['id'],
+        'url': job['url'],
+        'status': job['status'],
+        'result': job['result'],
+        'birlestirildi': job.get('leader_id'),
+        'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+        'updated_at': datetime.fromtimestamp(job['updated_at']).isoformat()
+    }
+
+
 @app.route('/analyze', methods=['POST'])
 def analyze_article():
-    """Makale analizi endpoint'i"""
+    """Makale analizi endpoint'i
+
+    {"url": ..., "async": true} ile iş kimliği hemen döner (202);
+    sonuç GET /jobs/<id> ile alınır. Aksi halde aynı kuyruk üzerinden
+    sonuç beklenir; istemci beklerken ayrılırsa iş iptal edilir.
+    "lane": "bulk" düşük öncelikli kulvarı, "deadline_sn" süre sınırını seçer.
+    """
     try:
         data = request.get_json()
         if not data or 'url' not in data:
@@ -48,54 +147,212 @@ def analyze_article():
         if not url:
             return jsonify({'success': False, 'error': 'Boş URL'}), 400
 
-      
-        session['analysis_status'] = 'scraping'
-        scraping_result = scraper.extract_article_content(url)
-        if not scraping_result['success']:
-            return jsonify({
-                'success': False,
-                'error': f"Scraping Hatası: {scraping_result['error']}"
-            }), 400
+        previous = find_previous_analysis(url, data.get('force'))
+        if previous:
+            return jsonify({'success': True, 'data': previous, 'tekrar': True})
 
-        
-        session['analysis_status'] = 'analyzing'
-        analysis_result = analyzer.analyze_article(scraping_result)
+        lane, deadline = request_priority(data)
+        try:
+            job_id = job_queue.submit(url, lane, deadline)
+        except QueueFullError as e:
+            return jsonify({'success': False, 'error': str(e)}), 429
 
-        if not analysis_result['success']:
-            
+        if data.get('async') or request.args.get('async') == '1':
             return jsonify({
-                'success': False,
-                'error': f"Analiz Hatası: {analysis_result.get('error', '')}",
-                'raw_response': analysis_result.get('raw_response', '')
-            }), 500
-
-  
-        session['analysis_status'] = 'formatting'
-        formatted_result = format_analysis_for_api(analysis_result)
-
-        add_to_history(formatted_result)
-        session['analysis_status'] = 'completed'
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/jobs/{job_id}'
+            }), 202
+
+        job, finished = job_queue.wait(job_id, timeout=SYNC_WAIT_TIMEOUT, client_socket=client_socket())
+        if not finished or not job or job['result'] is None:
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': job['status'] if job else 'queued',
+                'status_url': f'/jobs/{job_id}'
+            }), 202
 
-        return jsonify({'success': True, 'data': formatted_result})
+        return jsonify(job['result']), job['http_status'] or 200
 
     except Exception as e:
         return jsonify({'success': False, 'error': f'Beklenmeyen hata: {str(e)}'}), 500
 
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/analyze/stream')
+def analyze_article_stream():
+    """Server-Sent Events ile analiz: her kural tamamlandıkça 'kural',
+    en sonda 'sonuc' olayı gönderilir. Kullanım: GET /analyze/stream?url=...
+
+    Sekme kapanınca (istemci ayrılınca) ya da deadline_sn aşılınca süren
+    Ollama isteği kesilir."""
+    url = (request.args.get('url') or '').strip()
+    lane, deadline = request_priority()
+    sock = client_socket()
+
+    def generate():
+        if not url:
+            yield sse_event('hata', {'success': False, 'error': 'URL gerekli'})
+            return
+        with analyzer.scheduler.request(lane, deadline, sock):
+            try:
+                previous = find_previous_analysis(url, request.args.get('force') == '1')
+                if previous:
+                    yield sse_event('sonuc', {'success': True, 'data': previous, 'tekrar': True})
+                    return
+
+                yield sse_event('durum', {'status': 'scraping'})
+                scraping_result = scraper.extract_article_content(url)
+                if not scraping_result['success']:
+                    yield sse_event('hata', {
+                        'success': False,
+                        'error': f"Scraping Hatası: {scraping_result['error']}"
+                    })
+                    return
+
+                yield sse_event('durum', {'status': 'analyzing'})
+                for kind, payload in analyzer.analyze_article_stream(scraping_result):
+                    if kind == 'kural':
+                        yield sse_event('kural', format_rule_for_api(payload))
+                    elif kind == 'sonuc':
+                        formatted_result = format_analysis_for_api(payload)
+                        if not payload.get('cached'):
+                            add_to_history(formatted_result)
+                        yield sse_event('sonuc', {'success': True, 'data': formatted_result})
+                    else:
+                        yield sse_event('hata', {
+                            'success': False,
+                            'error': f"Analiz Hatası: {payload.get('error', '')}",
+                            'raw_response': payload.get('raw_response', '')
+                        })
+            except Exception as e:
+                yield sse_event('hata', {'success': False, 'error': f'Beklenmeyen hata: {str(e)}'})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "500"))
+
+
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Toplu analiz: {"urls": [...]} alır, her sonucu bittiği anda JSONL
+    satırı olarak akıtır; son satır {"ozet": {...}} içerir."""
+    data = request.get_json(silent=True) or {}
+    urls = [u.strip() for u in data.get('urls', []) if isinstance(u, str) and u.strip()]
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return jsonify({'success': False, 'error': 'URL listesi gerekli'}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({'success': False, 'error': f'En fazla {BATCH_MAX_URLS} URL gönderilebilir'}), 400
+
+    sock = client_socket()
+
+    def generate():
+        stats = BatchStats()
+        # Analizler bulk kulvarında; istemci ayrılınca süren analizler de kesilir
+        with analyzer.scheduler.request('bulk', client_socket=sock) as batch_context:
+            runner = BatchRunner(scraper, analyzer, context=batch_context)
+            for record in runner.iter_results(urls, stats):
+                if record.get('success') and not record.get('onbellek'):
+                    add_to_history(record['data'])
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        yield json.dumps({'ozet': stats.summary()}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'İş bulunamadı'}), 404
+    return jsonify({'success': True, 'job': job_to_api(job)})
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Bitmemiş işi iptal eder; süren Ollama isteği kesilir"""
+    if not job_queue.cancel(job_id):
+        return jsonify({'success': False, 'error': 'İş bulunamadı ya da zaten bitti'}), 404
+    return jsonify({'success': True, 'job_id': job_id, 'status': 'cancelling'}), 202
+
+
 @app.route('/status')
 def get_status():
-    return jsonify({'status': session.get('analysis_status', 'idle')})
+    """Geriye uyumluluk: ?job_id= verilirse işin durumunu, yoksa kuyruk durumunu döner"""
+    job_id = request.args.get('job_id')
+    if job_id:
+        job = job_queue.get(job_id)
+        return jsonify({'status': job['status'] if job else 'unknown'})
+    stats = job_queue.get_stats()
+    return jsonify({'status': 'busy' if stats['pending'] else 'idle', 'queue': stats})
 
 
 @app.route('/history')
 def get_history():
-    return jsonify({'success': True, 'data': analysis_history[-10:]})
+    """Sayfalı geçmiş (en yeni önce).
+
+    Parametreler: limit (en fazla 100), cursor (önceki yanıtın next_cursor'ı),
+    url, kategori, min_puan, max_puan, kural_id, durum (virgülle birden çok),
+    donem (bugun/bu_hafta/bu_ay) ya da since/until (ISO tarih).
+    Örnek: /history?kural_id=kod_gizli_veri&durum=uygun_degil&donem=bu_ay
+    """
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', 10)), 1), 100)
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        min_puan = int(args['min_puan']) if args.get('min_puan') else None
+        max_puan = int(args['max_puan']) if args.get('max_puan') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit, cursor, min_puan ve max_puan sayı olmalı'}), 400
+
+    donem = args.get('donem')
+    if donem and donem not in PERIODS:
+        return jsonify({'success': False, 'error': f"donem şunlardan biri olmalı: {', '.join(PERIODS)}"}), 400
+    since = period_start(donem) if donem else parse_date(args.get('since'))
+    durum = [d.strip() for d in args.get('durum', '').split(',') if d.strip()] or None
+
+    items, next_cursor = history_store.query(
+        limit=limit, cursor=cursor, url=args.get('url'), kategori=args.get('kategori'),
+        min_puan=min_puan, max_puan=max_puan, kural_id=args.get('kural_id'), durum=durum,
+        since=since, until=parse_date(args.get('until'))
+    )
+    return jsonify({'success': True, 'data': items, 'next_cursor': next_cursor})
+
+
+@app.route('/analytics')
+def get_analytics():
+    """Panel verisi: kural × durum sayıları, kategori bazında puan histogramı,
+    yazar ortalamaları ve günlük trend. donem (bugun/bu_hafta/bu_ay) ya da
+    since/until (ISO tarih) ile daraltılabilir; yazar_sayisi en fazla 100."""
+    args = request.args
+    donem = args.get('donem')
+    if donem and donem not in PERIODS:
+        return jsonify({'success': False, 'error': f"donem şunlardan biri olmalı: {', '.join(PERIODS)}"}), 400
+    try:
+        top_authors = min(max(int(args.get('yazar_sayisi', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'yazar_sayisi sayı olmalı'}), 400
+    since = period_start(donem) if donem else parse_date(args.get('since'))
+    data = history_store.analytics(since, parse_date(args.get('until')), top_authors)
+    return jsonify({'success': True, 'data': data})
 
 
 @app.route('/health')
 def health_check():
     try:
-        ollama_status = analyzer.test_ollama_connection()
+        # Uç noktalar arka planda yoklanır; /health son durumu okur
+        ollama_status = analyzer.llm_status()
         return jsonify({
             'status': 'healthy',
             'components': {
@@ -103,12 +360,27 @@ def health_check():
                 'analyzer': True,
                 'ollama': ollama_status
             },
+            'cache': analyzer.cache.get_stats(),
+            'page_cache': scraper.page_cache.get_stats(),
+            'queue': job_queue.get_stats(),
+            'llm': analyzer.llm.get_stats(),
+            'history': history_store.get_stats(),
+            'similarity': analyzer.similarity.get_stats(),
+            'kademe': analyzer.small_llm.get_stats() if analyzer.small_llm is not None else None,
+            'scheduler': analyzer.scheduler.get_stats(),
+            'baslangic': {**startup.report(), 'isinma': analyzer.warmup_stats},
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
         return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    body, content_type = metrics.render_latest()
+    return Response(body, content_type=content_type)
+
+
 @app.route('/quick-check', methods=['POST'])
 def quick_check():
     try:
@@ -126,64 +398,17 @@ def quick_check():
 
 
 # Yardımcı fonksiyonlar
-def format_analysis_for_api(analysis_result):
-    try:
-        makale = analysis_result['makale_bilgi']
-        final = analysis_result['final_puanlama']
-        detaylar = analysis_result['analiz_sonucu'].get('detaylar', [])
-
-        emoji_map = {
-            'mukemmel': '🏆',
-            'iyi': '✅',
-            'orta': '⚠️',
-            'zayif': '❌',
-            'basarisiz': '🚫'
-        }
-
-        uygun_kurallar = []
-        uygun_olmayan_kurallar = []
-
-        for detail in detaylar:
-            rule_data = {
-                'id': detail.get('kural_id', ''),
-                'baslik': detail.get('kural_baslik', ''),
-                'durum': detail.get('durum', ''),
-                'puan': detail.get('puan', 0),
-                'aciklama': detail.get('aciklama', ''),
-                'ornekler': detail.get('ornek', '')
-            }
-            if detail.get('durum') == 'uygun':
-                uygun_kurallar.append(rule_data)
-            else:
-                uygun_olmayan_kurallar.append(rule_data)
-
-        return {
-            'id': f"analysis_{int(time.time())}",
-            'timestamp': analysis_result.get('timestamp'),
-            'makale': makale,
-            'puan': {
-                'deger': final.get('puan', 0),
-                'kategori': final.get('kategori', 'basarisiz'),
-                'aciklama': final.get('aciklama', ''),
-                'emoji': emoji_map.get(final.get('kategori', 'basarisiz'), '📊')
-            },
-            'kural_analizi': {
-                'toplam_kural': len(detaylar),
-                'uygun': len(uygun_kurallar),
-                'uygun_olmayan': len(uygun_olmayan_kurallar),
-                'uygun_kurallar': uygun_kurallar,
-                'uygun_olmayan_kurallar': uygun_olmayan_kurallar
-            },
-            'oneri': analysis_result['analiz_sonucu'].get('oneriler', [])
-        }
-    except Exception as e:
-        return {'error': f'Format hatası: {str(e)}', 'raw_data': analysis_result}
+def add_to_history(analysis_data):
+    # Önbellekten ya da geçmişten dönen sonuçlar yeni kayıt değildir; çağıranlar
+    # yalnızca yeni yapılan analizleri ekler (analitik sayımlar iki kez artmasın)
+    history_store.add(analysis_data, analyzer.config_fingerprint)
 
 
-def add_to_history(analysis_data):
-    if len(analysis_history) >= 50:
-        analysis_history.pop(0)
-    analysis_history.append(analysis_data)
+def find_previous_analysis(url, force=False):
+    """Aynı URL'nin yakın zamanda yapılmış analizini geçmişten döndürür"""
+    if force or HISTORY_REUSE_SECONDS <= 0:
+        return None
+    return history_store.latest_for_url(url, HISTORY_REUSE_SECONDS, analyzer.config_fingerprint)
 
 
 @app.errorhandler(404)
@@ -198,8 +423,7 @@ def internal_error(error):
 
 @app.route('/clear-history', methods=['POST'])
 def clear_history():
-    global analysis_history
-    analysis_history.clear()
+    history_store.clear()
     return jsonify({'success': True, 'message': 'Analiz geçmişi temizlendi'})
 
 
@@ -212,6 +436,7 @@ if __name__ == '__main__':
         print("✅ Ollama bağlantısı başarılı")
     else:
         print("⚠️ Ollama bağlantısı kurulamadı. Lütfen 'ollama serve' komutunu çalıştırın.")
+    start_warmup()
 
     app.run(
         host='0.0.0.0',
@@ -0,0 +1,105 @@
+"""Prometheus metrikleri ve aşama bazlı süre ölçümü.
+
+main.py, scraper.py, analyzer.py ve cache.py aynı metrik nesnelerini buradan
+kullanır. Etiketler düşük kardinaliteli tutulur (backend, mod, sonuç gibi);
+URL, makale ya da kural id'si etiket olarak kullanılmaz.
+
+gunicorn ile birden çok worker çalışıyorsa PROMETHEUS_MULTIPROC_DIR ayarlanmalı;
+/metrics bu durumda tüm worker'ların değerlerini birleştirir.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+
+# Yerel işlemler (ayrıştırma, prompt, puanlama) milisaniyeler; ağ/LLM saniyeler-dakikalar
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200, 500, 1000)
+
+SCRAPE_SECONDS = Histogram(
+    'medium_scrape_seconds', 'Makale çekme süresi (istek + ayrıştırma)',
+    ['sonuc'], buckets=SLOW_BUCKETS)
+PARSE_SECONDS = Histogram(
+    'medium_html_parse_seconds', 'HTML ayrıştırma süresi',
+    ['backend'], buckets=FAST_BUCKETS)
+PROMPT_BUILD_SECONDS = Histogram(
+    'medium_prompt_build_seconds', 'Prompt oluşturma süresi (içerik penceresi dahil)',
+    ['mod'], buckets=FAST_BUCKETS)
+OLLAMA_REQUEST_SECONDS = Histogram(
+    'medium_ollama_request_seconds', 'Ollama isteğinin uçtan uca süresi',
+    ['model', 'stream'], buckets=SLOW_BUCKETS)
+OLLAMA_PHASE_SECONDS = Histogram(
+    'medium_ollama_phase_seconds', "Ollama'nın bildirdiği aşama süreleri (load/prompt_eval/eval)",
+    ['model', 'asama'], buckets=SLOW_BUCKETS)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    'medium_ollama_tokens_per_second', 'Ollama token hızı (prompt_eval/eval)',
+    ['model', 'asama'], buckets=RATE_BUCKETS)
+JSON_EXTRACT_SECONDS = Histogram(
+    'medium_json_extract_seconds', 'LLM yanıtından JSON çıkarma süresi',
+    buckets=FAST_BUCKETS)
+SCORING_SECONDS = Histogram(
+    'medium_scoring_seconds', 'Final puan hesaplama süresi',
+    buckets=FAST_BUCKETS)
+SCHEDULER_WAIT_SECONDS = Histogram(
+    'medium_llm_queue_wait_seconds', 'LLM slotu için kulvarda bekleme süresi',
+    ['kulvar'], buckets=SLOW_BUCKETS)
+HTTP_REQUEST_SECONDS = Histogram(
+    'medium_http_request_seconds', 'Flask endpoint süresi',
+    ['endpoint', 'method', 'status'], buckets=SLOW_BUCKETS)
+
+JSON_REPAIRS = Counter(
+    'medium_json_repair_total', 'extract_json_from_response doğrudan parse edemediğinde kullanılan yol',
+    ['yol'])
+SCRAPE_RETRIES = Counter(
+    'medium_scrape_retries_total', 'Scraping yeniden denemeleri',
+    ['scraper', 'neden'])
+LLM_CANCELLED = Counter(
+    'medium_llm_cancelled_total', 'İptal edilen LLM çağrıları (bekleme ya da üretim sırasında)',
+    ['neden'])
+CACHE_REQUESTS = Counter(
+    'medium_cache_requests_total', 'Önbellek sorguları',
+    ['cache', 'sonuc'])
+
+OLLAMA_PHASES = (
+    ('load', 'load_duration', None),
+    ('prompt_eval', 'prompt_eval_duration', 'prompt_eval_count'),
+    ('eval', 'eval_duration', 'eval_count'),
+)
+
+
+@contextmanager
+def timed(histogram, **labels):
+    """Bloğun süresini verilen histograma yazar"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        target = histogram.labels(**labels) if labels else histogram
+        target.observe(time.perf_counter() - started)
+
+
+def observe_ollama_stats(stats: Dict, model: str):
+    """Ollama yanıt alanlarından (nanosaniye süreler, token sayıları) aşama
+    sürelerini ve token/sn değerlerini kaydeder"""
+    for phase, duration_key, count_key in OLLAMA_PHASES:
+        duration_ns = stats.get(duration_key)
+        if not duration_ns:
+            continue
+        seconds = duration_ns / 1e9
+        OLLAMA_PHASE_SECONDS.labels(model=model, asama=phase).observe(seconds)
+        if count_key and stats.get(count_key):
+            OLLAMA_TOKENS_PER_SECOND.labels(model=model, asama=phase).observe(stats[count_key] / seconds)
+
+
+def render_latest():
+    """/metrics yanıt gövdesi ve content-type"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
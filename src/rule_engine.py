@@ -0,0 +1,208 @@
+import base64
+import re
+import time
+from typing import Dict, List, Optional
+
+
+# (ad, desen, karar_verir) — karar_verir: sağlayıcıya özgü biçimler; yer tutucu
+# değilse kod_gizli_veri'yi doğrudan karara bağlar ve analizi kısa devre
+# eder. Diğerleri yalnızca LLM'e kanıt olarak iletilir.
+SECRET_PATTERNS = [
+    ('private_key', r'-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP )?PRIVATE KEY-----', True),
+    ('aws_access_key', r'\b(?:AKIA|ASIA)[0-9A-Z]{16}\b', True),
+    ('github_token', r'\bgh[pousr]_[A-Za-z0-9]{36,}\b', True),
+    ('slack_token', r'\bxox[abprs]-[A-Za-z0-9-]{10,}', True),
+    ('google_api_key', r'\bAIza[0-9A-Za-z_\-]{35}', True),
+    ('openai_key', r'\bsk-(?:proj-)?[A-Za-z0-9_\-]{20,}', True),
+    ('jwt', r'\beyJ[A-Za-z0-9_\-]{10,}\.(eyJ[A-Za-z0-9_\-]{10,})\.[A-Za-z0-9_\-]{10,}', False),
+    ('url_credentials', r'\b[a-z][a-z0-9+.\-]*://[^/\s:@]+:([^/\s:@]{3,})@([^/\s:?#]+)', False),
+    ('credential_assignment',
+     r'''(?i)\b(?:api[_-]?key|secret|token|passw(?:or)?d|access[_-]?key)\b\s*[:=]\s*['"]([^'"\s]{8,})['"]''',
+     False),
+    ('private_ip',
+     r'\b(?:10(?:\.\d{1,3}){3}|192\.168(?:\.\d{1,3}){2}|172\.(?:1[6-9]|2\d|3[01])(?:\.\d{1,3}){2})\b',
+     False),
+]
+
+# Örnek kodlarda sık görülen yer tutucu değerler sır sayılmaz
+PLACEHOLDER_RE = re.compile(
+    r'(?i)(your|example|sample|xxx|\*\*\*|<|\{|\$|placeholder|changeme|dummy|redacted|fake|foobar|'
+    r'test|demo|john doe|jane doe|1234567890)'
+)
+
+# Dokümantasyonda kullanılan parola/sunucu değerleri (URL içi kimlik bilgisi)
+SAMPLE_PASSWORDS = {'password', 'passwd', 'pass', 'pwd', 'secret', 'mypassword', 'mysecretpassword',
+                    'admin', 'root', 'postgres', 'user', 'guest', '123456', '12345678', 'qwerty'}
+DOC_HOST_RE = re.compile(
+    r'(?i)^(localhost|127\.\d+\.\d+\.\d+|0\.0\.0\.0|host|hostname|server|db|database|'
+    r'(?:[\w-]+\.)*example(?:\.(?:com|org|net))?|[\w.-]+\.(?:local|test|invalid))$'
+)
+# Eşleşmeden hemen önce "örnek" bağlamı varsa belge örneğidir
+EXAMPLE_CONTEXT_RE = re.compile(r'(?i)(örne[kğ]|example|e\.g\.|sample|placeholder|varsayılan|default)')
+EXAMPLE_CONTEXT_CHARS = 80
+
+# Router/modem kılavuzlarında geçen varsayılan ağ geçidi adresleri
+DOC_IPS = {'192.168.0.1', '192.168.1.1', '192.168.1.254', '10.0.0.1', '10.0.0.138'}
+
+INTERNAL_MARKERS_RE = re.compile(
+    r'(?i)\b(?:internal use only|company confidential|strictly confidential|do not distribute|'
+    r'not for distribution|şirket içi kullanım|hizmete özel|gizlidir)\b'
+)
+
+
+def _jwt_payload(segment: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4)).decode('utf-8', 'replace')
+    except (ValueError, TypeError):
+        return ''
+
+
+def is_documentation_value(name: str, match: re.Match, text: str) -> bool:
+    """Eşleşme yer tutucu, bilinen örnek değer ya da "örnek" bağlamında mı"""
+    value = match.group(1) if match.groups() else match.group(0)
+    if PLACEHOLDER_RE.search(value):
+        return True
+    if name == 'jwt' and PLACEHOLDER_RE.search(_jwt_payload(value)):
+        # jwt.io örnek belirteci: {"sub": "1234567890", "name": "John Doe", ...}
+        return True
+    if name == 'url_credentials' and (value.lower() in SAMPLE_PASSWORDS or DOC_HOST_RE.match(match.group(2))):
+        return True
+    if name == 'private_ip' and value in DOC_IPS:
+        return True
+    before = text[max(0, match.start() - EXAMPLE_CONTEXT_CHARS):match.start()]
+    return bool(EXAMPLE_CONTEXT_RE.search(before))
+
+
+def _snippet(text: str, start: int, end: int, width: int = 60) -> str:
+    return ' '.join(text[max(0, start - width):min(len(text), end + width)].split())
+
+
+def _mask(value: str) -> str:
+    value = value.strip()
+    return value[:4] + '…' if len(value) > 4 else '…'
+
+
+class RuleEngine:
+    """LLM'den önce çalışan deterministik ön tarama motoru.
+
+    - Tüm anahtar_kelimeler tek bir derlenmiş regex ile tek geçişte aranır
+    - Sağlayıcıya özgü anahtar biçimleri (yer tutucu değilse) kod_gizli_veri
+      kuralını doğrudan karara bağlar ve kesin ihlal sayılır; hiçbir bulgu
+      yoksa kural uygun sayılır
+    - JWT, URL içi parola, parola ataması, özel IP ve "dahili/gizli"
+      işaretleri yalnızca desen eşleşmesidir: kural LLM'e bırakılır, bulgu
+      prompta kanıt olarak eklenir
+
+    Karar verilen kurallar LLM prompt'undan çıkarılır; kesin ihlal varsa
+    analiz LLM çağrılmadan sonlanır.
+    """
+
+    def __init__(self, checklist: Dict):
+        self.rules = {rule['id']: rule for rule in checklist.get('kontrol_maddeleri', [])}
+
+        self._keyword_rules = {}
+        for rule_id, rule in self.rules.items():
+            for kw in rule.get('anahtar_kelimeler', []):
+                self._keyword_rules.setdefault(kw.casefold(), []).append(rule_id)
+
+        keywords = sorted(self._keyword_rules, key=len, reverse=True)
+        self._keyword_re = re.compile(
+            r'(?<!\w)(' + '|'.join(re.escape(kw) for kw in keywords) + r')(?!\w)',
+            re.IGNORECASE
+        ) if keywords else None
+
+        self._secret_patterns = [(name, re.compile(pattern), decides) for name, pattern, decides in SECRET_PATTERNS]
+
+    def match_keywords(self, text: str) -> Dict[str, List[str]]:
+        """rule_id -> metinde geçen anahtar kelimeler"""
+        hits = {}
+        if not self._keyword_re or not text:
+            return hits
+        for match in self._keyword_re.finditer(text):
+            kw = match.group(1).casefold()
+            for rule_id in self._keyword_rules.get(kw, []):
+                found = hits.setdefault(rule_id, [])
+                if kw not in found:
+                    found.append(kw)
+        return hits
+
+    def find_secrets(self, text: str) -> List[Dict]:
+        """Desen başına ilk gerçek (yer tutucu/örnek olmayan) eşleşme"""
+        findings = []
+        if not text:
+            return findings
+        for name, pattern, decides in self._secret_patterns:
+            for match in pattern.finditer(text):
+                if is_documentation_value(name, match, text):
+                    continue
+                value = match.group(1) if match.groups() else match.group(0)
+                findings.append({'tur': name, 'karar_verir': decides, 'ornek': _mask(value),
+                                 'baglam': _snippet(text, match.start(), match.end())})
+                break
+        return findings
+
+    def find_internal_marker(self, text: str) -> Optional[Dict]:
+        for match in INTERNAL_MARKERS_RE.finditer(text or ''):
+            before = text[max(0, match.start() - EXAMPLE_CONTEXT_CHARS):match.start()]
+            # "… gibi etiketler", "örneğin 'Company Confidential'" konu anlatımıdır
+            if EXAMPLE_CONTEXT_RE.search(before):
+                continue
+            return {'tur': 'dahili_isaret', 'ornek': match.group(0),
+                    'baglam': _snippet(text, match.start(), match.end())}
+        return None
+
+    def _detail(self, rule_id: str, durum: str, puan: int, aciklama: str, ornek: str = '') -> Dict:
+        return {
+            'kural_id': rule_id,
+            'kural_baslik': self.rules[rule_id]['baslik'],
+            'durum': durum,
+            'puan': puan,
+            'aciklama': aciklama,
+            'ornek': ornek,
+            'kaynak': 'kural_motoru'
+        }
+
+    def evaluate(self, article_data: Dict) -> Dict:
+        """Makaleyi ön tarar.
+
+        Dönüş: {'kararlar': {rule_id: detay}, 'kesin_ihlaller': [rule_id],
+                'bulgular': {rule_id: [bulgu]}, 'anahtar_kelimeler': {rule_id: [kw]},
+                'sure_ms': float}
+        """
+        started = time.perf_counter()
+        text = f"{article_data.get('title', '')}\n{article_data.get('content', '') or ''}"
+
+        keyword_hits = self.match_keywords(text)
+        decisions = {}
+        hard_violations = []
+        evidence = {}
+
+        if 'kod_gizli_veri' in self.rules:
+            secrets = self.find_secrets(text)
+            deciding = [f for f in secrets if f['karar_verir']]
+
+            if deciding:
+                kinds = ', '.join(sorted({f['tur'] for f in deciding}))
+                decisions['kod_gizli_veri'] = self._detail(
+                    'kod_gizli_veri', 'uygun_degil', 0,
+                    f"Metinde açık kimlik bilgisi/sır tespit edildi ({kinds}).", deciding[0]['ornek'])
+                hard_violations.append('kod_gizli_veri')
+            elif secrets:
+                evidence['kod_gizli_veri'] = secrets
+            elif 'kod_gizli_veri' not in keyword_hits:
+                decisions['kod_gizli_veri'] = self._detail(
+                    'kod_gizli_veri', 'uygun', 10,
+                    "Kimlik bilgisi, anahtar veya özel IP bulunmadı.")
+
+        if 'gizlilik_dahili_bilgi' in self.rules:
+            marker = self.find_internal_marker(text)
+            if marker:
+                evidence['gizlilik_dahili_bilgi'] = [marker]
+
+        return {
+            'kararlar': decisions,
+            'kesin_ihlaller': hard_violations,
+            'bulgular': evidence,
+            'anahtar_kelimeler': keyword_hits,
+            'sure_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
@@ -0,0 +1,296 @@
+"""LLM istekleri için öncelikli kulvarlar, süre sınırı ve iptal.
+
+Her analiz bir `RequestContext` içinde çalışır (kulvar, süre sınırı, istemci
+soketi). Bağlam contextvar ile taşınır; LLM backend'i her Ollama çağrısında
+`LLMScheduler.slot()` ile sıra bekler ve iptal edildiğinde açık HTTP
+bağlantısını kapatarak Ollama'nın üretimi bırakmasını sağlar.
+
+- interactive: tarayıcıdan gelen tekil analizler, her zaman önce
+- bulk: toplu analizler; `BULK_MAX_WAIT` saniyeden uzun bekleyen bulk istek
+  interactive ile aynı önceliğe yükselir (açlık olmaz)
+- İzleyici thread süre sınırı geçen, istemcisi ayrılan ya da iptali istenen
+  bağlamları iptal eder
+
+Kuyruk bir süreç içindir; gunicorn'da her worker kendi slotlarını yönetir.
+"""
+import contextvars
+import os
+import select
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import metrics
+import startup
+
+LANES = ('interactive', 'bulk')
+
+_current = contextvars.ContextVar('llm_request', default=None)
+
+
+class Cancelled(Exception):
+    """İstek iptal edildi; reason: 'iptal', 'istemci_ayrildi' ya da 'sure_asimi'"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"İstek iptal edildi ({reason})")
+        self.reason = reason
+
+
+def current_request() -> Optional['RequestContext']:
+    return _current.get()
+
+
+@contextmanager
+def use_context(ctx: Optional['RequestContext']):
+    """Bağlamı bu thread'in (ve kopyalanan contextvar'ların) etkin isteği yapar"""
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+def client_disconnected(sock) -> bool:
+    """İstemci bağlantıyı kapattı mı (okunabilir ve MSG_PEEK boş dönüyor)"""
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        # Kapalı dosya tanımlayıcı ya da MSG_PEEK desteklemeyen soket (TLS)
+        return getattr(sock, 'fileno', lambda: -1)() == -1
+
+
+class RequestContext:
+    """Tek bir analiz isteğinin kulvarı, süre sınırı ve iptal durumu"""
+
+    def __init__(self, lane: str = 'interactive', deadline: Optional[float] = None,
+                 client_socket=None, parent: Optional['RequestContext'] = None):
+        self.lane = lane if lane in LANES else 'interactive'
+        self.deadline_at = time.monotonic() + deadline if deadline else None
+        self.client_socket = client_socket
+        self.reason = None
+        # (neden, fonksiyon): izleyici her turda çağırır, True dönerse iptal eder
+        self.checks = []
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._next_key = 0
+        self._parent = parent
+        self._parent_key = parent.on_cancel(lambda: self.cancel(parent.reason)) if parent else None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline_at is None else self.deadline_at - time.monotonic()
+
+    def on_cancel(self, fn: Callable) -> int:
+        """İptalde çağrılacak fonksiyonu kaydeder; zaten iptal edildiyse hemen çağırır"""
+        with self._lock:
+            if self.reason is None:
+                self._next_key += 1
+                self._callbacks[self._next_key] = fn
+                return self._next_key
+        fn()
+        return 0
+
+    def remove_callback(self, key: int):
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+    def cancel(self, reason: str = 'iptal') -> bool:
+        with self._lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason or 'iptal'
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                print(f"İptal geri çağrısı hatası: {e}")
+        return True
+
+    def check(self):
+        """İptal edildiyse ya da süre sınırı geçtiyse Cancelled fırlatır"""
+        if self.reason is None and self.deadline_at is not None and time.monotonic() >= self.deadline_at:
+            self.cancel('sure_asimi')
+        if self.reason is not None:
+            raise Cancelled(self.reason)
+
+    def poll(self):
+        """İzleyici thread'den: süre sınırı, istemci soketi ve ek kontroller"""
+        if self.reason is not None:
+            return
+        if self.deadline_at is not None and time.monotonic() >= self.deadline_at:
+            self.cancel('sure_asimi')
+        elif client_disconnected(self.client_socket):
+            self.cancel('istemci_ayrildi')
+        else:
+            for reason, fn in self.checks:
+                if fn():
+                    self.cancel(reason)
+                    break
+
+    def close(self):
+        """Üst bağlamla ilişkiyi keser (bağlam işini bitirdiğinde)"""
+        if self._parent is not None:
+            self._parent.remove_callback(self._parent_key)
+
+
+class LLMScheduler:
+    """LLM çağrılarını kulvar önceliğiyle sınırlı sayıda slota dağıtır"""
+
+    def __init__(self, slots: int = 2, bulk_max_wait: float = 60, poll_interval: float = 0.5):
+        self.enabled = os.getenv("LLM_SCHEDULER", "1") != "0"
+        self.slots = max(1, int(os.getenv("LLM_SLOTS", slots)))
+        self.bulk_max_wait = float(os.getenv("BULK_MAX_WAIT", bulk_max_wait))
+        self.poll_interval = float(os.getenv("SCHEDULER_POLL", poll_interval))
+        self._start()
+        startup.after_fork(self._start)
+
+    def _start(self):
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = 0
+        self._active = 0
+        self._running = {lane: 0 for lane in LANES}
+        self._done = {lane: 0 for lane in LANES}
+        self._waits = {lane: deque(maxlen=500) for lane in LANES}
+        self._cancelled = {}
+        self._watched = set()
+        self._monitor = None
+
+    # --- İstek bağlamı ---
+
+    def watch(self, ctx: RequestContext):
+        """Bağlamı izleyici thread'e ekler (süre sınırı, soket ve ek kontroller)"""
+        with self._cond:
+            self._watched.add(ctx)
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._monitor_loop, daemon=True, name='llm-scheduler')
+                self._monitor.start()
+
+    def unwatch(self, ctx: RequestContext):
+        with self._cond:
+            self._watched.discard(ctx)
+
+    @contextmanager
+    def request(self, lane: str = 'interactive', deadline: Optional[float] = None,
+                client_socket=None, parent: Optional[RequestContext] = None):
+        """Bloğu bir istek bağlamında çalıştırır; blok bitince bağlam ve
+        alt bağlamları (toplu analizin makaleleri) serbest bırakılır"""
+        ctx = RequestContext(lane, deadline, client_socket, parent)
+        if ctx.deadline_at is not None or client_socket is not None:
+            self.watch(ctx)
+        try:
+            with use_context(ctx):
+                yield ctx
+        finally:
+            self.unwatch(ctx)
+            ctx.close()
+            # Blok erken bittiyse (istemci akışı kapattı) süren alt işler de durur
+            ctx.cancel('iptal')
+
+    def _monitor_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._cond:
+                watched = list(self._watched)
+            for ctx in watched:
+                ctx.poll()
+
+    # --- Slotlar ---
+
+    def _next_waiter(self):
+        now = time.monotonic()
+        return min(self._waiting, key=lambda w: (
+            0 if w[0] == 'interactive' or now - w[1] >= self.bulk_max_wait else 1, w[2]))
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Etkin isteğin kulvarında sıra bekler; blok süresince bir slot tutar"""
+        ctx = current_request()
+        lane = ctx.lane if ctx else 'interactive'
+        try:
+            if ctx:
+                ctx.check()
+            if not self.enabled:
+                yield
+                return
+
+            started = time.monotonic()
+            wake_key = ctx.on_cancel(self._wake) if ctx else 0
+            with self._cond:
+                self._seq += 1
+                waiter = (lane, started, self._seq)
+                self._waiting.append(waiter)
+                try:
+                    while self._active >= self.slots or self._next_waiter() is not waiter:
+                        if ctx:
+                            ctx.check()
+                        timeout = self.poll_interval
+                        remaining = ctx.remaining() if ctx else None
+                        if remaining is not None:
+                            timeout = max(0.0, min(timeout, remaining))
+                        self._cond.wait(timeout)
+                finally:
+                    self._waiting.remove(waiter)
+                    self._cond.notify_all()
+                self._active += 1
+                self._running[lane] += 1
+            if ctx:
+                ctx.remove_callback(wake_key)
+            waited = time.monotonic() - started
+            self._waits[lane].append(waited)
+            metrics.SCHEDULER_WAIT_SECONDS.labels(kulvar=lane).observe(waited)
+
+            try:
+                yield
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._running[lane] -= 1
+                    self._done[lane] += 1
+                    self._cond.notify_all()
+        except Cancelled as e:
+            with self._cond:
+                self._cancelled[e.reason] = self._cancelled.get(e.reason, 0) + 1
+            metrics.LLM_CANCELLED.labels(neden=e.reason).inc()
+            raise
+
+    def get_stats(self) -> Dict:
+        from batch import percentile
+
+        with self._cond:
+            waiting = [w[0] for w in self._waiting]
+            lanes = {}
+            for lane in LANES:
+                waits = list(self._waits[lane])
+                lanes[lane] = {
+                    'bekleyen': waiting.count(lane),
+                    'calisan': self._running[lane],
+                    'tamamlanan': self._done[lane],
+                    'bekleme_p50_ms': round(percentile(waits, 50) * 1000, 1),
+                    'bekleme_p95_ms': round(percentile(waits, 95) * 1000, 1)
+                }
+            return {
+                'aktif': self.enabled,
+                'slot': self.slots,
+                'kullanilan_slot': self._active,
+                'kulvarlar': lanes,
+                'iptal': dict(self._cancelled),
+                'izlenen_istek': len(self._watched)
+            }
@@ -6,17 +6,28 @@ import time
 import json
 import unicodedata
 import html
+import os
+
+from cache import PageCache
+import metrics
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                   'AppleWebKit/537.36 (KHTML, like Gecko) '
+                   'Chrome/123.0.0.0 Safari/537.36'),
+    'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7'
+}
 
 
 class MediumScraper:
     def __init__(self):
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                           'AppleWebKit/537.36 (KHTML, like Gecko) '
-                           'Chrome/123.0.0.0 Safari/537.36'),
-            'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7'
-        })
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.page_cache = PageCache()
+        # 'bs4': BeautifulSoup + html.parser (varsayılan); 'lxml': hızlı tek geçişli çıkarım
+        self.backend = os.getenv("SCRAPER_BACKEND", "bs4")
+        self._lxml_extractor = None
 
     def is_valid_medium_url(self, url):
         try:
@@ -42,11 +53,13 @@ class MediumScraper:
 
     def _extract_from_ldjson(self, soup):
         """script[type=application/ld+json] içinden başlık/yazar yakalamaya çalışır"""
+        texts = [tag.string for tag in soup.find_all("script", {"type": "application/ld+json"}) if tag.string]
+        return self._ldjson_from_texts(texts)
+
+    def _ldjson_from_texts(self, texts):
         try:
-            for tag in soup.find_all("script", {"type": "application/ld+json"}):
-                if not tag.string:
-                    continue
-                obj = json.loads(tag.string)
+            for text in texts:
+                obj = json.loads(text)
                 items = obj if isinstance(obj, list) else [obj]
                 for it in items:
                     t = it.get("@type") or it.get("type")
@@ -142,45 +155,96 @@ class MediumScraper:
 
     def extract_article_content(self, url):
         """Medium makalesinin içeriğini çeker"""
+        started = time.perf_counter()
+        result = self._extract_article_content(url)
+        outcome = 'basarili' if result.get('success') else 'hata'
+        metrics.SCRAPE_SECONDS.labels(sonuc=outcome).observe(time.perf_counter() - started)
+        return result
+
+    def _extract_article_content(self, url):
         try:
             if not self.is_valid_medium_url(url):
                 return {'success': False, 'error': 'Geçerli bir Medium URL\'si değil'}
 
+            cached = self.page_cache.get(url)
+            conditional = self.page_cache.conditional_headers(cached)
+
             last_exc = None
             response = None
             for attempt in range(3):
                 try:
-                    response = self.session.get(url, timeout=15)
+                    response = self.session.get(url, timeout=15, headers=conditional)
                     response.raise_for_status()
                     break
                 except requests.RequestException as e:
                     last_exc = e
                     if attempt == 2:
                         raise
+                    metrics.SCRAPE_RETRIES.labels(scraper='sync', neden=type(e).__name__).inc()
                     time.sleep(1.2 * (attempt + 1))
 
             if response is None:
                 raise last_exc or Exception("Bilinmeyen istek hatası")
 
+            # Sayfa değişmemiş: indirme ve ayrıştırma yok, saklı çıkarım kullanılır
+            if response.status_code == 304 and cached:
+                self.page_cache.mark_revalidated(url)
+                return self.article_from_cache(cached, url)
+
             # Türkçe karakterler bozulmasın diye UTF-8’e sabitliyoruz
             response.encoding = "utf-8"
-            soup = BeautifulSoup(response.text, 'html.parser')
+            result = self.parse_article_html(response.text, url)
+            if result['success']:
+                self.page_cache.set(url, response.headers.get('ETag'),
+                                    response.headers.get('Last-Modified'), result)
+            return result
 
-            # ld+json
-            title = ""
-            author = ""
-            ld = self._extract_from_ldjson(soup)
-            if ld:
-                title = ld.get("title") or ""
-                author = ld.get("author") or ""
+        except requests.RequestException as e:
+            return {'success': False, 'error': f'HTTP Hatası: {str(e)}'}
+        except Exception as e:
+            return {'success': False, 'error': f'Genel Hata: {str(e)}'}
+
+    def article_from_cache(self, cached, url):
+        article = dict(cached['article'])
+        article.update({'success': True, 'url': url})
+        return article
+
+    def extract_fields_bs4(self, html_text):
+        soup = BeautifulSoup(html_text, 'html.parser')
+
+        # ld+json
+        title = ""
+        author = ""
+        ld = self._extract_from_ldjson(soup)
+        if ld:
+            title = ld.get("title") or ""
+            author = ld.get("author") or ""
+
+        if not title:
+            title = self._extract_title(soup)
 
-            if not title:
-                title = self._extract_title(soup)
+        content = self._extract_content(soup)
 
-            content = self._extract_content(soup)
+        if not author:
+            author = self._extract_author(soup)
 
-            if not author:
-                author = self._extract_author(soup)
+        return {'title': title, 'author': author, 'content': content}
+
+    def extract_fields_lxml(self, html_text):
+        if self._lxml_extractor is None:
+            from fast_extract import LxmlExtractor
+            self._lxml_extractor = LxmlExtractor(self.clean_text, self._ldjson_from_texts)
+        return self._lxml_extractor.extract(html_text)
+
+    def parse_article_html(self, html_text, url):
+        """İndirilmiş HTML'den başlık/yazar/içerik çıkarır"""
+        try:
+            with metrics.timed(metrics.PARSE_SECONDS, backend=self.backend):
+                if self.backend == 'lxml':
+                    fields = self.extract_fields_lxml(html_text)
+                else:
+                    fields = self.extract_fields_bs4(html_text)
+            title, author, content = fields['title'], fields['author'], fields['content']
 
             if not title and not content:
                 return {'success': False, 'error': 'Makale içeriği çekilemedi. Sayfa yapısı tanınmıyor.'}
@@ -194,8 +258,6 @@ class MediumScraper:
                 'word_count': len(content.split()) if content else 0
             }
 
-        except requests.RequestException as e:
-            return {'success': False, 'error': f'HTTP Hatası: {str(e)}'}
         except Exception as e:
             return {'success': False, 'error': f'Genel Hata: {str(e)}'}
 
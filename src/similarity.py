@@ -0,0 +1,313 @@
+"""Taranan tüm makaleler üzerinde MinHash/LSH yakın kopya indeksi.
+
+Kullanım (proje kök dizininden):
+    python src/similarity.py --backfill      # sayfa önbelleğindeki makaleleri indekse ekler
+    python src/similarity.py --stats
+
+- Metin kelime n-gram'larına (shingle) bölünür; imza tek permütasyonlu
+  MinHash'tir: her shingle bir kez hash'lenip num_perm kovadan birine düşer,
+  kova başına en küçük değer tutulur, boş kovalar komşudan doldurulur. İmza
+  maliyeti shingle sayısıyla doğrusal, permütasyon sayısından bağımsızdır.
+- İmza bands × rows parçalara bölünür; her parça SQLite'ta indekslenen tek
+  bir anahtardır. Adaylar yalnızca en az bir parçası aynı olan makalelerdir,
+  ikili karşılaştırma yapılmaz.
+- Adayın Jaccard benzerliği imzalardaki eşit konum oranıyla tahmin edilir.
+- Makalenin kendisi (aynı URL, aynı Medium yazı kimliği ya da aynı yazar)
+  eşleşme sayılmaz; makale indekse ancak analizi başarıyla bittiğinde eklenir.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from cache import DEFAULT_DATA_DIR, normalize_content, normalize_url
+
+WORD_RE = re.compile(r'\w+')
+# Medium yazı kimliği: /p/<id> ya da /@yazar/baslik-<id> yolunun sonundaki hex
+POST_ID_RE = re.compile(r'(?:^|[-/])([0-9a-f]{10,16})$')
+MAX_HASH = 0xFFFFFFFF
+EMPTY = MAX_HASH
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Normalize edilmiş metnin kelime `size`-gram'larının 32 bit hash'leri"""
+    words = WORD_RE.findall(normalize_content(text or '').casefold())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+def post_id(url: str) -> str:
+    """Aynı yazının farklı adreslerinde (/p/<id>, /@yazar/slug-<id>) ortak kimlik"""
+    path = urlsplit(url or '').path.rstrip('/')
+    match = POST_ID_RE.search(path.lower())
+    return match.group(1) if match else ''
+
+
+def _mix(value: int) -> int:
+    """crc32 çıktısını kovalara eşit dağıtmak için 32 bit karıştırma (murmur3 fmix32)"""
+    value ^= value >> 16
+    value = (value * 0x85EBCA6B) & MAX_HASH
+    value ^= value >> 13
+    value = (value * 0xC2B2AE35) & MAX_HASH
+    return value ^ (value >> 16)
+
+
+def minhash(shingle_hashes, num_perm: int = 128) -> array:
+    """Tek permütasyonlu MinHash imzası (boş kovalar sağdaki dolu kovadan doldurulur)"""
+    bins = [EMPTY] * num_perm
+    for h in shingle_hashes:
+        h = _mix(h)
+        b = h % num_perm
+        v = h // num_perm
+        if v < bins[b]:
+            bins[b] = v
+    if all(v == EMPTY for v in bins):
+        return array('I', bins)
+    for i in range(num_perm):
+        if bins[i] != EMPTY:
+            continue
+        offset = 1
+        while bins[(i + offset) % num_perm] == EMPTY:
+            offset += 1
+        # Doldurulan değer kaynağından ayırt edilebilsin diye uzaklık eklenir
+        bins[i] = (bins[(i + offset) % num_perm] + offset * 0x9E3779B1) & (MAX_HASH - 1)
+    return array('I', bins)
+
+
+def estimate_jaccard(sig_a: array, sig_b: array) -> float:
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class SimilarityIndex:
+    """SQLite'ta kalıcı, artımlı güncellenen LSH indeksi.
+
+    Tablolar: docs (makale başına imza ve özet bilgi) ve bands (LSH parça
+    anahtarı → makale). Aynı URL yeniden eklenirse imzası güncellenir.
+    """
+
+    def __init__(self, db_path=None):
+        data_dir = os.getenv("DATA_DIR", DEFAULT_DATA_DIR)
+        self.db_path = os.getenv("SIMILARITY_DB", db_path or os.path.join(data_dir, 'similarity.sqlite3'))
+        self.enabled = os.getenv("SIMILARITY_INDEX", "1") != "0"
+        self.num_perm = int(os.getenv("SIMILARITY_NUM_PERM", "128"))
+        self.bands = int(os.getenv("SIMILARITY_BANDS", "32"))
+        self.rows = self.num_perm // self.bands
+        self.shingle_size = int(os.getenv("SIMILARITY_SHINGLE", "5"))
+        # Bu kadar shingle'dan kısa metinler için sinyal güvenilmez sayılır
+        self.min_shingles = int(os.getenv("SIMILARITY_MIN_SHINGLES", "50"))
+        self.min_similarity = float(os.getenv("SIMILARITY_MIN", "0.3"))
+        self.top_k = int(os.getenv("SIMILARITY_TOP_K", "5"))
+
+        self._lock = threading.Lock()
+        self._disk_ok = False
+        if self.enabled:
+            try:
+                os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+                with self._connect() as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS docs ("
+                        " id INTEGER PRIMARY KEY,"
+                        " url_key TEXT NOT NULL UNIQUE,"
+                        " url TEXT NOT NULL,"
+                        " baslik TEXT,"
+                        " yazar TEXT,"
+                        " shingle_sayisi INTEGER NOT NULL,"
+                        " imza BLOB NOT NULL,"
+                        " eklenme REAL NOT NULL)"
+                    )
+                    columns = {row[1] for row in conn.execute("PRAGMA table_info(docs)")}
+                    if 'post_id' not in columns:
+                        conn.execute("ALTER TABLE docs ADD COLUMN post_id TEXT")
+                        conn.executemany("UPDATE docs SET post_id = ? WHERE id = ?", [
+                            (post_id(url), doc_id) for doc_id, url in conn.execute("SELECT id, url FROM docs")])
+                    conn.execute("CREATE TABLE IF NOT EXISTS bands (anahtar INTEGER NOT NULL, doc_id INTEGER NOT NULL)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_anahtar ON bands(anahtar)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_doc ON bands(doc_id)")
+                    conn.execute("CREATE TABLE IF NOT EXISTS meta (ad TEXT PRIMARY KEY, deger TEXT NOT NULL)")
+                    layout = f"{self.num_perm}x{self.bands}x{self.shingle_size}"
+                    row = conn.execute("SELECT deger FROM meta WHERE ad = 'duzen'").fetchone()
+                    if row and row[0] != layout:
+                        # İmza düzeni değişti: eski imzalar karşılaştırılamaz
+                        print(f"Benzerlik indeksi düzeni değişti ({row[0]} → {layout}), indeks sıfırlanıyor.")
+                        conn.execute("DELETE FROM bands")
+                        conn.execute("DELETE FROM docs")
+                    conn.execute("INSERT OR REPLACE INTO meta (ad, deger) VALUES ('duzen', ?)", (layout,))
+                self._disk_ok = True
+            except Exception as e:
+                print(f"Benzerlik indeksi açılamadı ({self.db_path}): {e}")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def signature(self, text: str):
+        """(imza ya da kısa metinde None, shingle sayısı)"""
+        hashes = shingles(text, self.shingle_size)
+        if len(hashes) < self.min_shingles:
+            return None, len(hashes)
+        return minhash(hashes, self.num_perm), len(hashes)
+
+    def band_keys(self, sig: array) -> List[int]:
+        """Her parça için parça numarası üst bitlerde olan tek bir tamsayı anahtar"""
+        return [
+            zlib.crc32(sig[band * self.rows:(band + 1) * self.rows].tobytes()) | (band << 32)
+            for band in range(self.bands)
+        ]
+
+    def query(self, sig: array, exclude_url: str = '') -> Dict:
+        """En benzer makaleler; aday başına yalnızca imza karşılaştırması yapılır.
+        exclude_url'ün kendisi (normalize URL ya da yazı kimliği) eşleşme sayılmaz;
+        aynı yazarın başka URL'deki yazıları (yeniden yayın) sayılır."""
+        started = time.perf_counter()
+        keys = self.band_keys(sig)
+        placeholders = ','.join('?' * len(keys))
+        with self._connect() as conn:
+            candidate_ids = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT doc_id FROM bands WHERE anahtar IN ({placeholders})", keys)]
+            rows = []
+            for i in range(0, len(candidate_ids), 500):
+                batch = candidate_ids[i:i + 500]
+                rows.extend(conn.execute(
+                    f"SELECT url_key, url, baslik, yazar, imza, post_id FROM docs"
+                    f" WHERE id IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall())
+
+        exclude_key = normalize_url(exclude_url) if exclude_url else ''
+        exclude_post = post_id(exclude_url)
+        compare_started = time.perf_counter()
+        matches = []
+        for url_key, url, title, author, blob, doc_post_id in rows:
+            if url_key == exclude_key or (exclude_post and doc_post_id == exclude_post):
+                continue
+            other = array('I')
+            other.frombytes(blob)
+            score = estimate_jaccard(sig, other)
+            if score >= self.min_similarity:
+                matches.append({'url': url, 'baslik': title, 'yazar': author, 'benzerlik': round(score, 3)})
+        compare_ms = (time.perf_counter() - compare_started) * 1000
+        matches.sort(key=lambda m: m['benzerlik'], reverse=True)
+        return {
+            'eslesmeler': matches[:self.top_k],
+            'aday_sayisi': len(rows),
+            'aday_basina_us': round(compare_ms * 1000 / len(rows), 2) if rows else 0.0,
+            'sure_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def add(self, url: str, title: str, author: str, sig: array, shingle_count: int):
+        """Makaleyi ekler ya da aynı URL'nin imzasını günceller"""
+        self.add_many([(url, title, author, sig, shingle_count)])
+
+    def add_many(self, items):
+        """(url, başlık, yazar, imza, shingle sayısı) kayıtlarını tek transaction'da ekler"""
+        with self._lock, self._connect() as conn:
+            for url, title, author, sig, shingle_count in items:
+                pid = post_id(url)
+                old = conn.execute("SELECT id FROM docs WHERE url_key = ? OR (post_id != '' AND post_id = ?)",
+                                   (normalize_url(url), pid)).fetchone()
+                if old:
+                    conn.execute("DELETE FROM bands WHERE doc_id = ?", (old[0],))
+                    conn.execute(
+                        "UPDATE docs SET url = ?, baslik = ?, yazar = ?, shingle_sayisi = ?, imza = ?, eklenme = ?,"
+                        " post_id = ? WHERE id = ?",
+                        (url, title, author, shingle_count, sig.tobytes(), time.time(), pid, old[0])
+                    )
+                    doc_id = old[0]
+                else:
+                    doc_id = conn.execute(
+                        "INSERT INTO docs (url_key, url, baslik, yazar, shingle_sayisi, imza, eklenme, post_id)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (normalize_url(url), url, title, author, shingle_count, sig.tobytes(), time.time(), pid)
+                    ).lastrowid
+                conn.executemany("INSERT INTO bands (anahtar, doc_id) VALUES (?, ?)",
+                                 [(k, doc_id) for k in self.band_keys(sig)])
+
+    def check(self, article_data: Dict) -> Tuple[Optional[Dict], Optional[tuple]]:
+        """Makaleyi indekste arar; (sonuç, indeks kaydı) döner. Kayıt, analiz
+        başarıyla bittiğinde `add_many([kayit])` ile eklenir; böylece başarısız
+        ya da yarıda kalan analizler indeksi kirletmez. Kısa metinde ya da
+        indeks kapalıysa (None, None) döner."""
+        if not self._disk_ok or not article_data.get('content'):
+            return None, None
+        try:
+            sig, shingle_count = self.signature(article_data['content'])
+            if sig is None:
+                return None, None
+            url = article_data.get('url', '')
+            result = self.query(sig, exclude_url=url)
+            result['shingle_sayisi'] = shingle_count
+            entry = (url, article_data.get('title', ''), article_data.get('author', ''), sig, shingle_count) if url else None
+            return result, entry
+        except Exception as e:
+            print(f"Benzerlik indeksi hatası: {e}")
+            return None, None
+
+    def add_entry(self, entry: Optional[tuple]):
+        """`check`'in döndürdüğü kaydı indekse ekler (hata analizi bozmaz)"""
+        if not entry or not self._disk_ok:
+            return
+        try:
+            self.add_many([entry])
+        except Exception as e:
+            print(f"Benzerlik indeksi yazma hatası: {e}")
+
+    def backfill_from_page_cache(self, page_cache_db: str, batch_size: int = 500) -> int:
+        """Sayfa önbelleğinde saklı tüm makaleleri indekse ekler"""
+        with sqlite3.connect(page_cache_db, timeout=10) as conn:
+            rows = conn.execute("SELECT url, article FROM page_cache").fetchall()
+        added, batch = 0, []
+        for url, article in rows:
+            article = json.loads(article)
+            sig, shingle_count = self.signature(article.get('content', ''))
+            if sig is None:
+                continue
+            batch.append((url, article.get('title', ''), article.get('author', ''), sig, shingle_count))
+            if len(batch) >= batch_size:
+                self.add_many(batch)
+                added += len(batch)
+                batch = []
+        if batch:
+            self.add_many(batch)
+            added += len(batch)
+        return added
+
+    def get_stats(self) -> Dict:
+        if not self._disk_ok:
+            return {'aktif': False}
+        try:
+            with self._connect() as conn:
+                count = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        except Exception as e:
+            return {'aktif': True, 'hata': str(e)}
+        return {'aktif': True, 'makale': count, 'num_perm': self.num_perm, 'bands': self.bands}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MinHash/LSH yakın kopya indeksi')
+    parser.add_argument('--backfill', action='store_true', help='Sayfa önbelleğindeki makaleleri indekse ekle')
+    parser.add_argument('--stats', action='store_true', help='İndeks istatistiklerini yazdır')
+    args = parser.parse_args(argv)
+
+    index = SimilarityIndex()
+    if args.backfill:
+        from cache import PageCache
+        started = time.perf_counter()
+        added = index.backfill_from_page_cache(PageCache().db_path)
+        print(f"{added} makale indekslendi ({time.perf_counter() - started:.1f} sn)")
+    print(json.dumps(index.get_stats(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Soğuk başlangıç ölçümü ve gunicorn --preload için fork sonrası kurulum.
+
+Bileşenler preload ana sürecinde bir kez kurulur ve worker'lara
+copy-on-write paylaşılır. Fork yalnızca çağıran thread'i kopyaladığı için
+arka plan thread'leri (sağlık yoklaması, geçmiş yazıcısı) ve bunların
+kilitleri her worker'da `after_fork` ile kaydedilen metotlarla yeniden
+kurulur. Kayıtlar tek bir fork kancasında toplanır; kapatılan bileşenler
+`remove_after_fork` ile kaydını siler.
+"""
+import itertools
+import os
+import time
+import weakref
+from typing import Dict, Optional
+
+_stages = {}
+_last_mark = time.perf_counter()
+_worker_hooks = []
+_fork_hooks = {}
+_fork_ids = itertools.count(1)
+
+
+def record(stage: str, since: Optional[float] = None):
+    """`since`ten (verilmezse önceki kayıttan) bu yana geçen süreyi aşama olarak kaydeder"""
+    global _last_mark
+    now = time.perf_counter()
+    _stages[stage] = round((now - (_last_mark if since is None else since)) * 1000, 1)
+    _last_mark = now
+
+
+def report() -> Dict:
+    return {
+        'pid': os.getpid(),
+        'asamalar_ms': dict(_stages),
+        'toplam_ms': round(sum(_stages.values()), 1)
+    }
+
+
+def _run_fork_hooks():
+    for key, ref in list(_fork_hooks.items()):
+        bound = ref()
+        if bound is None:
+            _fork_hooks.pop(key, None)
+        else:
+            bound()
+
+
+def after_fork(method) -> int:
+    """Bağlı metodu her fork edilen çocuk süreçte çağırır (nesneyi canlı
+    tutmaz); `remove_after_fork` için kayıt numarası döner"""
+    key = next(_fork_ids)
+    _fork_hooks[key] = weakref.WeakMethod(method, lambda _ref: _fork_hooks.pop(key, None))
+    return key
+
+
+def remove_after_fork(key: Optional[int]):
+    _fork_hooks.pop(key, None)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_run_fork_hooks)
+
+
+def on_worker_ready(fn):
+    """Worker istek almaya hazır olduğunda çalışacak fonksiyonu kaydeder"""
+    _worker_hooks.append(fn)
+
+
+def worker_ready():
+    """gunicorn post_worker_init kancasından çağrılır"""
+    for fn in _worker_hooks:
+        fn()